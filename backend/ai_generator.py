@@ -1,6 +1,155 @@
-from typing import Any, Dict, List, Optional
+import asyncio
+import contextvars
+import threading
+import time
+from concurrent.futures import Executor
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Dict, List, Optional
 
 import anthropic
+from tracing import tracer
+
+
+@dataclass
+class RoundStats:
+    """Latency and token usage of one Claude call"""
+
+    latency_seconds: float
+    input_tokens: int
+    output_tokens: int
+    stop_reason: Optional[str]
+    tool_calls: int = 0
+    # Timing of each tool call the response asked for
+    tool_timings: List[Any] = field(default_factory=list)
+    # Prompt caching: input tokens read from and written to the cache, which
+    # are not included in input_tokens
+    cache_read_tokens: int = 0
+    cache_write_tokens: int = 0
+
+
+@dataclass
+class GenerationStats:
+    """Per-round statistics of one generated answer"""
+
+    rounds: List[RoundStats] = field(default_factory=list)
+    # Why tools were withdrawn: "max_rounds", "time_budget" or "token_budget"
+    stop_cause: Optional[str] = None
+
+    @property
+    def total_tokens(self) -> int:
+        return sum(
+            r.input_tokens
+            + r.cache_read_tokens
+            + r.cache_write_tokens
+            + r.output_tokens
+            for r in self.rounds
+        )
+
+    @property
+    def total_seconds(self) -> float:
+        return sum(r.latency_seconds for r in self.rounds)
+
+
+class _ToolLoop:
+    """
+    Round bookkeeping shared by the sync, async and streaming paths.
+
+    The messages list of the initial parameters grows in place with each
+    tool round; once the round limit or a budget is reached, the next call
+    sets tool_choice to "none" so Claude has to answer. The tools stay in the
+    request, as dropping them would miss the prompt cache entry of the tool
+    definitions and system prompt; a different tool_choice does not.
+    """
+
+    def __init__(
+        self,
+        generator: "AIGenerator",
+        params: Dict[str, Any],
+        stats: Optional[GenerationStats],
+        sources: Optional[List[str]],
+    ):
+        self.generator = generator
+        self.params = params
+        self.stats = stats if stats is not None else GenerationStats()
+        self.sources = sources if sources is not None else []
+        self.started = time.perf_counter()
+        self.tool_rounds = 0
+        self.tools_allowed = "tools" in params
+
+    def record(self, response, started: float):
+        """Record one Claude call that began at the given perf_counter time"""
+        usage = getattr(response, "usage", None)
+        self.stats.rounds.append(
+            RoundStats(
+                latency_seconds=time.perf_counter() - started,
+                input_tokens=getattr(usage, "input_tokens", 0) or 0,
+                output_tokens=getattr(usage, "output_tokens", 0) or 0,
+                stop_reason=response.stop_reason,
+                tool_calls=len(AIGenerator._tool_uses(response)),
+                cache_read_tokens=getattr(usage, "cache_read_input_tokens", 0) or 0,
+                cache_write_tokens=getattr(usage, "cache_creation_input_tokens", 0)
+                or 0,
+            )
+        )
+
+    def call_span(self):
+        """Tracing span for the next Claude call of this generation"""
+        first = not self.stats.rounds
+        return tracer.span(
+            "anthropic.first_call" if first else "anthropic.followup_call",
+            round=len(self.stats.rounds) + 1,
+            tools_allowed=self.tools_allowed,
+        )
+
+    def wants_tools(self, response, tool_manager) -> bool:
+        """Whether the response asks for tools that may still be run"""
+        return (
+            response.stop_reason == "tool_use"
+            and tool_manager is not None
+            and self.tools_allowed
+        )
+
+    def next_params(self, response, results: List[Any]) -> Dict[str, Any]:
+        """Append a tool round to the messages and get the next call's params"""
+        messages = self.params["messages"]
+
+        # Add AI's tool use response
+        messages.append({"role": "assistant", "content": response.content})
+
+        # Add tool results as single message
+        tool_results = AIGenerator._tool_results(
+            AIGenerator._tool_uses(response), results
+        )
+        if tool_results:
+            messages.append({"role": "user", "content": tool_results})
+
+        # Sources and timings belong to this request only
+        for result in results:
+            self.sources.extend(result.sources)
+        self.stats.rounds[-1].tool_timings = [result.timing for result in results]
+
+        self.tool_rounds += 1
+        cause = self._stop_cause()
+        if cause:
+            # Follow-up call that may not use tools, sharing the messages list
+            self.stats.stop_cause = cause
+            self.tools_allowed = False
+            self.params = {**self.params, "tool_choice": {"type": "none"}}
+        return self.params
+
+    def finish(self):
+        self.generator._record_stats(self.stats)
+
+    def _stop_cause(self) -> Optional[str]:
+        generator = self.generator
+        if self.tool_rounds >= generator.max_tool_rounds:
+            return "max_rounds"
+        budget = generator.time_budget
+        if budget and time.perf_counter() - self.started >= budget:
+            return "time_budget"
+        if generator.token_budget and self.stats.total_tokens >= generator.token_budget:
+            return "token_budget"
+        return None
 
 
 class AIGenerator:
@@ -11,7 +160,7 @@ class AIGenerator:
 
 Search Tool Usage:
 - Use the search tool **only** for questions about specific course content or detailed educational materials
-- **One search per query maximum**
+- Search again only when earlier results are not enough to answer
 - Synthesize search results into accurate, fact-based responses
 - If search yields no results, state this clearly without offering alternatives
 
@@ -31,109 +180,366 @@ All responses must be:
 Provide only the direct answer to what was asked.
 """
 
-    def __init__(self, api_key: str, model: str):
+    # Prompt for compacting older conversation turns into a rolling summary
+    SUMMARY_PROMPT = (
+        "Summarize the conversation below between a user and a course materials "
+        "assistant. The summary replaces these turns as context for the rest of the "
+        "conversation, so keep the courses, lessons, facts and open questions the "
+        "user may refer back to. Reply with the summary only, in at most 150 words."
+    )
+
+    def __init__(
+        self,
+        api_key: str,
+        model: str,
+        max_tool_rounds: int = 2,
+        time_budget: Optional[float] = None,
+        token_budget: Optional[int] = None,
+    ):
         self.client = anthropic.Anthropic(api_key=api_key)
+        self.async_client = anthropic.AsyncAnthropic(api_key=api_key)
         self.model = model
 
+        # Tool loop limits: rounds of tool calls, then overall seconds and
+        # input + output tokens after which Claude must answer without tools
+        self.max_tool_rounds = max_tool_rounds
+        self.time_budget = time_budget
+        self.token_budget = token_budget
+
         # Pre-build base API parameters
         self.base_params = {"model": self.model, "temperature": 0, "max_tokens": 800}
 
+        # The system prompt is identical on every call, so it ends a cached
+        # prefix; conversation history goes into the messages instead
+        self.system_blocks = [
+            {
+                "type": "text",
+                "text": self.SYSTEM_PROMPT,
+                "cache_control": {"type": "ephemeral"},
+            }
+        ]
+
+        # Running totals across generations, see usage_stats()
+        self._usage_lock = threading.Lock()
+        self._usage = {
+            "generations": 0,
+            "rounds": 0,
+            "input_tokens": 0,
+            "output_tokens": 0,
+            "cache_read_tokens": 0,
+            "cache_write_tokens": 0,
+            "seconds": 0.0,
+            "stop_causes": {},
+            "summaries": 0,
+            "summary_tokens": 0,
+        }
+
+    def _build_params(
+        self,
+        query: str,
+        conversation_history: Optional[str] = None,
+        tools: Optional[List] = None,
+    ) -> Dict[str, Any]:
+        """
+        Build the parameters for the initial API call.
+
+        Tool definitions and the system prompt form a stable prefix that is
+        marked for prompt caching; history is sent ahead of the query in the
+        user message so it does not invalidate that prefix.
+        """
+        content: Any = query
+        if conversation_history:
+            content = [
+                {
+                    "type": "text",
+                    "text": f"Previous conversation:\n{conversation_history}",
+                },
+                {"type": "text", "text": query},
+            ]
+
+        # Prepare API call parameters efficiently
+        api_params = {
+            **self.base_params,
+            "messages": [{"role": "user", "content": content}],
+            "system": self.system_blocks,
+        }
+
+        # Add tools if available, with a cache breakpoint after the last one
+        if tools:
+            api_params["tools"] = [
+                *tools[:-1],
+                {**tools[-1], "cache_control": {"type": "ephemeral"}},
+            ]
+            api_params["tool_choice"] = {"type": "auto"}
+
+        return api_params
+
+    def _record_stats(self, stats: GenerationStats):
+        """Add one generation's statistics to the running totals"""
+        with self._usage_lock:
+            usage = self._usage
+            usage["generations"] += 1
+            usage["rounds"] += len(stats.rounds)
+            usage["input_tokens"] += sum(r.input_tokens for r in stats.rounds)
+            usage["output_tokens"] += sum(r.output_tokens for r in stats.rounds)
+            usage["cache_read_tokens"] += sum(r.cache_read_tokens for r in stats.rounds)
+            usage["cache_write_tokens"] += sum(
+                r.cache_write_tokens for r in stats.rounds
+            )
+            usage["seconds"] += stats.total_seconds
+            if stats.stop_cause:
+                causes = usage["stop_causes"]
+                causes[stats.stop_cause] = causes.get(stats.stop_cause, 0) + 1
+
+    def usage_stats(self) -> Dict[str, Any]:
+        """Get Claude call counts, token usage and latency totals"""
+        with self._usage_lock:
+            usage = {**self._usage, "stop_causes": dict(self._usage["stop_causes"])}
+        generations = usage["generations"]
+        usage["rounds_per_generation"] = (
+            usage["rounds"] / generations if generations else 0.0
+        )
+        usage["seconds_per_round"] = (
+            usage["seconds"] / usage["rounds"] if usage["rounds"] else 0.0
+        )
+        return usage
+
     def generate_response(
         self,
         query: str,
         conversation_history: Optional[str] = None,
         tools: Optional[List] = None,
         tool_manager=None,
+        stats: Optional[GenerationStats] = None,
+        sources: Optional[List[str]] = None,
     ) -> str:
         """
         Generate AI response with optional tool usage and conversation context.
 
+        Claude may call tools for up to max_tool_rounds rounds; the loop ends
+        early as soon as it answers directly.
+
         Args:
             query: The user's question or request
             conversation_history: Previous messages for context
             tools: Available tools the AI can use
             tool_manager: Manager to execute tools
+            stats: Optional GenerationStats to fill with per-round statistics
+            sources: Optional list to extend with the sources tools returned
 
         Returns:
             Generated response as string
         """
-
-        # Build system content efficiently - avoid string ops when possible
-        system_content = (
-            f"{self.SYSTEM_PROMPT}\n\nPrevious conversation:\n{conversation_history}"
-            if conversation_history
-            else self.SYSTEM_PROMPT
+        loop = _ToolLoop(
+            self, self._build_params(query, conversation_history, tools), stats, sources
         )
+        params = loop.params
+        try:
+            while True:
+                started = time.perf_counter()
+                with loop.call_span() as span:
+                    response = self.client.messages.create(**params)
+                    span.set("stop_reason", response.stop_reason)
+                loop.record(response, started)
 
-        # Prepare API call parameters efficiently
-        api_params = {
-            **self.base_params,
-            "messages": [{"role": "user", "content": query}],
-            "system": system_content,
-        }
+                # Return direct response
+                if not loop.wants_tools(response, tool_manager):
+                    return response.content[0].text
 
-        # Add tools if available
-        if tools:
-            api_params["tools"] = tools
-            api_params["tool_choice"] = {"type": "auto"}
+                results = self._execute_tools(response, tool_manager)
+                params = loop.next_params(response, results)
+        finally:
+            loop.finish()
 
-        # Get response from Claude
-        response = self.client.messages.create(**api_params)
+    def summarize_conversation(
+        self, conversation: str, previous_summary: Optional[str] = None
+    ) -> str:
+        """
+        Compact conversation turns into a short summary.
 
-        # Handle tool execution if needed
-        if response.stop_reason == "tool_use" and tool_manager:
-            return self._handle_tool_execution(response, api_params, tool_manager)
+        Args:
+            conversation: Formatted turns to summarize
+            previous_summary: Summary of the turns before them, folded in
 
-        # Return direct response
-        return response.content[0].text
+        Returns:
+            The new summary, covering previous_summary and conversation
+        """
+        content = conversation
+        if previous_summary:
+            content = f"Earlier summary: {previous_summary}\n\n{conversation}"
 
-    def _handle_tool_execution(
-        self, initial_response, base_params: Dict[str, Any], tool_manager
-    ):
+        with tracer.span("anthropic.summary"):
+            response = self.client.messages.create(
+                model=self.model,
+                temperature=0,
+                max_tokens=300,
+                system=self.SUMMARY_PROMPT,
+                messages=[{"role": "user", "content": content}],
+            )
+
+        usage = getattr(response, "usage", None)
+        with self._usage_lock:
+            self._usage["summaries"] += 1
+            self._usage["summary_tokens"] += (
+                getattr(usage, "input_tokens", 0) or 0
+            ) + (getattr(usage, "output_tokens", 0) or 0)
+        return response.content[0].text.strip()
+
+    def _execute_tools(self, response, tool_manager) -> List[Any]:
+        """Execute all tool calls in a response and collect their ToolResults"""
+        tool_uses = self._tool_uses(response)
+        if not tool_uses:
+            return []
+
+        # Parallel tool calls are dispatched together so searches are batched
+        return tool_manager.execute_tools(
+            [(block.name, block.input) for block in tool_uses]
+        )
+
+    async def _aexecute_tools(
+        self, response, tool_manager, executor: Optional[Executor] = None
+    ) -> List[Any]:
+        """Async variant of _execute_tools that runs tools on the executor"""
+        tool_uses = self._tool_uses(response)
+        if not tool_uses:
+            return []
+
+        # Run in a copy of this context so tool spans nest under the request
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            executor,
+            contextvars.copy_context().run,
+            tool_manager.execute_tools,
+            [(block.name, block.input) for block in tool_uses],
+        )
+
+    @staticmethod
+    def _tool_uses(response) -> List[Any]:
+        """Get the tool_use blocks of a response"""
+        return [block for block in response.content if block.type == "tool_use"]
+
+    @staticmethod
+    def _tool_results(tool_uses: List[Any], results: List[Any]) -> List[Dict[str, Any]]:
+        """Pair ToolResults with their tool_use blocks as tool_result blocks"""
+        return [
+            {
+                "type": "tool_result",
+                "tool_use_id": block.id,
+                "content": result.content,
+            }
+            for block, result in zip(tool_uses, results)
+        ]
+
+    async def agenerate_response(
+        self,
+        query: str,
+        conversation_history: Optional[str] = None,
+        tools: Optional[List] = None,
+        tool_manager=None,
+        executor: Optional[Executor] = None,
+        stats: Optional[GenerationStats] = None,
+        sources: Optional[List[str]] = None,
+    ) -> str:
         """
-        Handle execution of tool calls and get follow-up response.
+        Async variant of generate_response for use on the event loop.
+
+        Anthropic calls go through the async client, while tool execution
+        (embedding + vector search) runs on the given executor so it never
+        blocks the loop.
 
         Args:
-            initial_response: The response containing tool use requests
-            base_params: Base API parameters
+            query: The user's question or request
+            conversation_history: Previous messages for context
+            tools: Available tools the AI can use
             tool_manager: Manager to execute tools
+            executor: Executor for blocking tool work (default loop executor if None)
+            stats: Optional GenerationStats to fill with per-round statistics
+            sources: Optional list to extend with the sources tools returned
 
         Returns:
-            Final response text after tool execution
+            Generated response as string
         """
-        # Start with existing messages
-        messages = base_params["messages"].copy()
+        loop = _ToolLoop(
+            self, self._build_params(query, conversation_history, tools), stats, sources
+        )
+        params = loop.params
+        try:
+            while True:
+                started = time.perf_counter()
+                with loop.call_span() as span:
+                    response = await self.async_client.messages.create(**params)
+                    span.set("stop_reason", response.stop_reason)
+                loop.record(response, started)
 
-        # Add AI's tool use response
-        messages.append({"role": "assistant", "content": initial_response.content})
-
-        # Execute all tool calls and collect results
-        tool_results = []
-        for content_block in initial_response.content:
-            if content_block.type == "tool_use":
-                tool_result = tool_manager.execute_tool(
-                    content_block.name, **content_block.input
-                )
-
-                tool_results.append(
-                    {
-                        "type": "tool_result",
-                        "tool_use_id": content_block.id,
-                        "content": tool_result,
-                    }
-                )
+                # Return direct response
+                if not loop.wants_tools(response, tool_manager):
+                    return response.content[0].text
 
-        # Add tool results as single message
-        if tool_results:
-            messages.append({"role": "user", "content": tool_results})
+                results = await self._aexecute_tools(response, tool_manager, executor)
+                params = loop.next_params(response, results)
+        finally:
+            loop.finish()
 
-        # Prepare final API call without tools
-        final_params = {
-            **self.base_params,
-            "messages": messages,
-            "system": base_params["system"],
-        }
+    async def astream_response(
+        self,
+        query: str,
+        conversation_history: Optional[str] = None,
+        tools: Optional[List] = None,
+        tool_manager=None,
+        executor: Optional[Executor] = None,
+        stats: Optional[GenerationStats] = None,
+        sources: Optional[List[str]] = None,
+    ) -> AsyncIterator[Optional[str]]:
+        """
+        Stream the response text as it is generated.
+
+        Text deltas are yielded as they arrive. Whenever Claude asks for
+        tools, they are executed on the executor and the next round is
+        streamed in turn; text after the start of a tool_use block is not
+        forwarded, and if a round that calls tools already streamed text,
+        None is yielded so the caller can discard what it has so far.
+
+        Args:
+            query: The user's question or request
+            conversation_history: Previous messages for context
+            tools: Available tools the AI can use
+            tool_manager: Manager to execute tools
+            executor: Executor for blocking tool work (default loop executor if None)
+            stats: Optional GenerationStats to fill with per-round statistics
+            sources: Optional list to extend with the sources tools returned
+
+        Yields:
+            Text fragments of the response, or None when the text streamed
+            so far preceded a tool call and is not part of the answer
+        """
+        loop = _ToolLoop(
+            self, self._build_params(query, conversation_history, tools), stats, sources
+        )
+        params = loop.params
+        try:
+            while True:
+                started = time.perf_counter()
+                streamed = calling = False
+                with loop.call_span() as span:
+                    async with self.async_client.messages.stream(**params) as stream:
+                        async for event in stream:
+                            if event.type == "content_block_start":
+                                calling |= event.content_block.type == "tool_use"
+                            elif event.type == "text" and not calling:
+                                streamed = True
+                                yield event.text
+                        response = await stream.get_final_message()
+                    span.set("stop_reason", response.stop_reason)
+                loop.record(response, started)
+
+                if not loop.wants_tools(response, tool_manager):
+                    return
+
+                # Text written before a tool call must not reach the user
+                if streamed:
+                    yield None
 
-        # Get final response
-        final_response = self.client.messages.create(**final_params)
-        return final_response.content[0].text
+                results = await self._aexecute_tools(response, tool_manager, executor)
+                params = loop.next_params(response, results)
+        finally:
+            loop.finish()
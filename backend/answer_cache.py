@@ -0,0 +1,202 @@
+import sys
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, Hashable, List, Optional
+
+import numpy as np
+
+
+@dataclass
+class CachedAnswer:
+    """An answer previously generated for a semantically similar query"""
+
+    answer: str
+    sources: List[str]
+
+
+@dataclass
+class _Entry:
+    """Internal cache entry with its normalized query embedding"""
+
+    vector: np.ndarray
+    scope: Hashable
+    answer: CachedAnswer
+    created_at: float
+    size: int = field(default=0)
+
+
+class SemanticAnswerCache:
+    """
+    LRU/TTL cache of answers looked up by cosine similarity of query embeddings.
+
+    Entries are partitioned by a hashable scope (e.g. the lessons a query
+    mentions) so only answers from the same scope can match. All entries are
+    dropped whenever the corpus version passed in by the caller changes.
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.95,
+        max_entries: int = 1000,
+        ttl_seconds: float = 3600,
+        max_bytes: int = 16 * 1024 * 1024,
+    ):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+
+        self._entries: "OrderedDict[int, _Entry]" = OrderedDict()
+        self._by_scope: Dict[Hashable, Dict[int, _Entry]] = {}
+        self._next_id = 0
+        self._bytes = 0
+        self._version: Any = None
+        self._lock = threading.Lock()
+
+        # Counters
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def lookup(
+        self, embedding, scope: Hashable, version: Any
+    ) -> Optional[CachedAnswer]:
+        """
+        Find the most similar cached answer in the same scope.
+
+        Args:
+            embedding: Query embedding vector
+            scope: Partition key the entry must share
+            version: Current corpus version; a change clears the cache
+
+        Returns:
+            CachedAnswer if similarity >= threshold, else None
+        """
+        vector = self._normalize(embedding)
+        now = time.monotonic()
+
+        with self._lock:
+            self._sync_version(version)
+
+            candidates = self._by_scope.get(scope)
+            if not candidates:
+                self.misses += 1
+                return None
+
+            # Drop expired entries before scoring
+            for entry_id, entry in list(candidates.items()):
+                if now - entry.created_at > self.ttl_seconds:
+                    self._remove(entry_id)
+                    self.expirations += 1
+
+            candidates = self._by_scope.get(scope)
+            if not candidates:
+                self.misses += 1
+                return None
+
+            ids = list(candidates.keys())
+            matrix = np.stack([candidates[i].vector for i in ids])
+            scores = matrix @ vector
+            best = int(np.argmax(scores))
+
+            if scores[best] < self.threshold:
+                self.misses += 1
+                return None
+
+            entry_id = ids[best]
+            self._entries.move_to_end(entry_id)
+            self.hits += 1
+            return self._entries[entry_id].answer
+
+    def store(
+        self,
+        embedding,
+        scope: Hashable,
+        version: Any,
+        answer: str,
+        sources: List[str],
+    ):
+        """Cache an answer unless the corpus changed since it was computed"""
+        vector = self._normalize(embedding)
+        cached = CachedAnswer(answer=answer, sources=list(sources))
+        size = (
+            vector.nbytes
+            + sys.getsizeof(answer)
+            + sum(sys.getsizeof(source) for source in cached.sources)
+        )
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            if version != self._version:
+                return
+
+            entry_id = self._next_id
+            self._next_id += 1
+            entry = _Entry(
+                vector=vector,
+                scope=scope,
+                answer=cached,
+                created_at=time.monotonic(),
+                size=size,
+            )
+            self._entries[entry_id] = entry
+            self._by_scope.setdefault(scope, {})[entry_id] = entry
+            self._bytes += size
+
+            # Evict least recently used entries beyond the bounds
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                oldest_id = next(iter(self._entries))
+                self._remove(oldest_id)
+                self.evictions += 1
+
+    def clear(self):
+        """Remove all cached answers"""
+        with self._lock:
+            self._clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Get cache size and hit/miss counters"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
+
+    def _sync_version(self, version: Any):
+        """Clear the cache when the corpus version changes"""
+        if version != self._version:
+            if self._entries:
+                self.invalidations += 1
+            self._clear()
+            self._version = version
+
+    def _clear(self):
+        self._entries.clear()
+        self._by_scope.clear()
+        self._bytes = 0
+
+    def _remove(self, entry_id: int):
+        entry = self._entries.pop(entry_id)
+        scope_entries = self._by_scope[entry.scope]
+        del scope_entries[entry_id]
+        if not scope_entries:
+            del self._by_scope[entry.scope]
+        self._bytes -= entry.size
+
+    @staticmethod
+    def _normalize(embedding) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
@@ -2,16 +2,19 @@ import warnings
 
 warnings.filterwarnings("ignore", message="resource_tracker: There appear to be.*")
 
+import json
 import os
-from typing import List, Optional
+from typing import Any, List, Optional
 
 from config import config
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel
 from rag_system import RAGSystem
+from tracing import tracer
 
 # Initialize FastAPI app
 app = FastAPI(title="Course Materials RAG System", root_path="")
@@ -66,19 +69,59 @@ async def query_documents(request: QueryRequest):
         # Create session if not provided
         session_id = request.session_id
         if not session_id:
-            session_id = rag_system.session_manager.create_session()
+            session_id = await rag_system.acreate_session()
 
-        # Process query using RAG system
-        answer, sources = rag_system.query(request.query, session_id)
+        # Process query using RAG system without blocking the event loop
+        answer, sources = await rag_system.aquery(request.query, session_id)
 
         return QueryResponse(answer=answer, sources=sources, session_id=session_id)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def _sse(event: str, data: Any) -> str:
+    """Format a single Server-Sent Events message"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@app.post("/api/query/stream")
+async def stream_query(request: QueryRequest):
+    """
+    Process a query and stream the answer as Server-Sent Events.
+
+    Emits "token" events with text fragments as they are generated, a
+    "discard" event when the text so far preceded a tool call and should be
+    cleared, then a trailing "sources" event and a final "done" event
+    carrying the session id.
+    """
+    # Create session if not provided
+    session_id = request.session_id
+    if not session_id:
+        session_id = await rag_system.acreate_session()
+
+    async def event_stream():
+        try:
+            async for event in rag_system.astream_query(request.query, session_id):
+                if event["type"] == "token":
+                    yield _sse("token", {"text": event["text"]})
+                elif event["type"] == "discard":
+                    yield _sse("discard", {})
+                else:
+                    yield _sse("sources", {"sources": event["sources"]})
+            yield _sse("done", {"session_id": session_id})
+        except Exception as e:
+            yield _sse("error", {"detail": str(e)})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @app.get("/api/courses", response_model=CourseStats)
-async def get_course_stats():
-    """Get course analytics and statistics"""
+def get_course_stats():
+    """Get course analytics and statistics (sync so FastAPI runs it in a thread)"""
     try:
         analytics = rag_system.get_course_analytics()
         return CourseStats(
@@ -89,19 +132,55 @@ async def get_course_stats():
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/api/stats")
+def get_cache_stats():
+    """Get cache hit/miss statistics (sync so FastAPI runs it in a thread)"""
+    return rag_system.get_cache_stats()
+
+
+@app.get("/api/sessions/{session_id}")
+def get_session_stats(session_id: str):
+    """Get the estimated token size of a session's conversation history"""
+    return {
+        "session_id": session_id,
+        "history_tokens": rag_system.session_manager.token_estimate(session_id),
+    }
+
+
+@app.get("/metrics")
+def metrics():
+    """Per-stage request latency histograms in the Prometheus text format"""
+    return PlainTextResponse(tracer.metrics(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/api/health")
+def health_check():
+    """Liveness check: the server is up and serving from the persisted index"""
+    return {"status": "ok", "indexing": rag_system.get_indexing_status()}
+
+
+@app.get("/api/ready")
+def readiness_check():
+    """Readiness check: 503 with indexing progress until startup indexing ends"""
+    status = rag_system.get_indexing_status()
+    if status["state"] == "indexing":
+        return JSONResponse(status_code=503, content=status)
+    return status
+
+
 @app.on_event("startup")
 async def startup_event():
-    """Load initial documents on startup"""
+    """Start indexing initial documents in the background"""
     docs_path = "../docs"
     if os.path.exists(docs_path):
-        print("Loading initial documents...")
-        try:
-            courses, chunks = rag_system.add_course_folder(
-                docs_path, clear_existing=False
-            )
-            print(f"Loaded {courses} courses with {chunks} chunks")
-        except Exception as e:
-            print(f"Error loading documents: {e}")
+        print("Loading initial documents in the background...")
+        rag_system.start_indexing(docs_path)
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Persist caches before the process exits"""
+    rag_system.shutdown()
 
 
 import os
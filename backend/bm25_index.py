@@ -0,0 +1,261 @@
+import math
+import re
+import threading
+from array import array
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Identifiers keep their inner punctuation: tool_use, client.messages.create
+_TOKEN_RE = re.compile(r"[A-Za-z0-9_]+(?:[.\-/:][A-Za-z0-9_]+)*")
+_PART_RE = re.compile(r"[A-Z]+(?![a-z])|[A-Z]?[a-z]+|[0-9]+")
+
+_STOPWORDS = frozenset(
+    "a an and are as at be but by for from has have how i if in into is it its of "
+    "on or so that the their then there these they this to was we what when where "
+    "which who will with you your".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Split text into lowercase BM25 terms.
+
+    Compound identifiers are indexed whole and by their parts, so "tool_use"
+    yields "tool_use", "tool" and "use", and "getUserId" yields "getuserid",
+    "get", "user" and "id".
+    """
+    terms = []
+    for match in _TOKEN_RE.finditer(text):
+        token = match.group()
+        lowered = token.lower()
+        if lowered not in _STOPWORDS:
+            terms.append(lowered)
+        parts = _PART_RE.findall(token)
+        if len(parts) > 1:
+            terms.extend(
+                part.lower() for part in parts if part.lower() not in _STOPWORDS
+            )
+    return terms
+
+
+def reciprocal_rank_fusion(
+    rankings: Iterable[Sequence[str]], k: int = 60
+) -> List[Tuple[str, float]]:
+    """
+    Fuse ranked ID lists by summing 1 / (k + rank) across lists.
+
+    Returns:
+        (id, fused score) pairs, best first
+    """
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking, start=1):
+            scores[item] = scores.get(item, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+
+def _to_array(typecode: str, values: np.ndarray) -> array:
+    result = array(typecode)
+    result.frombytes(values.tobytes())
+    return result
+
+
+class BM25Index:
+    """
+    In-memory BM25 inverted index over content chunks.
+
+    Posting lists are pairs of compact typed arrays (int32 document numbers,
+    float32 term frequencies) that are appended to in place and scored with
+    NumPy through zero-copy views. Removed chunks are tombstoned and dropped
+    from the postings once they make up a quarter of the index.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._ids: List[Optional[str]] = []  # Document number -> chunk ID
+        self._numbers: Dict[str, int] = {}  # Chunk ID -> live document number
+        self._lengths = array("f")
+        self._courses = array("i")
+        self._lessons = array("i")
+        self._alive = bytearray()
+        self._postings: Dict[str, Tuple[array, array]] = {}
+        self._course_codes: Dict[str, int] = {}
+        self._total_length = 0.0
+        self._dead = 0
+
+    def __len__(self) -> int:
+        return len(self._numbers)
+
+    def add(
+        self,
+        ids: Sequence[str],
+        documents: Sequence[str],
+        metadatas: Sequence[Dict[str, Any]],
+    ):
+        """Index chunks, replacing any already indexed under the same ID"""
+        counted = [Counter(tokenize(document)) for document in documents]
+
+        with self._lock:
+            for chunk_id, counts, metadata in zip(ids, counted, metadatas):
+                if chunk_id in self._numbers:
+                    self._remove(chunk_id)
+
+                number = len(self._ids)
+                length = sum(counts.values())
+                course = metadata.get("course_title")
+                lesson = metadata.get("lesson_number")
+
+                self._ids.append(chunk_id)
+                self._numbers[chunk_id] = number
+                self._lengths.append(length)
+                self._courses.append(
+                    self._course_codes.setdefault(course, len(self._course_codes))
+                )
+                self._lessons.append(-1 if lesson is None else lesson)
+                self._alive.append(1)
+                self._total_length += length
+
+                for term, frequency in counts.items():
+                    posting = self._postings.get(term)
+                    if posting is None:
+                        posting = self._postings[term] = (array("i"), array("f"))
+                    posting[0].append(number)
+                    posting[1].append(frequency)
+
+    def remove(self, ids: Iterable[str]):
+        """Remove chunks by ID, ignoring IDs that are not indexed"""
+        with self._lock:
+            for chunk_id in ids:
+                if chunk_id in self._numbers:
+                    self._remove(chunk_id)
+            self._maybe_compact()
+
+    def remove_course(self, course_title: str):
+        """Remove every chunk of a course"""
+        with self._lock:
+            code = self._course_codes.get(course_title)
+            if code is None:
+                return
+            courses = np.frombuffer(self._courses, dtype=np.int32)
+            alive = np.frombuffer(self._alive, dtype=np.bool_)
+            numbers = np.flatnonzero(alive & (courses == code)).tolist()
+            del courses, alive
+            for number in numbers:
+                self._remove(self._ids[number])
+            self._maybe_compact()
+
+    def clear(self):
+        with self._lock:
+            self._reset()
+
+    def search(
+        self,
+        query: str,
+        limit: int,
+        course_title: Optional[str] = None,
+        lesson_number: Optional[int] = None,
+    ) -> List[Tuple[str, float]]:
+        """
+        Rank chunks against a query with BM25.
+
+        Args:
+            query: Free-text query
+            limit: Maximum number of hits
+            course_title: Only return chunks of this course
+            lesson_number: Only return chunks of this lesson
+
+        Returns:
+            (chunk ID, score) pairs with a positive score, best first
+        """
+        terms = set(tokenize(query))
+        with self._lock:
+            live = len(self._numbers)
+            if not terms or not live or limit <= 0:
+                return []
+
+            mask = np.frombuffer(self._alive, dtype=np.bool_).copy()
+            if course_title is not None:
+                code = self._course_codes.get(course_title)
+                if code is None:
+                    return []
+                mask &= np.frombuffer(self._courses, dtype=np.int32) == code
+            if lesson_number is not None:
+                mask &= np.frombuffer(self._lessons, dtype=np.int32) == lesson_number
+
+            scores = self._score(terms, live)
+            scores[~mask] = 0
+            hits = np.flatnonzero(scores)
+            if len(hits) > limit:
+                hits = hits[np.argpartition(-scores[hits], limit - 1)[:limit]]
+            hits = hits[np.argsort(-scores[hits], kind="stable")]
+            return [(self._ids[number], float(scores[number])) for number in hits]
+
+    def _score(self, terms: Iterable[str], live: int) -> np.ndarray:
+        """BM25 score of every document number, dead ones included"""
+        alive = np.frombuffer(self._alive, dtype=np.bool_)
+        lengths = np.frombuffer(self._lengths, dtype=np.float32)
+        average_length = self._total_length / live
+        scores = np.zeros(len(self._ids), dtype=np.float32)
+        for term in terms:
+            posting = self._postings.get(term)
+            if posting is None:
+                continue
+            numbers = np.frombuffer(posting[0], dtype=np.int32)
+            frequencies = np.frombuffer(posting[1], dtype=np.float32)
+            document_frequency = int(np.count_nonzero(alive[numbers]))
+            if not document_frequency:
+                continue
+
+            idf = math.log(
+                1 + (live - document_frequency + 0.5) / (document_frequency + 0.5)
+            )
+            saturation = frequencies + self.k1 * (
+                1 - self.b + self.b * lengths[numbers] / average_length
+            )
+            scores[numbers] += idf * frequencies * (self.k1 + 1) / saturation
+        return scores
+
+    def _remove(self, chunk_id: str):
+        number = self._numbers.pop(chunk_id)
+        self._ids[number] = None
+        self._alive[number] = 0
+        self._total_length -= self._lengths[number]
+        self._dead += 1
+
+    def _maybe_compact(self):
+        """Drop tombstoned documents from all arrays once they pile up"""
+        if self._dead * 4 < len(self._ids):
+            return
+
+        alive = np.frombuffer(self._alive, dtype=np.bool_).copy()
+        renumber = (np.cumsum(alive) - 1).astype(np.int32)
+
+        postings = {}
+        for term, (numbers, frequencies) in self._postings.items():
+            numbers = np.frombuffer(numbers, dtype=np.int32)
+            keep = alive[numbers]
+            if keep.any():
+                postings[term] = (
+                    _to_array("i", renumber[numbers[keep]]),
+                    _to_array("f", np.frombuffer(frequencies, dtype=np.float32)[keep]),
+                )
+            del numbers
+
+        def compact(values: array, dtype) -> array:
+            return _to_array(values.typecode, np.frombuffer(values, dtype=dtype)[alive])
+
+        self._postings = postings
+        self._lengths = compact(self._lengths, np.float32)
+        self._courses = compact(self._courses, np.int32)
+        self._lessons = compact(self._lessons, np.int32)
+        self._ids = [chunk_id for chunk_id in self._ids if chunk_id is not None]
+        self._numbers = {chunk_id: number for number, chunk_id in enumerate(self._ids)}
+        self._alive = bytearray(b"\x01" * len(self._ids))
+        self._dead = 0
@@ -17,6 +17,13 @@ class Config:
 
     # Embedding model settings
     EMBEDDING_MODEL: str = "all-MiniLM-L6-v2"
+    EMBEDDING_CACHE_SIZE: int = 4096  # Query embeddings kept in the LRU cache
+    EMBEDDING_CACHE_PATH: str = ""  # .npz file to persist the cache ("" = off)
+    # Unix socket of a shared embedding service ("" = load the model in-process)
+    EMBEDDING_SERVICE_SOCKET: str = os.getenv("EMBEDDING_SERVICE_SOCKET", "")
+    EMBEDDING_SERVICE_TIMEOUT: float = 30.0  # Seconds to wait for the service
+    # Seconds on the in-process model before trying the service again
+    EMBEDDING_SERVICE_RETRY: float = 30.0
 
     # Document processing settings
     CHUNK_SIZE: int = 800  # Size of text chunks for vector storage
@@ -24,6 +31,71 @@ class Config:
     MAX_RESULTS: int = 5  # Maximum search results to return
     MAX_HISTORY: int = 2  # Number of conversation messages to remember
 
+    # Conversation history settings
+    HISTORY_SUMMARY: bool = False  # Compact older exchanges into a rolling summary
+    HISTORY_KEEP_TURNS: int = 2  # Exchanges kept verbatim next to the summary
+    MAX_HISTORY_TOKENS: int = 2000  # Estimated tokens of history per prompt (0 = none)
+
+    # Tool loop settings
+    MAX_TOOL_ROUNDS: int = 2  # Rounds of tool calls before Claude must answer
+    TOOL_LOOP_TIME_BUDGET: float = 30.0  # Seconds before tools are withdrawn (0 = none)
+    TOOL_LOOP_TOKEN_BUDGET: int = 20000  # Tokens before tools are withdrawn (0 = none)
+
+    # Retrieval settings
+    SEARCH_MODE: str = "vector"  # "vector", or "hybrid" to fuse in BM25 results
+    HYBRID_CANDIDATES: int = 20  # Hits taken from each retriever before fusion
+    RRF_K: int = 60  # Reciprocal-rank fusion constant
+    # Re-order RERANK_CANDIDATES retrieved chunks with a local cross-encoder and
+    # keep the best MAX_RESULTS; skipped when scoring would exceed RERANK_BUDGET
+    RERANK_ENABLED: bool = False
+    RERANK_MODEL: str = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+    RERANK_CANDIDATES: int = 20
+    RERANK_BATCH_SIZE: int = 32  # Pairs per forward pass of the cross-encoder
+    RERANK_CACHE_SIZE: int = 4096  # (query, chunk ID) scores kept in the LRU cache
+    RERANK_BUDGET: float = 0.25  # Seconds of scoring allowed per search batch
+
+    # Vector storage settings
+    # "chroma", or "memmap" for the memory-mapped NumPy index under CHROMA_PATH
+    VECTOR_BACKEND: str = os.getenv("VECTOR_BACKEND", "chroma")
+    IVF_LISTS: int = 0  # k-means lists of the memmap index (0 = exact search)
+    IVF_PROBES: int = 8  # Lists scanned per query when IVF_LISTS is set
+    # "none", or "int8" / "binary" codes searched by the memmap backend, whose
+    # best QUANTIZATION_OVERSAMPLE * results are re-ranked with float32 vectors
+    EMBEDDING_QUANTIZATION: str = "none"
+    QUANTIZATION_OVERSAMPLE: int = 4
+    # Memory for per-course partitions that answer course-scoped ChromaDB
+    # searches without a metadata filter (0 = off; memmap indexes courses itself)
+    PARTITION_CACHE_BYTES: int = 64 * 1024 * 1024
+
+    # Concurrency settings
+    SEARCH_WORKERS: int = 4  # Threads for blocking embedding/search work
+    TOOL_WORKERS: int = 4  # Threads running the tool calls of one response
+    TOOL_TIMEOUT: float = 10.0  # Seconds before a tool call is abandoned (0 = none)
+
+    # Ingestion settings
+    INGEST_WORKERS: int = 4  # Processes parsing and chunking documents
+    EMBEDDING_BATCH_SIZE: int = 256  # Minimum chunks per embedding model call
+    INGEST_MANIFEST_PATH: str = "./chroma_db/ingest_manifest.json"  # File hashes
+
+    # Session settings
+    # "memory", or "sqlite" to share conversations across workers
+    SESSION_BACKEND: str = os.getenv("SESSION_BACKEND", "memory")
+    SESSION_DB_PATH: str = "./chroma_db/sessions.sqlite3"  # Used by "sqlite"
+    SESSION_TTL: int = 24 * 3600  # Seconds before an idle session expires (0 = never)
+    MAX_SESSIONS: int = 10000  # LRU bound on stored sessions (0 = unbounded)
+    SESSION_MAX_BYTES: int = 64 * 1024 * 1024  # Memory bound for "memory" (0 = none)
+
+    # Semantic answer cache settings
+    ANSWER_CACHE_ENABLED: bool = False  # Reuse answers for near-identical queries
+    ANSWER_CACHE_THRESHOLD: float = 0.95  # Minimum cosine similarity for a hit
+    ANSWER_CACHE_MAX_ENTRIES: int = 1000  # LRU bound on cached answers
+    ANSWER_CACHE_TTL: int = 3600  # Seconds before a cached answer expires
+    ANSWER_CACHE_MAX_BYTES: int = 16 * 1024 * 1024  # Memory bound for the cache
+
+    # Tracing settings
+    TRACING_ENABLED: bool = False  # Time request stages for /metrics
+    TRACE_EXPORT_PATH: str = ""  # File to append OTLP/JSON traces to ("" = off)
+
     # Database paths
     CHROMA_PATH: str = "./chroma_db"  # ChromaDB storage location
 
@@ -0,0 +1,137 @@
+import difflib
+import re
+import threading
+from collections import Counter
+from typing import Callable, List, Optional, Sequence, Set
+
+import numpy as np
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+# Words too common to show that a question is about a particular course
+_STOPWORDS = frozenset(
+    "about and apps build course for from how into the use what with your".split()
+)
+
+
+def _normalize(text: str) -> str:
+    return " ".join(text.casefold().split())
+
+
+def _tokens(text: str) -> List[str]:
+    return _TOKEN_RE.findall(text.casefold())
+
+
+class CourseResolver:
+    """
+    In-memory index that maps user-supplied course names to catalog titles.
+
+    Lexical tiers run first (exact, prefix, contained tokens, fuzzy tokens); a
+    tier with several candidates is broken by cosine similarity, and a name no
+    tier matches falls back to cosine over all title embeddings, held as a
+    row-normalized NumPy matrix.
+    """
+
+    def __init__(self, embed: Callable[[str], Sequence[float]], fuzzy_cutoff=0.8):
+        self.embed = embed
+        self.fuzzy_cutoff = fuzzy_cutoff
+
+        self._titles: List[str] = []
+        self._normalized: List[str] = []
+        self._title_tokens: List[List[str]] = []
+        self._distinctive: List[Set[str]] = []
+        self._matrix = np.zeros((0, 0), dtype=np.float32)
+        self._lock = threading.Lock()
+
+    def rebuild(self, titles: List[str], embeddings):
+        """Replace the index with the given titles and their embeddings"""
+        if titles:
+            matrix = np.asarray(embeddings, dtype=np.float32).reshape(len(titles), -1)
+        else:
+            matrix = np.zeros((0, 0), dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        matrix = matrix / np.where(norms == 0, 1, norms)
+
+        # Words of a title that no other title shares, for mentioned_titles()
+        title_tokens = [_tokens(title) for title in titles]
+        counts = Counter(token for tokens in title_tokens for token in set(tokens))
+        distinctive = [
+            {
+                token
+                for token in tokens
+                if counts[token] == 1
+                and len(token) > 2
+                and not token.isdigit()
+                and token not in _STOPWORDS
+            }
+            for tokens in title_tokens
+        ]
+
+        with self._lock:
+            self._titles = list(titles)
+            self._normalized = [_normalize(title) for title in titles]
+            self._title_tokens = title_tokens
+            self._distinctive = distinctive
+            self._matrix = matrix
+
+    def __len__(self) -> int:
+        return len(self._titles)
+
+    def resolve(self, course_name: str) -> Optional[str]:
+        """Return the catalog title that best matches a course name"""
+        with self._lock:
+            titles = self._titles
+            normalized = self._normalized
+            title_tokens = self._title_tokens
+            matrix = self._matrix
+
+        if not titles:
+            return None
+
+        name = _normalize(course_name)
+        name_tokens = _tokens(course_name)
+
+        tiers = (
+            lambda i: normalized[i] == name,
+            lambda i: normalized[i].startswith(name),
+            lambda i: bool(name_tokens)
+            and all(token in title_tokens[i] for token in name_tokens),
+            lambda i: bool(name_tokens)
+            and all(
+                difflib.get_close_matches(token, title_tokens[i], 1, self.fuzzy_cutoff)
+                for token in name_tokens
+            ),
+        )
+        for matches in tiers:
+            candidates = [i for i in range(len(titles)) if matches(i)]
+            if len(candidates) == 1:
+                return titles[candidates[0]]
+            if candidates:
+                return titles[self._nearest(course_name, matrix, candidates)]
+
+        # No lexical match, fall back to semantic similarity over all titles
+        return titles[self._nearest(course_name, matrix, range(len(titles)))]
+
+    def mentioned_titles(self, text: str) -> List[str]:
+        """
+        Return the catalog titles a free-form question names, in catalog order.
+
+        A title is named when the text contains one of its distinctive words,
+        such as "MCP" or "Chroma"; nothing is embedded.
+        """
+        with self._lock:
+            titles = self._titles
+            distinctive = self._distinctive
+
+        words = set(_tokens(text))
+        return [title for title, tokens in zip(titles, distinctive) if tokens & words]
+
+    def _nearest(self, course_name: str, matrix: np.ndarray, candidates) -> int:
+        """Index of the candidate title closest to the name by cosine similarity"""
+        candidates = list(candidates)
+        vector = np.asarray(self.embed(course_name), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        if norm:
+            vector = vector / norm
+        scores = matrix[candidates] @ vector
+        return candidates[int(np.argmax(scores))]
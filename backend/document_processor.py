@@ -1,6 +1,9 @@
+import codecs
 import os
 import re
-from typing import List, Tuple
+from bisect import bisect_left, bisect_right
+from itertools import accumulate, chain, islice
+from typing import Iterator, List, Optional, Tuple
 
 from models import Course, CourseChunk, Lesson
 
@@ -8,6 +11,22 @@ from models import Course, CourseChunk, Lesson
 class DocumentProcessor:
     """Processes course documents and extracts structured information"""
 
+    # Better sentence splitting that handles abbreviations
+    # This regex looks for periods followed by whitespace and capital letters
+    # but ignores common abbreviations. It runs on whitespace-normalized text,
+    # so the boundary is a single space; starting the pattern with that literal
+    # space lets the regex engine skip quickly between candidates.
+    _SENTENCE_ENDINGS = re.compile(
+        r" (?<=[.!?] )(?<!\w\.\w. )(?<![A-Z][a-z]\. )(?=[A-Z])"
+    )
+
+    # Course document format
+    _COURSE_TITLE = re.compile(r"^Course Title:\s*(.+)$", re.IGNORECASE)
+    _COURSE_LINK = re.compile(r"^Course Link:\s*(.+)$", re.IGNORECASE)
+    _COURSE_INSTRUCTOR = re.compile(r"^Course Instructor:\s*(.+)$", re.IGNORECASE)
+    _LESSON_MARKER = re.compile(r"^Lesson\s+(\d+):\s*(.+)$", re.IGNORECASE)
+    _LESSON_LINK = re.compile(r"^Lesson Link:\s*(.+)$", re.IGNORECASE)
+
     def __init__(self, chunk_size: int, chunk_overlap: int):
         self.chunk_size = chunk_size
         self.chunk_overlap = chunk_overlap
@@ -24,75 +43,48 @@ class DocumentProcessor:
 
     def chunk_text(self, text: str) -> List[str]:
         """Split text into sentence-based chunks with overlap using config settings"""
+        return list(self.iter_chunks(text))
+
+    def iter_chunks(self, text: str) -> Iterator[str]:
+        """
+        Lazily yield sentence-based chunks with overlap.
 
+        Each chunk greedily packs whole sentences up to chunk_size characters
+        (a single longer sentence becomes its own chunk), and the next chunk
+        starts with as many trailing sentences as fit in chunk_overlap. Chunk
+        boundaries are found by binary search over prefix sums of the sentence
+        lengths, so the work is linear in the text plus the output.
+        """
         # Clean up the text
-        text = re.sub(r"\s+", " ", text.strip())  # Normalize whitespace
+        text = " ".join(text.split())  # Normalize whitespace
 
-        # Better sentence splitting that handles abbreviations
-        # This regex looks for periods followed by whitespace and capital letters
-        # but ignores common abbreviations
-        sentence_endings = re.compile(
-            r"(?<!\w\.\w.)(?<![A-Z][a-z]\.)(?<=\.|\!|\?)\s+(?=[A-Z])"
-        )
-        sentences = sentence_endings.split(text)
+        sentences = [s.strip() for s in self._SENTENCE_ENDINGS.split(text)]
+        sentences = [s for s in sentences if s]
+        if not sentences:
+            return
 
-        # Clean sentences
-        sentences = [s.strip() for s in sentences if s.strip()]
+        # offsets[k] is the length of sentences[:k] joined by single spaces,
+        # plus one trailing space, so sentences[i:e] joined is
+        # offsets[e] - offsets[i] - 1 characters long
+        offsets = [0]
+        offsets.extend(accumulate(len(sentence) + 1 for sentence in sentences))
+        count = len(sentences)
+        overlap = self.chunk_overlap
 
-        chunks = []
         i = 0
-
-        while i < len(sentences):
-            current_chunk = []
-            current_size = 0
-
-            # Build chunk starting from sentence i
-            for j in range(i, len(sentences)):
-                sentence = sentences[j]
-
-                # Calculate size with space
-                space_size = 1 if current_chunk else 0
-                total_addition = len(sentence) + space_size
-
-                # Check if adding this sentence would exceed chunk size
-                if current_size + total_addition > self.chunk_size and current_chunk:
-                    break
-
-                current_chunk.append(sentence)
-                current_size += total_addition
-
-            # Add chunk if we have content
-            if current_chunk:
-                chunks.append(" ".join(current_chunk))
-
-                # Calculate overlap for next chunk
-                if hasattr(self, "chunk_overlap") and self.chunk_overlap > 0:
-                    # Find how many sentences to overlap
-                    overlap_size = 0
-                    overlap_sentences = 0
-
-                    # Count backwards from end of current chunk
-                    for k in range(len(current_chunk) - 1, -1, -1):
-                        sentence_len = len(current_chunk[k]) + (
-                            1 if k < len(current_chunk) - 1 else 0
-                        )
-                        if overlap_size + sentence_len <= self.chunk_overlap:
-                            overlap_size += sentence_len
-                            overlap_sentences += 1
-                        else:
-                            break
-
-                    # Move start position considering overlap
-                    next_start = i + len(current_chunk) - overlap_sentences
-                    i = max(next_start, i + 1)  # Ensure we make progress
-                else:
-                    # No overlap - move to next sentence after current chunk
-                    i += len(current_chunk)
+        while i < count:
+            # Take as many sentences as fit, but always at least one
+            limit = offsets[i] + self.chunk_size + 1
+            end = max(bisect_right(offsets, limit, i + 1, count + 1) - 1, i + 1)
+            yield " ".join(sentences[i:end])
+
+            if overlap > 0:
+                # The next chunk restarts at the earliest sentence whose tail
+                # of the current chunk still fits in the overlap
+                start = bisect_left(offsets, offsets[end] - 1 - overlap, i, end)
+                i = max(start, i + 1)  # Ensure we make progress
             else:
-                # No sentences fit, move to next
-                i += 1
-
-        return chunks
+                i = end
 
     def process_course_document(
         self, file_path: str
@@ -104,11 +96,68 @@ class DocumentProcessor:
         Line 3: Course Instructor: [instructor]
         Following lines: Lesson markers and content
         """
-        content = self.read_file(file_path)
-        filename = os.path.basename(file_path)
+        course, lessons = self.iter_course_document(file_path)
+        course_chunks = [chunk for chunks in lessons for chunk in chunks]
+        return course, course_chunks
+
+    def iter_course_document(
+        self, file_path: str
+    ) -> Tuple[Course, Iterator[List[CourseChunk]]]:
+        """
+        Parse a course document lazily, one lesson at a time.
 
-        lines = content.strip().split("\n")
+        The metadata header is read immediately. The returned iterator reads
+        the rest of the file line by line and yields each lesson's chunks once
+        the next lesson marker or the end of the file is reached, appending
+        the lesson to course.lessons, so only one lesson is held in memory.
 
+        Returns:
+            Tuple of (Course object, iterator over each lesson's chunks)
+        """
+        lines = self._iter_lines(file_path)
+        header = list(islice(lines, 4))
+        course = self._parse_course_header(os.path.basename(file_path), header)
+
+        # Content starts at line 4 (after metadata), or line 5 if line 4 is empty
+        body = header[3:] if len(header) > 3 and header[3].strip() else []
+        return course, self._iter_lesson_chunks(course, chain(body, lines))
+
+    def _iter_lines(self, file_path: str) -> Iterator[str]:
+        """
+        Yield the lines of a file without their line endings.
+
+        Leading blank lines and indentation are dropped like the strip() of a
+        whole file would. Files that are not valid UTF-8 are decoded with
+        errors ignored, as in read_file.
+        """
+        errors = "strict" if self._is_valid_utf8(file_path) else "ignore"
+        with open(file_path, "r", encoding="utf-8", errors=errors) as file:
+            started = False
+            for line in file:
+                if line.endswith("\n"):
+                    line = line[:-1]
+                if not started:
+                    if not line.strip():
+                        continue
+                    line = line.lstrip()
+                    started = True
+                yield line
+
+    @staticmethod
+    def _is_valid_utf8(file_path: str) -> bool:
+        """Check a file decodes as UTF-8 without reading it into memory"""
+        decoder = codecs.getincrementaldecoder("utf-8")()
+        try:
+            with open(file_path, "rb") as file:
+                for block in iter(lambda: file.read(1 << 20), b""):
+                    decoder.decode(block)
+            decoder.decode(b"", final=True)
+        except UnicodeDecodeError:
+            return False
+        return True
+
+    def _parse_course_header(self, filename: str, lines: List[str]) -> Course:
+        """Build the Course from the first four lines of a document"""
         # Extract course metadata from first three lines
         course_title = filename  # Default fallback
         course_link = None
@@ -116,9 +165,7 @@ class DocumentProcessor:
 
         # Parse course title from first line
         if len(lines) >= 1 and lines[0].strip():
-            title_match = re.match(
-                r"^Course Title:\s*(.+)$", lines[0].strip(), re.IGNORECASE
-            )
+            title_match = self._COURSE_TITLE.match(lines[0].strip())
             if title_match:
                 course_title = title_match.group(1).strip()
             else:
@@ -131,141 +178,154 @@ class DocumentProcessor:
                 continue
 
             # Try to match course link
-            link_match = re.match(r"^Course Link:\s*(.+)$", line, re.IGNORECASE)
+            link_match = self._COURSE_LINK.match(line)
             if link_match:
                 course_link = link_match.group(1).strip()
                 continue
 
             # Try to match instructor
-            instructor_match = re.match(
-                r"^Course Instructor:\s*(.+)$", line, re.IGNORECASE
-            )
+            instructor_match = self._COURSE_INSTRUCTOR.match(line)
             if instructor_match:
                 instructor_name = instructor_match.group(1).strip()
                 continue
 
         # Create course object with title as ID
-        course = Course(
+        return Course(
             title=course_title,
             course_link=course_link,
             instructor=instructor_name if instructor_name != "Unknown" else None,
         )
 
-        # Process lessons and create chunks
-        course_chunks = []
+    def _iter_lesson_chunks(
+        self, course: Course, lines: Iterator[str]
+    ) -> Iterator[List[CourseChunk]]:
+        """Group content lines into lessons and yield each lesson's chunks"""
         current_lesson = None
         lesson_title = None
         lesson_link = None
-        lesson_content = []
+        lesson_content: List[str] = []
         chunk_counter = 0
 
-        # Start processing from line 4 (after metadata)
-        start_index = 3
-        if len(lines) > 3 and not lines[3].strip():
-            start_index = 4  # Skip empty line after instructor
+        # Content lines are kept for the no-lessons fallback until a lesson
+        # produces its first chunk, after which the fallback cannot apply
+        all_content: Optional[List[str]] = []
 
-        i = start_index
-        while i < len(lines):
-            line = lines[i]
+        lines = iter(lines)
+        line = next(lines, None)
+        while line is not None:
+            if all_content is not None:
+                all_content.append(line)
 
             # Check for lesson markers (e.g., "Lesson 0: Introduction")
-            lesson_match = re.match(
-                r"^Lesson\s+(\d+):\s*(.+)$", line.strip(), re.IGNORECASE
-            )
-
-            if lesson_match:
-                # Process previous lesson if it exists
-                if current_lesson is not None and lesson_content:
-                    lesson_text = "\n".join(lesson_content).strip()
-                    if lesson_text:
-                        # Add lesson to course
-                        lesson = Lesson(
-                            lesson_number=current_lesson,
-                            title=lesson_title,
-                            lesson_link=lesson_link,
-                        )
-                        course.lessons.append(lesson)
-
-                        # Create chunks for this lesson
-                        chunks = self.chunk_text(lesson_text)
-                        for idx, chunk in enumerate(chunks):
-                            # For the first chunk of each lesson, add lesson context
-                            if idx == 0:
-                                chunk_with_context = (
-                                    f"Lesson {current_lesson} content: {chunk}"
-                                )
-                            else:
-                                chunk_with_context = chunk
-
-                            course_chunk = CourseChunk(
-                                content=chunk_with_context,
-                                course_title=course.title,
-                                lesson_number=current_lesson,
-                                chunk_index=chunk_counter,
-                            )
-                            course_chunks.append(course_chunk)
-                            chunk_counter += 1
-
-                # Start new lesson
-                current_lesson = int(lesson_match.group(1))
-                lesson_title = lesson_match.group(2).strip()
-                lesson_link = None
-
-                # Check if next line is a lesson link
-                if i + 1 < len(lines):
-                    next_line = lines[i + 1].strip()
-                    link_match = re.match(
-                        r"^Lesson Link:\s*(.+)$", next_line, re.IGNORECASE
-                    )
-                    if link_match:
-                        lesson_link = link_match.group(1).strip()
-                        i += 1  # Skip the link line so it's not added to content
-
-                lesson_content = []
-            else:
+            lesson_match = self._LESSON_MARKER.match(line.strip())
+            if not lesson_match:
                 # Add line to current lesson content
                 lesson_content.append(line)
+                line = next(lines, None)
+                continue
 
-            i += 1
+            # Process previous lesson if it exists
+            if current_lesson is not None and lesson_content:
+                chunks = self._lesson_chunks(
+                    course,
+                    Lesson(
+                        lesson_number=current_lesson,
+                        title=lesson_title,
+                        lesson_link=lesson_link,
+                    ),
+                    lesson_content,
+                    chunk_counter,
+                    is_last=False,
+                )
+                if chunks:
+                    chunk_counter += len(chunks)
+                    all_content = None
+                    yield chunks
+
+            # Start new lesson
+            current_lesson = int(lesson_match.group(1))
+            lesson_title = lesson_match.group(2).strip()
+            lesson_link = None
+            lesson_content = []
+
+            # Check if next line is a lesson link
+            line = next(lines, None)
+            if line is not None:
+                link_match = self._LESSON_LINK.match(line.strip())
+                if link_match:
+                    lesson_link = link_match.group(1).strip()
+                    if all_content is not None:
+                        all_content.append(line)
+                    # Skip the link line so it's not added to content
+                    line = next(lines, None)
 
         # Process the last lesson
         if current_lesson is not None and lesson_content:
-            lesson_text = "\n".join(lesson_content).strip()
-            if lesson_text:
-                lesson = Lesson(
+            chunks = self._lesson_chunks(
+                course,
+                Lesson(
                     lesson_number=current_lesson,
                     title=lesson_title,
                     lesson_link=lesson_link,
-                )
-                course.lessons.append(lesson)
-
-                chunks = self.chunk_text(lesson_text)
-                for idx, chunk in enumerate(chunks):
-                    # For any chunk of each lesson, add lesson context & course title
-
-                    chunk_with_context = f"Course {course_title} Lesson {current_lesson} content: {chunk}"
-
-                    course_chunk = CourseChunk(
-                        content=chunk_with_context,
-                        course_title=course.title,
-                        lesson_number=current_lesson,
-                        chunk_index=chunk_counter,
-                    )
-                    course_chunks.append(course_chunk)
-                    chunk_counter += 1
+                ),
+                lesson_content,
+                chunk_counter,
+                is_last=True,
+            )
+            if chunks:
+                chunk_counter += len(chunks)
+                yield chunks
 
         # If no lessons found, treat entire content as one document
-        if not course_chunks and len(lines) > 2:
-            remaining_content = "\n".join(lines[start_index:]).strip()
+        if not chunk_counter and all_content:
+            remaining_content = "\n".join(all_content).strip()
             if remaining_content:
-                chunks = self.chunk_text(remaining_content)
-                for chunk in chunks:
-                    course_chunk = CourseChunk(
+                yield [
+                    CourseChunk(
                         content=chunk,
                         course_title=course.title,
-                        chunk_index=chunk_counter,
+                        chunk_index=index,
                     )
-                    course_chunks.append(course_chunk)
-                    chunk_counter += 1
-
-        return course, course_chunks
+                    for index, chunk in enumerate(self.iter_chunks(remaining_content))
+                ]
+
+    def _lesson_chunks(
+        self,
+        course: Course,
+        lesson: Lesson,
+        lesson_content: List[str],
+        chunk_counter: int,
+        is_last: bool,
+    ) -> List[CourseChunk]:
+        """Add a lesson to the course and chunk its content"""
+        lesson_text = "\n".join(lesson_content).strip()
+        if not lesson_text:
+            return []
+
+        # Add lesson to course
+        course.lessons.append(lesson)
+
+        # Create chunks for this lesson
+        course_chunks = []
+        for idx, chunk in enumerate(self.iter_chunks(lesson_text)):
+            if is_last:
+                # For any chunk of the last lesson, add lesson context & course title
+                chunk_with_context = (
+                    f"Course {course.title} Lesson {lesson.lesson_number} "
+                    f"content: {chunk}"
+                )
+            elif idx == 0:
+                # For the first chunk of each lesson, add lesson context
+                chunk_with_context = f"Lesson {lesson.lesson_number} content: {chunk}"
+            else:
+                chunk_with_context = chunk
+
+            course_chunks.append(
+                CourseChunk(
+                    content=chunk_with_context,
+                    course_title=course.title,
+                    lesson_number=lesson.lesson_number,
+                    chunk_index=chunk_counter + idx,
+                )
+            )
+        return course_chunks
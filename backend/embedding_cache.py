@@ -0,0 +1,133 @@
+import os
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+
+class CachedEmbeddingFunction:
+    """
+    Bounded LRU cache in front of an embedding function.
+
+    Texts are keyed by a normalized form (Unicode NFC, collapsed whitespace) so
+    trivially different spellings of the same query share one vector. The cache
+    can be persisted to an .npz file and reloaded on startup.
+    """
+
+    def __init__(
+        self,
+        embedding_function: Callable[[List[str]], List[Any]],
+        max_entries: int = 4096,
+        persist_path: Optional[str] = None,
+        model_name: str = "",
+    ):
+        self.embedding_function = embedding_function
+        self.max_entries = max_entries
+        self.persist_path = persist_path
+        self.model_name = model_name
+
+        self._vectors: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        # Counters
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        if persist_path:
+            self._load()
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        """Normalize text into a cache key"""
+        return unicodedata.normalize("NFC", " ".join(text.split()))
+
+    def __call__(self, texts: List[str]) -> List[np.ndarray]:
+        """Embed texts, computing only the ones not already cached"""
+        keys = [self.normalize(text) for text in texts]
+        results: Dict[str, np.ndarray] = {}
+
+        with self._lock:
+            for key in keys:
+                vector = self._vectors.get(key)
+                if vector is not None:
+                    self._vectors.move_to_end(key)
+                    results[key] = vector
+                    self.hits += 1
+
+        missing = [key for key in dict.fromkeys(keys) if key not in results]
+        if missing:
+            with self._lock:
+                self.misses += len(missing)
+
+            # Embed all misses in a single model call, outside the lock
+            vectors = self.embedding_function(missing)
+            with self._lock:
+                for key, vector in zip(missing, vectors):
+                    vector = np.asarray(vector, dtype=np.float32)
+                    results[key] = vector
+                    self._vectors[key] = vector
+                    self._vectors.move_to_end(key)
+                while len(self._vectors) > self.max_entries:
+                    self._vectors.popitem(last=False)
+                    self.evictions += 1
+
+        return [results[key] for key in keys]
+
+    def stats(self) -> Dict[str, Any]:
+        """Get cache size and hit/miss counters"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._vectors),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+            }
+
+    def save(self):
+        """Persist cached vectors to persist_path, if configured"""
+        if not self.persist_path:
+            return
+
+        with self._lock:
+            keys = list(self._vectors.keys())
+            vectors = list(self._vectors.values())
+
+        if not keys:
+            return
+
+        directory = os.path.dirname(self.persist_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        # Write to a temp file first so a crash never leaves a truncated cache
+        tmp_path = f"{self.persist_path}.tmp.npz"
+        np.savez(
+            tmp_path,
+            model=np.array(self.model_name),
+            keys=np.array(keys),
+            vectors=np.stack(vectors),
+        )
+        os.replace(tmp_path, self.persist_path)
+
+    def _load(self):
+        """Load persisted vectors written by save() for the same model"""
+        if not os.path.exists(self.persist_path):
+            return
+
+        try:
+            with np.load(self.persist_path, allow_pickle=False) as data:
+                if str(data["model"]) != self.model_name:
+                    return
+                keys = data["keys"].tolist()[-self.max_entries :]
+                vectors = data["vectors"][-self.max_entries :]
+        except Exception as e:
+            print(f"Error loading embedding cache: {e}")
+            return
+
+        for key, vector in zip(keys, vectors):
+            self._vectors[key] = np.array(vector, dtype=np.float32)
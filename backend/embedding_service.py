@@ -0,0 +1,252 @@
+"""
+Lazy and shared SentenceTransformer embeddings.
+
+Run as a script to start one embedding service process that several app
+workers share over a Unix socket, instead of each loading its own model:
+
+    python embedding_service.py --socket /tmp/rag-embeddings.sock
+
+and point the workers at it with EMBEDDING_SERVICE_SOCKET.
+"""
+
+import argparse
+import json
+import os
+import socket
+import socketserver
+import struct
+import threading
+import time
+from typing import Any, Dict, List
+
+import numpy as np
+from chromadb.utils.embedding_functions import SentenceTransformerEmbeddingFunction
+
+# Each message is a 4-byte big-endian length followed by the payload
+_LENGTH = struct.Struct("!I")
+
+
+def _send_message(sock: socket.socket, payload: bytes):
+    sock.sendall(_LENGTH.pack(len(payload)) + payload)
+
+
+def _recv_exact(sock: socket.socket, size: int) -> bytes:
+    buffer = bytearray()
+    while len(buffer) < size:
+        block = sock.recv(size - len(buffer))
+        if not block:
+            raise ConnectionError("Connection closed mid-message")
+        buffer += block
+    return bytes(buffer)
+
+
+def _recv_message(sock: socket.socket) -> bytes:
+    (size,) = _LENGTH.unpack(_recv_exact(sock, _LENGTH.size))
+    return _recv_exact(sock, size)
+
+
+class LazySentenceTransformerEmbeddingFunction(SentenceTransformerEmbeddingFunction):
+    """
+    SentenceTransformer embedding function that loads its model on first use.
+
+    Chroma identifies it exactly like SentenceTransformerEmbeddingFunction, so
+    existing collections open unchanged. Loaded models are shared per process
+    through the parent class's model registry.
+    """
+
+    _load_lock = threading.Lock()
+
+    def __init__(
+        self,
+        model_name: str = "all-MiniLM-L6-v2",
+        device: str = "cpu",
+        normalize_embeddings: bool = False,
+        **kwargs: Any,
+    ):
+        # The parent constructor imports torch and loads the model; defer both
+        self.model_name = model_name
+        self.device = device
+        self.normalize_embeddings = normalize_embeddings
+        for key, value in kwargs.items():
+            if not isinstance(value, (str, int, float, bool, list, dict, tuple)):
+                raise ValueError(f"Keyword argument {key} is not a primitive type")
+        self.kwargs = kwargs
+
+    @property
+    def is_loaded(self) -> bool:
+        return self.model_name in self.models
+
+    @property
+    def _model(self):
+        model = self.models.get(self.model_name)
+        if model is None:
+            with self._load_lock:
+                model = self.models.get(self.model_name)
+                if model is None:
+                    from sentence_transformers import SentenceTransformer
+
+                    model = SentenceTransformer(
+                        model_name_or_path=self.model_name,
+                        device=self.device,
+                        **self.kwargs,
+                    )
+                    self.models[self.model_name] = model
+        return model
+
+    @staticmethod
+    def build_from_config(
+        config: Dict[str, Any],
+    ) -> "LazySentenceTransformerEmbeddingFunction":
+        return LazySentenceTransformerEmbeddingFunction(
+            model_name=config["model_name"],
+            device=config["device"],
+            normalize_embeddings=config["normalize_embeddings"],
+            **config.get("kwargs", {}),
+        )
+
+
+class EmbeddingServiceClient(LazySentenceTransformerEmbeddingFunction):
+    """
+    Embedding function that delegates to a shared embedding service.
+
+    Keeps one connection per thread. If the service cannot be reached, or
+    does not answer within timeout seconds, the model is loaded in-process
+    instead, so a missing service degrades to the behaviour of
+    LazySentenceTransformerEmbeddingFunction. The service is tried again
+    retry_after seconds later.
+    """
+
+    def __init__(
+        self,
+        socket_path: str,
+        model_name: str = "all-MiniLM-L6-v2",
+        timeout: float = 30.0,
+        retry_after: float = 30.0,
+        **kwargs,
+    ):
+        super().__init__(model_name, **kwargs)
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self.retry_after = retry_after
+        self._retry_at = 0.0
+        self._local = threading.local()
+
+    @property
+    def use_local_model(self) -> bool:
+        """Whether embeddings are computed in-process until the next retry"""
+        return time.monotonic() < self._retry_at
+
+    def __call__(self, input: List[str]) -> List[np.ndarray]:
+        texts = list(input)
+        if not self.use_local_model:
+            # Retry once on a fresh connection, e.g. after a service restart
+            for _ in range(2):
+                try:
+                    return self._embed_remote(texts)
+                except OSError as e:
+                    self._close()
+                    error = e
+            print(
+                f"Embedding service unavailable ({error}), using the local model "
+                f"for {self.retry_after:g}s"
+            )
+            self._retry_at = time.monotonic() + self.retry_after
+        return super().__call__(texts)
+
+    def _embed_remote(self, texts: List[str]) -> List[np.ndarray]:
+        sock = getattr(self._local, "sock", None)
+        if sock is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout or None)
+            sock.connect(self.socket_path)
+            self._local.sock = sock
+
+        request = {"model": self.model_name, "texts": texts}
+        _send_message(sock, json.dumps(request).encode("utf-8"))
+        header = json.loads(_recv_message(sock))
+        if "error" in header:
+            raise RuntimeError(f"Embedding service error: {header['error']}")
+
+        vectors = np.frombuffer(_recv_message(sock), dtype=np.float32)
+        return list(vectors.reshape(header["shape"]))
+
+    def _close(self):
+        sock = getattr(self._local, "sock", None)
+        if sock is not None:
+            sock.close()
+            self._local.sock = None
+
+
+class _EmbeddingRequestHandler(socketserver.BaseRequestHandler):
+    """Serve embedding requests on one client connection until it closes"""
+
+    def handle(self):
+        service = self.server
+        while True:
+            try:
+                request = json.loads(_recv_message(self.request))
+            except (ConnectionError, OSError):
+                return
+
+            if request.get("model") != service.model_name:
+                header = {"error": f"Service runs model {service.model_name}"}
+                _send_message(self.request, json.dumps(header).encode("utf-8"))
+                continue
+
+            # One encode at a time: the model already uses every core
+            try:
+                with service.encode_lock:
+                    vectors = service.embedding_function(request["texts"])
+                matrix = np.asarray(vectors, dtype=np.float32).reshape(
+                    len(request["texts"]), -1
+                )
+            except Exception as e:
+                header = {"error": f"Encoding failed: {e}"}
+                _send_message(self.request, json.dumps(header).encode("utf-8"))
+                continue
+            header = {"shape": list(matrix.shape)}
+            _send_message(self.request, json.dumps(header).encode("utf-8"))
+            _send_message(self.request, matrix.tobytes())
+
+
+class EmbeddingService(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Unix socket server holding the single model shared by all app workers"""
+
+    daemon_threads = True
+
+    def __init__(self, socket_path: str, model_name: str):
+        self.model_name = model_name
+        self.embedding_function = LazySentenceTransformerEmbeddingFunction(model_name)
+        self.encode_lock = threading.Lock()
+
+        # A socket file left behind by a previous run would block bind()
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        super().__init__(socket_path, _EmbeddingRequestHandler)
+
+
+def main():
+    from config import config
+
+    parser = argparse.ArgumentParser(description="Shared embedding service")
+    parser.add_argument(
+        "--socket",
+        default=config.EMBEDDING_SERVICE_SOCKET or "/tmp/rag-embeddings.sock",
+        help="Unix socket path to listen on",
+    )
+    parser.add_argument("--model", default=config.EMBEDDING_MODEL)
+    args = parser.parse_args()
+
+    service = EmbeddingService(args.socket, args.model)
+    print(f"Loading {args.model}...")
+    service.embedding_function(["warm up"])
+    print(f"Embedding service listening on {args.socket}")
+    try:
+        service.serve_forever()
+    finally:
+        service.server_close()
+        os.unlink(args.socket)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+import hashlib
+import json
+import os
+import threading
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List, Optional
+
+
+@dataclass
+class ManifestEntry:
+    """What was indexed for one source file"""
+
+    size: int
+    mtime_ns: int
+    sha256: str
+    course_title: str
+    chunk_ids: List[str] = field(default_factory=list)
+
+
+class IngestManifest:
+    """
+    Persistent record of ingested files, used to skip unchanged ones.
+
+    Entries are keyed by absolute file path and stored as JSON. A file whose
+    size and mtime match its entry is treated as unchanged without being read;
+    otherwise its content hash decides.
+    """
+
+    def __init__(self, path: Optional[str]):
+        self.path = path
+        self.entries: Dict[str, ManifestEntry] = {}
+        self._lock = threading.Lock()
+        self.load()
+
+    @staticmethod
+    def key(file_path: str) -> str:
+        """Manifest key for a file path"""
+        return os.path.realpath(file_path)
+
+    @staticmethod
+    def file_hash(file_path: str) -> str:
+        """SHA-256 of a file's contents, read in blocks"""
+        digest = hashlib.sha256()
+        with open(file_path, "rb") as file:
+            for block in iter(lambda: file.read(1 << 20), b""):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def get(self, file_path: str) -> Optional[ManifestEntry]:
+        return self.entries.get(self.key(file_path))
+
+    def is_unchanged(self, file_path: str) -> bool:
+        """
+        Check whether a file still matches its entry.
+
+        Files whose size/mtime changed but whose content did not are refreshed
+        in place so the next check is stat-only again.
+        """
+        entry = self.get(file_path)
+        if entry is None:
+            return False
+
+        stat = os.stat(file_path)
+        if stat.st_size == entry.size and stat.st_mtime_ns == entry.mtime_ns:
+            return True
+
+        if stat.st_size == entry.size and self.file_hash(file_path) == entry.sha256:
+            with self._lock:
+                entry.mtime_ns = stat.st_mtime_ns
+            return True
+
+        return False
+
+    def record(self, file_path: str, course_title: str, chunk_ids: List[str]):
+        """Record a file as indexed with the given course title and chunks"""
+        stat = os.stat(file_path)
+        entry = ManifestEntry(
+            size=stat.st_size,
+            mtime_ns=stat.st_mtime_ns,
+            sha256=self.file_hash(file_path),
+            course_title=course_title,
+            chunk_ids=list(chunk_ids),
+        )
+        with self._lock:
+            self.entries[self.key(file_path)] = entry
+
+    def remove(self, file_path: str) -> Optional[ManifestEntry]:
+        with self._lock:
+            return self.entries.pop(self.key(file_path), None)
+
+    def clear(self):
+        with self._lock:
+            self.entries.clear()
+
+    def paths_under(self, folder_path: str) -> List[str]:
+        """Manifest paths located directly in a folder"""
+        folder = self.key(folder_path)
+        return [path for path in self.entries if os.path.dirname(path) == folder]
+
+    def owner_of(self, course_title: str) -> Optional[str]:
+        """Path of the file that produced a course, if any"""
+        for path, entry in self.entries.items():
+            if entry.course_title == course_title:
+                return path
+        return None
+
+    def load(self):
+        """Load entries from disk, starting empty if missing or unreadable"""
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as file:
+                data = json.load(file)
+            self.entries = {
+                path: ManifestEntry(**entry) for path, entry in data["files"].items()
+            }
+        except Exception as e:
+            print(f"Error loading ingest manifest: {e}")
+            self.entries = {}
+
+    def save(self):
+        """Write entries to disk atomically"""
+        if not self.path:
+            return
+
+        with self._lock:
+            data = {
+                "files": {path: asdict(entry) for path, entry in self.entries.items()}
+            }
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            json.dump(data, file)
+        os.replace(tmp_path, self.path)
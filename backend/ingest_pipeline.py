@@ -0,0 +1,383 @@
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+from document_processor import DocumentProcessor
+from models import Course, CourseChunk
+
+# Queue sentinel marking the end of a stage's input
+_DONE = object()
+
+
+def _drain(stage_queue: queue.Queue):
+    """Consume a stage's input up to _DONE so its producer never blocks"""
+    while stage_queue.get() is not _DONE:
+        pass
+
+
+@dataclass
+class IngestProgress:
+    """Live counters for an ingest run, safe to read from other threads"""
+
+    files_total: int = 0
+    files_done: int = 0
+    courses_added: int = 0
+    chunks_embedded: int = 0
+    chunks_written: int = 0
+    errors: int = 0
+    started_at: float = field(default_factory=time.monotonic)
+    finished_at: Optional[float] = None
+
+    @property
+    def elapsed(self) -> float:
+        end = self.finished_at if self.finished_at is not None else time.monotonic()
+        return end - self.started_at
+
+    @property
+    def files_per_second(self) -> float:
+        return self.files_done / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def chunks_per_second(self) -> float:
+        return self.chunks_written / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def eta_seconds(self) -> Optional[float]:
+        """Estimated seconds left, based on the file and chunk throughput so far"""
+        if self.finished_at is not None:
+            return 0.0
+        if not self.files_done:
+            return None
+        eta = (self.files_total - self.files_done) / self.files_per_second
+        if self.chunks_written:
+            # Embedded chunks still waiting for the writer
+            pending = self.chunks_embedded - self.chunks_written
+            eta = max(eta, pending / self.chunks_per_second)
+        return eta
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "files_total": self.files_total,
+            "files_done": self.files_done,
+            "courses_added": self.courses_added,
+            "chunks_embedded": self.chunks_embedded,
+            "chunks_written": self.chunks_written,
+            "errors": self.errors,
+            "elapsed_seconds": round(self.elapsed, 3),
+            "files_per_second": round(self.files_per_second, 3),
+            "chunks_per_second": round(self.chunks_per_second, 3),
+            "eta_seconds": (
+                round(self.eta_seconds, 3) if self.eta_seconds is not None else None
+            ),
+        }
+
+    def summary(self) -> str:
+        return (
+            f"Ingested {self.files_done}/{self.files_total} files: "
+            f"{self.courses_added} courses, {self.chunks_written} chunks in "
+            f"{self.elapsed:.2f}s ({self.files_per_second:.1f} files/s, "
+            f"{self.chunks_per_second:.1f} chunks/s)"
+        )
+
+
+@dataclass
+class _Document:
+    """A parsed document and the changes needed to bring the store up to date"""
+
+    file_path: str
+    course: Course
+    chunk_ids: List[str]  # IDs of every chunk the document now produces
+    new_chunks: List[CourseChunk]  # Chunks that are new or whose text changed
+    stale_ids: List[str]  # Stored chunk IDs the document no longer produces
+    is_new: bool  # Whether the course had no stored chunks
+
+
+def _parse_document(
+    chunk_size: int, chunk_overlap: int, file_path: str
+) -> Tuple[Course, List[CourseChunk]]:
+    """Process pool entry point: parse and chunk one course document"""
+    return DocumentProcessor(chunk_size, chunk_overlap).process_course_document(
+        file_path
+    )
+
+
+class IngestPipeline:
+    """
+    Staged ingestion: parallel parsing, batched embedding, single writer.
+
+    Documents are parsed and chunked in a process pool and diffed against the
+    stored chunks of their course. An embedding thread collects whole documents
+    until a batch holds at least embed_batch_size changed chunks and encodes
+    their titles and chunks in one model call. A writer thread applies each
+    embedded batch in bulk, so ChromaDB only sees one writer.
+    """
+
+    def __init__(
+        self,
+        document_processor: DocumentProcessor,
+        vector_store,
+        parse_workers: int = 4,
+        embed_batch_size: int = 256,
+        progress: Optional[IngestProgress] = None,
+    ):
+        self.document_processor = document_processor
+        self.vector_store = vector_store
+        self.parse_workers = parse_workers
+        self.embed_batch_size = embed_batch_size
+        self.progress = progress or IngestProgress()
+
+    def run(
+        self,
+        file_paths: List[str],
+        skip_titles: Optional[Set[str]] = None,
+        on_indexed: Optional[Callable[[str, Course, List[str]], None]] = None,
+    ) -> IngestProgress:
+        """
+        Ingest files, reconciling each course with what is already stored.
+
+        Only chunks whose text differs from the stored chunk with the same ID
+        are embedded and written; stored chunks the document no longer
+        produces are deleted.
+
+        Args:
+            file_paths: Course documents to ingest
+            skip_titles: Course titles owned by other files, left untouched
+            on_indexed: Called as (file_path, course, chunk_ids) once written
+
+        Returns:
+            The final IngestProgress for the run
+        """
+        seen_titles = set(skip_titles or ())
+        progress = self.progress
+        progress.files_total = len(file_paths)
+        progress.started_at = time.monotonic()
+        progress.finished_at = None
+
+        embed_queue: queue.Queue = queue.Queue(maxsize=4)
+        write_queue: queue.Queue = queue.Queue(maxsize=4)
+        embedder = threading.Thread(
+            target=self._embed_stage,
+            args=(embed_queue, write_queue),
+            name="ingest-embed",
+            daemon=True,
+        )
+        writer = threading.Thread(
+            target=self._write_stage,
+            args=(write_queue, on_indexed),
+            name="ingest-write",
+            daemon=True,
+        )
+        embedder.start()
+        writer.start()
+
+        try:
+            for file_path, course, chunks in self._parse_stage(file_paths):
+                progress.files_done += 1
+                if course is None:
+                    continue
+                if course.title in seen_titles:
+                    print(f"Course already exists: {course.title} - skipping")
+                    continue
+                seen_titles.add(course.title)
+                document = self._reconcile(file_path, course, chunks)
+                if document is not None:
+                    embed_queue.put(document)
+        finally:
+            embed_queue.put(_DONE)
+            embedder.join()
+            writer.join()
+            progress.finished_at = time.monotonic()
+
+        print(progress.summary())
+        return progress
+
+    def _reconcile(
+        self, file_path: str, course: Course, chunks: List[CourseChunk]
+    ) -> Optional[_Document]:
+        """Diff a parsed document against the chunks stored for its course"""
+        try:
+            stored = self.vector_store.get_course_chunk_documents(course.title)
+        except Exception as e:
+            print(f"Error reading stored chunks for {course.title}: {e}")
+            self.progress.errors += 1
+            return None
+
+        chunk_ids = [self.vector_store.chunk_id(chunk) for chunk in chunks]
+        new_chunks = [
+            chunk
+            for chunk, chunk_id in zip(chunks, chunk_ids)
+            if stored.get(chunk_id) != chunk.content
+        ]
+        current_ids = set(chunk_ids)
+        stale_ids = [chunk_id for chunk_id in stored if chunk_id not in current_ids]
+        return _Document(
+            file_path=file_path,
+            course=course,
+            chunk_ids=chunk_ids,
+            new_chunks=new_chunks,
+            stale_ids=stale_ids,
+            is_new=not stored,
+        )
+
+    def _parse_stage(
+        self, file_paths: List[str]
+    ) -> Iterator[Tuple[str, Optional[Course], List[CourseChunk]]]:
+        """Yield (path, course, chunks) of each document in file_paths order"""
+        workers = min(self.parse_workers, len(file_paths), os.cpu_count() or 1)
+        if workers <= 1:
+            for file_path in file_paths:
+                yield file_path, *self._parse_inline(file_path)
+            return
+
+        processor = self.document_processor
+        # Never fork the parent directly: it holds threads and the loaded model
+        method = (
+            "forkserver"
+            if "forkserver" in multiprocessing.get_all_start_methods()
+            else "spawn"
+        )
+        context = multiprocessing.get_context(method)
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+            # Results are taken in submission order, so which of two files
+            # with the same course title is indexed does not depend on timing
+            futures = [
+                (
+                    file_path,
+                    pool.submit(
+                        _parse_document,
+                        processor.chunk_size,
+                        processor.chunk_overlap,
+                        file_path,
+                    ),
+                )
+                for file_path in file_paths
+            ]
+            for file_path, future in futures:
+                try:
+                    course, chunks = future.result()
+                except BrokenProcessPool:
+                    # Workers could not start or died; parse here instead
+                    course, chunks = self._parse_inline(file_path)
+                except Exception as e:
+                    print(f"Error processing {os.path.basename(file_path)}: {e}")
+                    self.progress.errors += 1
+                    course, chunks = None, []
+                yield file_path, course, chunks
+
+    def _parse_inline(
+        self, file_path: str
+    ) -> Tuple[Optional[Course], List[CourseChunk]]:
+        try:
+            return self.document_processor.process_course_document(file_path)
+        except Exception as e:
+            print(f"Error processing {os.path.basename(file_path)}: {e}")
+            self.progress.errors += 1
+            return None, []
+
+    def _embed_stage(self, embed_queue: queue.Queue, write_queue: queue.Queue):
+        """Group whole documents into batches and embed each in one model call"""
+        batch: List[_Document] = []
+        batch_chunks = 0
+        item = None
+
+        try:
+            while True:
+                item = embed_queue.get()
+                if item is not _DONE:
+                    batch.append(item)
+                    batch_chunks += len(item.new_chunks)
+                    if batch_chunks < self.embed_batch_size:
+                        continue
+                if batch:
+                    self._embed_batch(batch, write_queue)
+                    batch, batch_chunks = [], 0
+                if item is _DONE:
+                    break
+        except Exception as e:
+            print(f"Error in embed stage: {e}")
+            self.progress.errors += 1
+            if item is not _DONE:
+                _drain(embed_queue)
+        finally:
+            write_queue.put(_DONE)
+
+    def _embed_batch(self, batch: List[_Document], write_queue: queue.Queue):
+        titles = [document.course.title for document in batch]
+        contents = [
+            chunk.content for document in batch for chunk in document.new_chunks
+        ]
+        try:
+            embeddings = self.vector_store.embed_documents(titles + contents)
+        except Exception as e:
+            print(f"Error embedding batch of {len(titles)} courses: {e}")
+            self.progress.errors += len(titles)
+            return
+
+        self.progress.chunks_embedded += len(contents)
+        write_queue.put((batch, embeddings[: len(titles)], embeddings[len(titles) :]))
+
+    def _write_stage(
+        self,
+        write_queue: queue.Queue,
+        on_indexed: Optional[Callable[[str, Course, List[str]], None]],
+    ):
+        """Single writer: apply each embedded batch to the vector store"""
+        while True:
+            item = write_queue.get()
+            if item is _DONE:
+                break
+            try:
+                self._write_batch(*item, on_indexed)
+            except Exception as e:
+                # Keep consuming, or the embed stage blocks on the full queue
+                print(f"Error in write stage: {e}")
+                self.progress.errors += 1
+
+    def _write_batch(
+        self,
+        batch: List[_Document],
+        title_embeddings: List[Any],
+        content_embeddings: List[Any],
+        on_indexed: Optional[Callable[[str, Course, List[str]], None]],
+    ):
+        """Write one embedded batch and report its courses as indexed"""
+        stale_ids = [chunk_id for document in batch for chunk_id in document.stale_ids]
+        chunks = [chunk for document in batch for chunk in document.new_chunks]
+        try:
+            self.vector_store.delete_chunks(stale_ids)
+            # Content first, so a catalog entry implies its chunks are indexed
+            self.vector_store.add_course_content(chunks, content_embeddings)
+            for document, title_embedding in zip(batch, title_embeddings):
+                self.vector_store.add_course_metadata(document.course, title_embedding)
+        except Exception as e:
+            print(f"Error writing batch of {len(batch)} courses: {e}")
+            self.progress.errors += len(batch)
+            return
+
+        self.progress.courses_added += len(batch)
+        self.progress.chunks_written += len(chunks)
+        for document in batch:
+            course = document.course
+            if document.is_new:
+                print(
+                    f"Added new course: {course.title} "
+                    f"({len(document.chunk_ids)} chunks)"
+                )
+            else:
+                print(
+                    f"Updated course: {course.title} "
+                    f"({len(document.new_chunks)} chunks re-embedded, "
+                    f"{len(document.stale_ids)} removed)"
+                )
+            if on_indexed:
+                try:
+                    on_indexed(document.file_path, course, document.chunk_ids)
+                except Exception as e:
+                    print(f"Error recording {course.title} as indexed: {e}")
+                    self.progress.errors += 1
@@ -1,11 +1,20 @@
+import asyncio
+import contextvars
 import os
-from typing import Dict, List, Optional, Tuple
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 
 from ai_generator import AIGenerator
+from answer_cache import CachedAnswer, SemanticAnswerCache
 from document_processor import DocumentProcessor
+from ingest_manifest import IngestManifest
+from ingest_pipeline import IngestPipeline, IngestProgress
 from models import Course, CourseChunk, Lesson
 from search_tools import CourseSearchTool, ToolManager
-from session_manager import SessionManager
+from session_manager import SessionManager, build_session_store
+from tracing import tracer
 from vector_store import VectorStore
 
 
@@ -14,21 +23,82 @@ class RAGSystem:
 
     def __init__(self, config):
         self.config = config
+        tracer.configure(config.TRACING_ENABLED, config.TRACE_EXPORT_PATH or None)
 
         # Initialize core components
         self.document_processor = DocumentProcessor(
             config.CHUNK_SIZE, config.CHUNK_OVERLAP
         )
         self.vector_store = VectorStore(
-            config.CHROMA_PATH, config.EMBEDDING_MODEL, config.MAX_RESULTS
+            config.CHROMA_PATH,
+            config.EMBEDDING_MODEL,
+            config.MAX_RESULTS,
+            embedding_cache_size=config.EMBEDDING_CACHE_SIZE,
+            embedding_cache_path=config.EMBEDDING_CACHE_PATH or None,
+            embedding_service_socket=config.EMBEDDING_SERVICE_SOCKET or None,
+            embedding_service_timeout=config.EMBEDDING_SERVICE_TIMEOUT,
+            embedding_service_retry=config.EMBEDDING_SERVICE_RETRY,
+            search_mode=config.SEARCH_MODE,
+            hybrid_candidates=config.HYBRID_CANDIDATES,
+            rrf_k=config.RRF_K,
+            backend=config.VECTOR_BACKEND,
+            ivf_lists=config.IVF_LISTS,
+            ivf_probes=config.IVF_PROBES,
+            quantization=config.EMBEDDING_QUANTIZATION,
+            quantization_oversample=config.QUANTIZATION_OVERSAMPLE,
+            partition_cache_bytes=config.PARTITION_CACHE_BYTES,
+            rerank_model=config.RERANK_MODEL if config.RERANK_ENABLED else None,
+            rerank_candidates=config.RERANK_CANDIDATES,
+            rerank_batch_size=config.RERANK_BATCH_SIZE,
+            rerank_cache_size=config.RERANK_CACHE_SIZE,
+            rerank_budget=config.RERANK_BUDGET,
         )
         self.ai_generator = AIGenerator(
-            config.ANTHROPIC_API_KEY, config.ANTHROPIC_MODEL
+            config.ANTHROPIC_API_KEY,
+            config.ANTHROPIC_MODEL,
+            max_tool_rounds=config.MAX_TOOL_ROUNDS,
+            time_budget=config.TOOL_LOOP_TIME_BUDGET or None,
+            token_budget=config.TOOL_LOOP_TOKEN_BUDGET or None,
+        )
+        self.session_manager = SessionManager(
+            config.MAX_HISTORY,
+            store=build_session_store(config),
+            summarizer=(
+                self.ai_generator.summarize_conversation
+                if config.HISTORY_SUMMARY
+                else None
+            ),
+            keep_turns=config.HISTORY_KEEP_TURNS,
+            max_tokens=config.MAX_HISTORY_TOKENS or None,
+        )
+        self.ingest_manifest = IngestManifest(config.INGEST_MANIFEST_PATH or None)
+
+        # Bounded pool for blocking embedding/search work on the async path
+        self.executor = ThreadPoolExecutor(
+            max_workers=config.SEARCH_WORKERS, thread_name_prefix="rag-search"
+        )
+
+        # Cache of answers to semantically near-identical first-turn queries
+        self.answer_cache = (
+            SemanticAnswerCache(
+                threshold=config.ANSWER_CACHE_THRESHOLD,
+                max_entries=config.ANSWER_CACHE_MAX_ENTRIES,
+                ttl_seconds=config.ANSWER_CACHE_TTL,
+                max_bytes=config.ANSWER_CACHE_MAX_BYTES,
+            )
+            if config.ANSWER_CACHE_ENABLED
+            else None
         )
-        self.session_manager = SessionManager(config.MAX_HISTORY)
+
+        # Background indexing state, see start_indexing()
+        self.indexing_progress: Optional[IngestProgress] = None
+        self.indexing_error: Optional[str] = None
+        self._indexing_thread: Optional[threading.Thread] = None
 
         # Initialize search tools
-        self.tool_manager = ToolManager()
+        self.tool_manager = ToolManager(
+            max_workers=config.TOOL_WORKERS, timeout=config.TOOL_TIMEOUT or None
+        )
         self.search_tool = CourseSearchTool(self.vector_store)
         self.tool_manager.register_tool(self.search_tool)
 
@@ -60,62 +130,166 @@ class RAGSystem:
             return None, 0
 
     def add_course_folder(
-        self, folder_path: str, clear_existing: bool = False
+        self,
+        folder_path: str,
+        clear_existing: bool = False,
+        progress: Optional[IngestProgress] = None,
     ) -> Tuple[int, int]:
         """
         Add all course documents from a folder.
 
+        Files recorded in the ingest manifest with unchanged content are skipped
+        without being parsed, edited files only re-embed the chunks that
+        changed, and courses whose source files were removed are deleted.
+
         Args:
             folder_path: Path to folder containing course documents
             clear_existing: Whether to clear existing data first
+            progress: Optional IngestProgress to update while ingesting
 
         Returns:
-            Tuple of (total courses added, total chunks created)
+            Tuple of (total courses added or updated, total chunks written)
         """
-        total_courses = 0
-        total_chunks = 0
+        manifest = self.ingest_manifest
 
         # Clear existing data if requested
         if clear_existing:
             print("Clearing existing data for fresh rebuild...")
             self.vector_store.clear_all_data()
+            manifest.clear()
 
         if not os.path.exists(folder_path):
             print(f"Folder {folder_path} does not exist")
             return 0, 0
 
-        # Get existing course titles to avoid re-processing
+        file_paths = [
+            os.path.join(folder_path, file_name)
+            for file_name in sorted(os.listdir(folder_path))
+            if os.path.isfile(os.path.join(folder_path, file_name))
+            and file_name.lower().endswith((".pdf", ".docx", ".txt"))
+        ]
+
+        self._purge_removed_files(folder_path, file_paths)
+
+        # Skip files whose content is unchanged and whose course is still stored
         existing_course_titles = set(self.vector_store.get_existing_course_titles())
+        changed_paths = [
+            file_path
+            for file_path in file_paths
+            if not (
+                manifest.is_unchanged(file_path)
+                and manifest.get(file_path).course_title in existing_course_titles
+            )
+        ]
+        if len(changed_paths) < len(file_paths):
+            print(f"Skipping {len(file_paths) - len(changed_paths)} unchanged files")
 
-        # Process each file in the folder
-        for file_name in os.listdir(folder_path):
-            file_path = os.path.join(folder_path, file_name)
-            if os.path.isfile(file_path) and file_name.lower().endswith(
-                (".pdf", ".docx", ".txt")
-            ):
-                try:
-                    # Check if this course might already exist
-                    # We'll process the document to get the course ID, but only add if new
-                    course, course_chunks = (
-                        self.document_processor.process_course_document(file_path)
-                    )
-
-                    if course and course.title not in existing_course_titles:
-                        # This is a new course - add it to the vector store
-                        self.vector_store.add_course_metadata(course)
-                        self.vector_store.add_course_content(course_chunks)
-                        total_courses += 1
-                        total_chunks += len(course_chunks)
-                        print(
-                            f"Added new course: {course.title} ({len(course_chunks)} chunks)"
-                        )
-                        existing_course_titles.add(course.title)
-                    elif course:
-                        print(f"Course already exists: {course.title} - skipping")
-                except Exception as e:
-                    print(f"Error processing {file_name}: {e}")
-
-        return total_courses, total_chunks
+        # Courses owned by files that are not being re-ingested stay untouched
+        changed_keys = {manifest.key(file_path) for file_path in changed_paths}
+        previous_titles = {
+            key: entry.course_title
+            for key, entry in manifest.entries.items()
+            if key in changed_keys
+        }
+        skip_titles = {
+            entry.course_title
+            for key, entry in manifest.entries.items()
+            if key not in changed_keys
+        }
+
+        # Parse in a process pool, embed in large batches, write from one thread
+        pipeline = IngestPipeline(
+            self.document_processor,
+            self.vector_store,
+            parse_workers=self.config.INGEST_WORKERS,
+            embed_batch_size=self.config.EMBEDDING_BATCH_SIZE,
+            progress=progress,
+        )
+        progress = pipeline.run(
+            changed_paths,
+            skip_titles,
+            on_indexed=lambda file_path, course, chunk_ids: manifest.record(
+                file_path, course.title, chunk_ids
+            ),
+        )
+
+        # Drop courses that an edited file no longer produces under that title
+        for key, title in previous_titles.items():
+            entry = manifest.entries.get(key)
+            if entry and entry.course_title != title and not manifest.owner_of(title):
+                print(f"Removing renamed course: {title}")
+                self.vector_store.delete_course(title)
+
+        manifest.save()
+        return progress.courses_added, progress.chunks_written
+
+    def start_indexing(self, folder_path: str) -> bool:
+        """
+        Ingest a folder on a background thread.
+
+        Queries keep being served from the already persisted data while the
+        run is in progress; get_indexing_status() reports how far it got.
+
+        Returns:
+            False if an indexing run is already in progress, True otherwise
+        """
+        if self._indexing_thread and self._indexing_thread.is_alive():
+            return False
+
+        self.indexing_progress = IngestProgress()
+        self.indexing_error = None
+        self._indexing_thread = threading.Thread(
+            target=self._index_folder,
+            args=(folder_path, self.indexing_progress),
+            name="rag-indexing",
+            daemon=True,
+        )
+        self._indexing_thread.start()
+        return True
+
+    def _index_folder(self, folder_path: str, progress: IngestProgress):
+        try:
+            courses, chunks = self.add_course_folder(folder_path, progress=progress)
+            print(f"Loaded {courses} courses with {chunks} chunks")
+        except Exception as e:
+            print(f"Error loading documents: {e}")
+            self.indexing_error = str(e)
+
+    def get_indexing_status(self) -> Dict[str, Any]:
+        """
+        Get the state of background indexing.
+
+        The state is "idle" if no run was started, "indexing" while one is in
+        progress, and "ready" or "failed" once it has finished.
+        """
+        thread = self._indexing_thread
+        if thread is None:
+            state = "idle"
+        elif thread.is_alive():
+            state = "indexing"
+        elif self.indexing_error:
+            state = "failed"
+        else:
+            state = "ready"
+
+        progress = self.indexing_progress
+        return {
+            "state": state,
+            "error": self.indexing_error,
+            "progress": progress.as_dict() if progress else None,
+        }
+
+    def _purge_removed_files(self, folder_path: str, file_paths: List[str]):
+        """Delete courses whose source files no longer exist in the folder"""
+        manifest = self.ingest_manifest
+        current_keys = {manifest.key(file_path) for file_path in file_paths}
+        for key in manifest.paths_under(folder_path):
+            if key in current_keys:
+                continue
+            entry = manifest.remove(key)
+            if not manifest.owner_of(entry.course_title):
+                print(f"Removing course of deleted file: {entry.course_title}")
+                self.vector_store.delete_course(entry.course_title)
 
     def query(
         self, query: str, session_id: Optional[str] = None
@@ -130,6 +304,149 @@ class RAGSystem:
         Returns:
             Tuple of (response, sources list - empty for tool-based approach)
         """
+        with tracer.span("rag.query", mode="sync") as span:
+            prompt, history = self._prepare_query(query, session_id)
+
+            # Serve near-identical questions from the answer cache
+            cache_key = self._answer_cache_key(query, history)
+            cached = self._lookup_answer(cache_key)
+            span.set("cache_hit", cached is not None)
+            if cached:
+                return self._finish_cached_query(query, session_id, cached)
+
+            # Generate response using AI with tools; sources are per request
+            sources: List[str] = []
+            response = self.ai_generator.generate_response(
+                query=prompt,
+                conversation_history=history,
+                tools=self.tool_manager.get_tool_definitions(),
+                tool_manager=self.tool_manager,
+                sources=sources,
+            )
+
+            self._finish_query(query, session_id, response, sources, cache_key)
+            return response, sources
+
+    async def aquery(
+        self, query: str, session_id: Optional[str] = None
+    ) -> Tuple[str, List[str]]:
+        """
+        Async variant of query that never blocks the event loop.
+
+        Anthropic calls use the async client; embedding and vector search run
+        on the bounded search executor.
+
+        Args:
+            query: User's question
+            session_id: Optional session ID for conversation context
+
+        Returns:
+            Tuple of (response, sources list)
+        """
+        with tracer.span("rag.query", mode="async") as span:
+            prompt, history = await self._run_blocking(
+                self._prepare_query, query, session_id
+            )
+
+            # Serve near-identical questions from the answer cache
+            cache_key = await self._run_blocking(self._answer_cache_key, query, history)
+            cached = self._lookup_answer(cache_key)
+            span.set("cache_hit", cached is not None)
+            if cached:
+                return await self._run_blocking(
+                    self._finish_cached_query, query, session_id, cached
+                )
+
+            # Generate response using AI with tools; sources are per request
+            sources: List[str] = []
+            response = await self.ai_generator.agenerate_response(
+                query=prompt,
+                conversation_history=history,
+                tools=self.tool_manager.get_tool_definitions(),
+                tool_manager=self.tool_manager,
+                executor=self.executor,
+                sources=sources,
+            )
+
+            await self._run_blocking(
+                self._finish_query, query, session_id, response, sources, cache_key
+            )
+            return response, sources
+
+    async def astream_query(
+        self, query: str, session_id: Optional[str] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Stream a query response as events.
+
+        Args:
+            query: User's question
+            session_id: Optional session ID for conversation context
+
+        Yields:
+            {"type": "token", "text": ...} for each text fragment, with a
+            {"type": "discard"} event when the text so far preceded a tool call
+            and is not part of the answer, followed by a single
+            {"type": "sources", "sources": [...]} event
+        """
+        with tracer.span("rag.query", mode="stream") as span:
+            prompt, history = await self._run_blocking(
+                self._prepare_query, query, session_id
+            )
+
+            # Serve near-identical questions from the answer cache in one event
+            cache_key = await self._run_blocking(self._answer_cache_key, query, history)
+            cached = self._lookup_answer(cache_key)
+            span.set("cache_hit", cached is not None)
+            if cached:
+                response, sources = await self._run_blocking(
+                    self._finish_cached_query, query, session_id, cached
+                )
+                yield {"type": "token", "text": response}
+                yield {"type": "sources", "sources": sources}
+                return
+
+            fragments = []
+            sources: List[str] = []
+            async for text in self.ai_generator.astream_response(
+                query=prompt,
+                conversation_history=history,
+                tools=self.tool_manager.get_tool_definitions(),
+                tool_manager=self.tool_manager,
+                executor=self.executor,
+                sources=sources,
+            ):
+                if text is None:
+                    fragments.clear()
+                    yield {"type": "discard"}
+                    continue
+                fragments.append(text)
+                yield {"type": "token", "text": text}
+
+            await self._run_blocking(
+                self._finish_query,
+                query,
+                session_id,
+                "".join(fragments),
+                sources,
+                cache_key,
+            )
+            yield {"type": "sources", "sources": sources}
+
+    async def acreate_session(self) -> str:
+        """Create a session without blocking the event loop on its storage"""
+        return await self._run_blocking(self.session_manager.create_session)
+
+    async def _run_blocking(self, func, *args):
+        """Run blocking work on the search executor"""
+        loop = asyncio.get_running_loop()
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(self.executor, context.run, func, *args)
+
+    def _prepare_query(
+        self, query: str, session_id: Optional[str]
+    ) -> Tuple[str, Optional[str]]:
+        """Build the AI prompt and fetch conversation history for a query"""
         # Create prompt for the AI with clear instructions
         prompt = f"""Answer this question about course materials: {query}"""
 
@@ -138,30 +455,87 @@ class RAGSystem:
         if session_id:
             history = self.session_manager.get_conversation_history(session_id)
 
-        # Generate response using AI with tools
-        response = self.ai_generator.generate_response(
-            query=prompt,
-            conversation_history=history,
-            tools=self.tool_manager.get_tool_definitions(),
-            tool_manager=self.tool_manager,
-        )
+        return prompt, history
 
-        # Get sources from the search tool
-        sources = self.tool_manager.get_last_sources()
+    def _answer_cache_key(
+        self, query: str, history: Optional[str]
+    ) -> Optional[Tuple[Any, Tuple, int]]:
+        """
+        Build the (embedding, scope, corpus version) answer cache key.
 
-        # Reset sources after retrieving them
-        self.tool_manager.reset_sources()
+        Follow-up questions depend on the conversation, so only queries without
+        history are cached. The scope holds the numbers in the query (lesson
+        numbers, mostly) and the course titles it names, since embeddings
+        barely distinguish "lesson 2" from "lesson 3", or one course's
+        "lesson 2" from another's.
+        """
+        if self.answer_cache is None or history:
+            return None
+
+        normalized = " ".join(query.split())
+        numbers = tuple(sorted({int(n) for n in re.findall(r"\d+", normalized)}))
+        courses = tuple(self.vector_store.mentioned_course_titles(normalized))
+        scope = (numbers, courses)
+        version = self.vector_store.corpus_version
+        with tracer.span("answer_cache.embed"):
+            embedding = self.vector_store.embed_query(normalized)
+        return embedding, scope, version
+
+    def _lookup_answer(self, cache_key) -> Optional[CachedAnswer]:
+        """Look up a cached answer for a cache key, if any"""
+        if cache_key is None:
+            return None
+        return self.answer_cache.lookup(*cache_key)
+
+    def _finish_cached_query(
+        self, query: str, session_id: Optional[str], cached: CachedAnswer
+    ) -> Tuple[str, List[str]]:
+        """Record an exchange answered from the cache"""
+        if session_id:
+            self.session_manager.add_exchange(session_id, query, cached.answer)
+        return cached.answer, list(cached.sources)
+
+    def _finish_query(
+        self,
+        query: str,
+        session_id: Optional[str],
+        response: str,
+        sources: List[str],
+        cache_key=None,
+    ):
+        """Cache the answer and record the exchange"""
+        if cache_key is not None:
+            self.answer_cache.store(*cache_key, response, sources)
 
         # Update conversation history
         if session_id:
             self.session_manager.add_exchange(session_id, query, response)
 
-        # Return response with sources from tool searches
-        return response, sources
-
     def get_course_analytics(self) -> Dict:
         """Get analytics about the course catalog"""
         return {
             "total_courses": self.vector_store.get_course_count(),
             "course_titles": self.vector_store.get_existing_course_titles(),
         }
+
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Get hit/miss statistics for the system's caches and Claude usage"""
+        return {
+            "answer_cache": self.answer_cache.stats() if self.answer_cache else None,
+            "embedding_cache": self.vector_store.query_embedder.stats(),
+            "generation": self.ai_generator.usage_stats(),
+            "partition_cache": self.vector_store.partition_stats(),
+            "reranker": (
+                self.vector_store.reranker.stats()
+                if self.vector_store.reranker
+                else None
+            ),
+            "sessions": self.session_manager.stats(),
+        }
+
+    def shutdown(self):
+        """Persist caches and release worker threads"""
+        self.vector_store.query_embedder.save()
+        self.executor.shutdown(wait=False)
+        self.tool_manager.shutdown()
+        self.session_manager.shutdown()
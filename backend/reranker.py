@@ -0,0 +1,164 @@
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+
+class CrossEncoderReranker:
+    """
+    Scores (query, chunk) pairs with a local cross-encoder.
+
+    The pairs of every search in a batch are scored in one batched pass on the
+    CPU, and scores are cached per (query, chunk ID) until the corpus changes.
+    When the measured time per pair says the uncached pairs would not fit in
+    the latency budget, scoring is skipped and callers keep the retrieval
+    order. Each skip relaxes the estimate a little, so one slow pass does not
+    turn re-ranking off for good. The model is loaded on first use and shared
+    per process.
+    """
+
+    models: Dict[str, Any] = {}
+    _load_lock = threading.Lock()
+
+    # Weight of the newest pass in the seconds-per-pair estimate
+    ESTIMATE_WEIGHT = 0.3
+    # Factor applied to the estimate after each skip
+    SKIP_RELAXATION = 0.9
+
+    def __init__(
+        self,
+        model_name: str,
+        batch_size: int = 32,
+        max_entries: int = 4096,
+        budget: float = 0.25,
+        device: str = "cpu",
+    ):
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.max_entries = max_entries
+        self.budget = budget
+        self.device = device
+
+        self._scores: "OrderedDict[Tuple[str, str], float]" = OrderedDict()
+        self._version: Any = None
+        self._seconds_per_pair: Optional[float] = None
+        self._lock = threading.Lock()
+
+        # Counters
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.reranked = 0
+        self.skipped = 0
+
+    @property
+    def _model(self):
+        model = self.models.get(self.model_name)
+        if model is None:
+            with self._load_lock:
+                model = self.models.get(self.model_name)
+                if model is None:
+                    from sentence_transformers import CrossEncoder
+
+                    model = CrossEncoder(self.model_name, device=self.device)
+                    self.models[self.model_name] = model
+        return model
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        """Normalize a query into its part of a cache key"""
+        return unicodedata.normalize("NFC", " ".join(text.split()))
+
+    def score(
+        self,
+        searches: Sequence[Tuple[str, List[str], List[str]]],
+        version: Any = None,
+    ) -> Optional[List[List[float]]]:
+        """
+        Score the candidates of several searches in one batched pass.
+
+        Args:
+            searches: (query, chunk IDs, documents) of each search
+            version: Corpus version; cached scores of other versions are dropped
+
+        Returns:
+            Relevance scores of each search's candidates, higher is better, or
+            None if scoring would exceed the latency budget
+        """
+        keys = [
+            [(self.normalize(query), chunk_id) for chunk_id in chunk_ids]
+            for query, chunk_ids, _ in searches
+        ]
+        found: Dict[Tuple[str, str], float] = {}
+        missing: Dict[Tuple[str, str], Tuple[str, str]] = {}
+
+        with self._lock:
+            if version != self._version:
+                self._scores.clear()
+                self._version = version
+            for (query, _, documents), search_keys in zip(searches, keys):
+                for key, document in zip(search_keys, documents):
+                    score = self._scores.get(key)
+                    if score is not None:
+                        self._scores.move_to_end(key)
+                        found[key] = score
+                    elif key not in missing:
+                        missing[key] = (query, document)
+            estimate = self._seconds_per_pair
+            if (
+                missing
+                and self.budget > 0
+                and estimate is not None
+                and estimate * len(missing) > self.budget
+            ):
+                self._seconds_per_pair = estimate * self.SKIP_RELAXATION
+                self.skipped += len(searches)
+                return None
+            self.hits += len(found)
+            self.misses += len(missing)
+
+        if missing:
+            # Load before timing so the first pass measures scoring only
+            model = self._model
+            started = time.perf_counter()
+            scores = model.predict(
+                list(missing.values()),
+                batch_size=self.batch_size,
+                show_progress_bar=False,
+            )
+            seconds = (time.perf_counter() - started) / len(missing)
+            with self._lock:
+                if self._seconds_per_pair is None:
+                    self._seconds_per_pair = seconds
+                else:
+                    self._seconds_per_pair += self.ESTIMATE_WEIGHT * (
+                        seconds - self._seconds_per_pair
+                    )
+                for key, score in zip(missing, scores):
+                    found[key] = float(score)
+                    if self._version == version:
+                        self._scores[key] = float(score)
+                        self._scores.move_to_end(key)
+                while len(self._scores) > self.max_entries:
+                    self._scores.popitem(last=False)
+                    self.evictions += 1
+
+        with self._lock:
+            self.reranked += len(searches)
+        return [[found[key] for key in search_keys] for search_keys in keys]
+
+    def stats(self) -> Dict[str, Any]:
+        """Get cache size, hit/miss counters and skipped searches"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._scores),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "reranked": self.reranked,
+                "skipped": self.skipped,
+                "seconds_per_pair": self._seconds_per_pair,
+            }
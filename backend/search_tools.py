@@ -1,12 +1,45 @@
+import contextvars
+import time
 from abc import ABC, abstractmethod
-from typing import Any, Dict, Optional, Protocol
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Protocol, Tuple
 
+from tracing import tracer
 from vector_store import SearchResults, VectorStore
 
 
+@dataclass
+class ToolCallTiming:
+    """Wall-clock time of one tool call"""
+
+    tool_name: str
+    seconds: float
+    timed_out: bool = False
+
+
+@dataclass
+class ToolResult:
+    """
+    Output of one tool call.
+
+    Everything a call produces for the request (the text sent back to Claude,
+    the sources shown in the UI, its timing) travels with the result rather
+    than being stored on the shared tool instances.
+    """
+
+    content: str
+    sources: List[str] = field(default_factory=list)
+    timing: Optional[ToolCallTiming] = None
+
+
 class Tool(ABC):
     """Abstract base class for all tools"""
 
+    # Seconds before a call is abandoned; None uses the ToolManager default
+    timeout: Optional[float] = None
+
     @abstractmethod
     def get_tool_definition(self) -> Dict[str, Any]:
         """Return Anthropic tool definition for this tool"""
@@ -17,13 +50,16 @@ class Tool(ABC):
         """Execute the tool with given parameters"""
         pass
 
+    def execute_many(self, calls: List[Dict[str, Any]]) -> List[ToolResult]:
+        """Execute several calls of this tool; override to batch them"""
+        return [ToolResult(self.execute(**kwargs)) for kwargs in calls]
+
 
 class CourseSearchTool(Tool):
     """Tool for searching course content with semantic course name matching"""
 
     def __init__(self, vector_store: VectorStore):
         self.store = vector_store
-        self.last_sources = []  # Track sources from last search
 
     def get_tool_definition(self) -> Dict[str, Any]:
         """Return Anthropic tool definition for this tool"""
@@ -72,10 +108,50 @@ class CourseSearchTool(Tool):
         results = self.store.search(
             query=query, course_name=course_name, lesson_number=lesson_number
         )
+        return self._render(results, course_name, lesson_number).content
 
+    def execute_many(self, calls: List[Dict[str, Any]]) -> List[ToolResult]:
+        """
+        Execute several searches as one batch.
+
+        Queries are embedded together and sent to the vector store in as few
+        queries as their filters allow.
+
+        Args:
+            calls: Keyword arguments of execute() for each search
+
+        Returns:
+            Formatted results or error message, with sources, for each search
+        """
+        searches = [self._search_arguments(**kwargs) for kwargs in calls]
+        return [
+            self._render(results, search["course_name"], search["lesson_number"])
+            for search, results in zip(searches, self.store.search_many(searches))
+        ]
+
+    @staticmethod
+    def _search_arguments(
+        query: str,
+        course_name: Optional[str] = None,
+        lesson_number: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """Validate one call's arguments like execute() would"""
+        return {
+            "query": query,
+            "course_name": course_name,
+            "lesson_number": lesson_number,
+        }
+
+    def _render(
+        self,
+        results: SearchResults,
+        course_name: Optional[str],
+        lesson_number: Optional[int],
+    ) -> ToolResult:
+        """Turn search results into the tool's text output and sources"""
         # Handle errors
         if results.error:
-            return results.error
+            return ToolResult(results.error)
 
         # Handle empty results
         if results.is_empty():
@@ -84,12 +160,12 @@ class CourseSearchTool(Tool):
                 filter_info += f" in course '{course_name}'"
             if lesson_number:
                 filter_info += f" in lesson {lesson_number}"
-            return f"No relevant content found{filter_info}."
+            return ToolResult(f"No relevant content found{filter_info}.")
 
         # Format and return results
         return self._format_results(results)
 
-    def _format_results(self, results: SearchResults) -> str:
+    def _format_results(self, results: SearchResults) -> ToolResult:
         """Format search results with course and lesson context"""
         formatted = []
         sources = []  # Track sources for the UI
@@ -112,17 +188,18 @@ class CourseSearchTool(Tool):
 
             formatted.append(f"{header}\n{doc}")
 
-        # Store sources for retrieval
-        self.last_sources = sources
-
-        return "\n\n".join(formatted)
+        return ToolResult("\n\n".join(formatted), sources)
 
 
 class ToolManager:
     """Manages available tools for the AI"""
 
-    def __init__(self):
+    def __init__(self, max_workers: int = 4, timeout: Optional[float] = None):
         self.tools = {}
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="rag-tool"
+        )
 
     def register_tool(self, tool: Tool):
         """Register any tool that implements the Tool interface"""
@@ -141,18 +218,92 @@ class ToolManager:
         if tool_name not in self.tools:
             return f"Tool '{tool_name}' not found"
 
-        return self.tools[tool_name].execute(**kwargs)
-
-    def get_last_sources(self) -> list:
-        """Get sources from the last search operation"""
-        # Check all tools for last_sources attribute
-        for tool in self.tools.values():
-            if hasattr(tool, "last_sources") and tool.last_sources:
-                return tool.last_sources
-        return []
-
-    def reset_sources(self):
-        """Reset sources from all tools that track sources"""
-        for tool in self.tools.values():
-            if hasattr(tool, "last_sources"):
-                tool.last_sources = []
+        with tracer.span(f"tool.{tool_name}"):
+            return self.tools[tool_name].execute(**kwargs)
+
+    def execute_tools(
+        self, calls: List[Tuple[str, Dict[str, Any]]]
+    ) -> List[ToolResult]:
+        """
+        Execute the parallel tool calls of one response concurrently.
+
+        Calls are grouped by tool and each group runs through the tool's
+        execute_many on the tool thread pool, so different tools overlap and
+        searches are batched into one vector store round. A group that runs
+        past its tool's timeout is abandoned, and a group that raises fails
+        alone; either way its calls get an error message as output.
+
+        Args:
+            calls: (tool name, input) pairs in the order Claude issued them
+
+        Returns:
+            ToolResult with output, sources and timing for each call, in order
+        """
+        results: List[Optional[ToolResult]] = [None] * len(calls)
+        positions: Dict[str, List[int]] = {}
+        for position, (tool_name, _) in enumerate(calls):
+            if tool_name in self.tools:
+                positions.setdefault(tool_name, []).append(position)
+            else:
+                results[position] = ToolResult(
+                    f"Tool '{tool_name}' not found",
+                    timing=ToolCallTiming(tool_name, 0.0),
+                )
+
+        # Groups run in a copy of the caller's context so that tracing spans
+        # opened by the tools nest under the request's span
+        started = time.perf_counter()
+        futures = [
+            (
+                tool_name,
+                group,
+                self._executor.submit(
+                    contextvars.copy_context().run,
+                    self._execute_group,
+                    tool_name,
+                    self.tools[tool_name],
+                    [calls[position][1] for position in group],
+                ),
+            )
+            for tool_name, group in positions.items()
+        ]
+
+        for tool_name, group, future in futures:
+            timeout = self.tools[tool_name].timeout or self.timeout
+            try:
+                remaining = None
+                if timeout is not None:
+                    remaining = max(0.0, started + timeout - time.perf_counter())
+                outputs, seconds = future.result(timeout=remaining)
+                timed_out = False
+            except FutureTimeoutError:
+                future.cancel()  # Only stops it if it has not started yet
+                message = f"Tool '{tool_name}' timed out after {timeout:g}s"
+                outputs = [ToolResult(message) for _ in group]
+                seconds = time.perf_counter() - started
+                timed_out = True
+            except Exception as e:
+                message = f"Tool '{tool_name}' failed: {e}"
+                outputs = [ToolResult(message) for _ in group]
+                seconds = time.perf_counter() - started
+                timed_out = False
+
+            for position, output in zip(group, outputs):
+                output.timing = ToolCallTiming(tool_name, seconds, timed_out)
+                results[position] = output
+
+        return results
+
+    @staticmethod
+    def _execute_group(
+        tool_name: str, tool: Tool, calls: List[Dict[str, Any]]
+    ) -> Tuple[List[ToolResult], float]:
+        """Run one tool's batch of calls and time it"""
+        started = time.perf_counter()
+        with tracer.span(f"tool.{tool_name}", calls=len(calls)):
+            outputs = tool.execute_many(calls)
+        return outputs, time.perf_counter() - started
+
+    def shutdown(self):
+        """Stop the tool thread pool without waiting for abandoned calls"""
+        self._executor.shutdown(wait=False)
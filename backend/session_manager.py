@@ -1,5 +1,15 @@
-from dataclasses import dataclass
-from typing import Dict, List, Optional
+import os
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from itertools import islice
+from typing import Any, Callable, Deque, Dict, List, Optional, Set
 
 
 @dataclass
@@ -10,47 +20,541 @@ class Message:
     content: str  # The message content
 
 
+def _new_session_id() -> str:
+    """Random session ID, unique across worker processes and restarts"""
+    return f"session_{uuid.uuid4().hex}"
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count of English text, about four characters per token"""
+    return (len(text) + 3) // 4
+
+
+def _summarized_prefix(stored: List[Message], summarized: List[Message]) -> int:
+    """
+    Count the leading stored messages that are among the summarized ones.
+
+    Summarized messages that were trimmed from the store in the meantime are
+    skipped, so only messages the summary really covers are matched.
+    """
+    count = 0
+    for message in summarized:
+        if count < len(stored) and stored[count] == message:
+            count += 1
+    return count
+
+
+class SessionStore(ABC):
+    """Abstract base class for conversation history backends"""
+
+    @abstractmethod
+    def create(self) -> str:
+        """Create an empty session and return its ID"""
+        pass
+
+    @abstractmethod
+    def append(self, session_id: str, messages: List[Message]):
+        """Append messages to a session, creating it if needed"""
+        pass
+
+    @abstractmethod
+    def get(self, session_id: str) -> List[Message]:
+        """Get a session's retained messages, oldest first"""
+        pass
+
+    @abstractmethod
+    def clear(self, session_id: str):
+        """Remove all messages and the summary from a session"""
+        pass
+
+    @abstractmethod
+    def get_summary(self, session_id: str) -> Optional[str]:
+        """Get the summary of a session's compacted messages, if any"""
+        pass
+
+    @abstractmethod
+    def compact(self, session_id: str, messages: List[Message], summary: str) -> int:
+        """
+        Replace the oldest messages of a session with a summary.
+
+        Only leading stored messages equal to the given ones are removed, so
+        messages appended or trimmed while the summary was being written are
+        left alone. Returns the number of messages removed.
+        """
+        pass
+
+    @abstractmethod
+    def stats(self) -> Dict[str, Any]:
+        """Get session counts and eviction counters"""
+        pass
+
+
+@dataclass
+class _Session:
+    """In-memory session with its bounded message window"""
+
+    messages: Deque[Message]
+    last_access: float
+    size: int = field(default=0)
+    summary: Optional[str] = None
+
+
+class MemorySessionStore(SessionStore):
+    """
+    Process-local session store with LRU, TTL and memory bounds.
+
+    Each session keeps its last max_messages messages in a deque, so appends
+    drop the oldest message in O(1). Sessions are kept in last-access order:
+    expired ones are dropped from the front on every access, and least
+    recently used ones are evicted while max_sessions or max_bytes is
+    exceeded.
+    """
+
+    def __init__(
+        self,
+        max_messages: int,
+        ttl_seconds: Optional[float] = None,
+        max_sessions: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+    ):
+        self.max_messages = max_messages
+        self.ttl_seconds = ttl_seconds
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+
+        self._sessions: "OrderedDict[str, _Session]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        # Counters
+        self.evictions = 0
+        self.expirations = 0
+
+    def create(self) -> str:
+        session_id = _new_session_id()
+        with self._lock:
+            self._touch(session_id)
+            self._evict()
+            return session_id
+
+    def append(self, session_id: str, messages: List[Message]):
+        with self._lock:
+            session = self._touch(session_id)
+            for message in messages:
+                if len(session.messages) == session.messages.maxlen:
+                    session.size -= self._size(session.messages[0])
+                    self._bytes -= self._size(session.messages[0])
+                session.messages.append(message)
+                session.size += self._size(message)
+                self._bytes += self._size(message)
+            self._evict()
+
+    def get(self, session_id: str) -> List[Message]:
+        with self._lock:
+            self._expire(time.monotonic())
+            session = self._sessions.get(session_id)
+            if session is None:
+                return []
+            session.last_access = time.monotonic()
+            self._sessions.move_to_end(session_id)
+            return list(session.messages)
+
+    def clear(self, session_id: str):
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is not None:
+                session.messages.clear()
+                session.summary = None
+                self._bytes -= session.size
+                session.size = 0
+
+    def get_summary(self, session_id: str) -> Optional[str]:
+        with self._lock:
+            session = self._sessions.get(session_id)
+            return session.summary if session is not None else None
+
+    def compact(self, session_id: str, messages: List[Message], summary: str) -> int:
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return 0
+            stored = list(islice(session.messages, len(messages)))
+            count = _summarized_prefix(stored, messages)
+            if not count:
+                return 0
+
+            removed = [session.messages.popleft() for _ in range(count)]
+            if session.summary is not None:
+                removed.append(Message(role="summary", content=session.summary))
+            freed = sum(self._size(message) for message in removed)
+            added = self._size(Message(role="summary", content=summary))
+            session.summary = summary
+            session.size += added - freed
+            self._bytes += added - freed
+            self._evict()
+            return count
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "backend": "memory",
+                "sessions": len(self._sessions),
+                "bytes": self._bytes,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+    def _touch(self, session_id: str) -> _Session:
+        """Get or create a session and mark it most recently used"""
+        now = time.monotonic()
+        self._expire(now)
+        session = self._sessions.get(session_id)
+        if session is None:
+            session = self._sessions[session_id] = _Session(
+                messages=deque(maxlen=self.max_messages), last_access=now
+            )
+        session.last_access = now
+        self._sessions.move_to_end(session_id)
+        return session
+
+    def _expire(self, now: float):
+        """Drop sessions idle for longer than the TTL, oldest first"""
+        if not self.ttl_seconds:
+            return
+        while self._sessions:
+            session_id, session = next(iter(self._sessions.items()))
+            if now - session.last_access <= self.ttl_seconds:
+                break
+            self._remove(session_id)
+            self.expirations += 1
+
+    def _evict(self):
+        """Evict least recently used sessions beyond the bounds"""
+        while len(self._sessions) > 1 and (
+            (self.max_sessions and len(self._sessions) > self.max_sessions)
+            or (self.max_bytes and self._bytes > self.max_bytes)
+        ):
+            self._remove(next(iter(self._sessions)))
+            self.evictions += 1
+
+    def _remove(self, session_id: str):
+        session = self._sessions.pop(session_id)
+        self._bytes -= session.size
+
+    @staticmethod
+    def _size(message: Message) -> int:
+        return sys.getsizeof(message.content)
+
+
+class SQLiteSessionStore(SessionStore):
+    """
+    Session store in a SQLite database shared by worker processes.
+
+    The database runs in WAL mode so readers in one worker do not block
+    writers in another. Messages beyond max_messages are trimmed on every
+    append; expired and least recently used sessions are evicted each time
+    a session is created. Eviction counters are per process.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_messages: int,
+        ttl_seconds: Optional[float] = None,
+        max_sessions: Optional[int] = None,
+    ):
+        self.path = path
+        self.max_messages = max_messages
+        self.ttl_seconds = ttl_seconds
+        self.max_sessions = max_sessions
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+        # Counters
+        self.evictions = 0
+        self.expirations = 0
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connection() as connection:
+            connection.executescript("""
+                CREATE TABLE IF NOT EXISTS sessions (
+                    session_id TEXT PRIMARY KEY,
+                    last_access REAL NOT NULL,
+                    summary TEXT
+                );
+                CREATE INDEX IF NOT EXISTS sessions_last_access
+                    ON sessions (last_access);
+                CREATE TABLE IF NOT EXISTS messages (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    session_id TEXT NOT NULL,
+                    role TEXT NOT NULL,
+                    content TEXT NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS messages_session
+                    ON messages (session_id, id);
+                """)
+            # Databases created before summaries were stored lack the column
+            columns = {
+                row[1] for row in connection.execute("PRAGMA table_info(sessions)")
+            }
+            if "summary" not in columns:
+                connection.execute("ALTER TABLE sessions ADD COLUMN summary TEXT")
+
+    def _connection(self) -> sqlite3.Connection:
+        """Get this thread's connection"""
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def create(self) -> str:
+        session_id = _new_session_id()
+        with self._connection() as connection:
+            self._touch(connection, session_id)
+            self._evict(connection)
+        return session_id
+
+    def append(self, session_id: str, messages: List[Message]):
+        with self._connection() as connection:
+            self._touch(connection, session_id)
+            connection.executemany(
+                "INSERT INTO messages (session_id, role, content) VALUES (?, ?, ?)",
+                [(session_id, message.role, message.content) for message in messages],
+            )
+            # Keep only the newest max_messages messages
+            connection.execute(
+                """
+                DELETE FROM messages WHERE session_id = ? AND id <= (
+                    SELECT id FROM messages WHERE session_id = ?
+                    ORDER BY id DESC LIMIT 1 OFFSET ?
+                )
+                """,
+                (session_id, session_id, self.max_messages),
+            )
+
+    def get(self, session_id: str) -> List[Message]:
+        with self._connection() as connection:
+            row = connection.execute(
+                "SELECT last_access FROM sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+            if row is None:
+                return []
+            if self._expired(row[0]):
+                self._delete(connection, [session_id])
+                with self._lock:
+                    self.expirations += 1
+                return []
+
+            self._touch(connection, session_id)
+            rows = connection.execute(
+                """
+                SELECT role, content FROM messages WHERE session_id = ?
+                ORDER BY id DESC LIMIT ?
+                """,
+                (session_id, self.max_messages),
+            ).fetchall()
+        return [Message(role=role, content=content) for role, content in rows[::-1]]
+
+    def clear(self, session_id: str):
+        with self._connection() as connection:
+            connection.execute(
+                "DELETE FROM messages WHERE session_id = ?", (session_id,)
+            )
+            connection.execute(
+                "UPDATE sessions SET summary = NULL WHERE session_id = ?",
+                (session_id,),
+            )
+
+    def get_summary(self, session_id: str) -> Optional[str]:
+        row = (
+            self._connection()
+            .execute("SELECT summary FROM sessions WHERE session_id = ?", (session_id,))
+            .fetchone()
+        )
+        return row[0] if row else None
+
+    def compact(self, session_id: str, messages: List[Message], summary: str) -> int:
+        with self._connection() as connection:
+            # Take the write lock first so the oldest rows cannot change
+            connection.execute("BEGIN IMMEDIATE")
+            rows = connection.execute(
+                """
+                SELECT id, role, content FROM messages WHERE session_id = ?
+                ORDER BY id LIMIT ?
+                """,
+                (session_id, len(messages)),
+            ).fetchall()
+            stored = [Message(role=role, content=content) for _, role, content in rows]
+            count = _summarized_prefix(stored, messages)
+            if not count:
+                return 0
+
+            connection.execute(
+                "DELETE FROM messages WHERE session_id = ? AND id <= ?",
+                (session_id, rows[count - 1][0]),
+            )
+            connection.execute(
+                "UPDATE sessions SET summary = ? WHERE session_id = ?",
+                (summary, session_id),
+            )
+            return count
+
+    def stats(self) -> Dict[str, Any]:
+        (sessions,) = (
+            self._connection().execute("SELECT COUNT(*) FROM sessions").fetchone()
+        )
+        with self._lock:
+            return {
+                "backend": "sqlite",
+                "sessions": sessions,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+    def _touch(self, connection: sqlite3.Connection, session_id: str):
+        """Create a session row if needed and mark it most recently used"""
+        connection.execute(
+            """
+            INSERT INTO sessions (session_id, last_access) VALUES (?, ?)
+            ON CONFLICT (session_id) DO UPDATE SET last_access = excluded.last_access
+            """,
+            (session_id, time.time()),
+        )
+
+    def _expired(self, last_access: float) -> bool:
+        return bool(self.ttl_seconds) and time.time() - last_access > self.ttl_seconds
+
+    def _evict(self, connection: sqlite3.Connection):
+        """Delete expired sessions, then least recently used ones over the bound"""
+        expired = []
+        if self.ttl_seconds:
+            expired = [
+                row[0]
+                for row in connection.execute(
+                    "SELECT session_id FROM sessions WHERE last_access < ?",
+                    (time.time() - self.ttl_seconds,),
+                )
+            ]
+            self._delete(connection, expired)
+
+        evicted = []
+        if self.max_sessions:
+            evicted = [
+                row[0]
+                for row in connection.execute(
+                    """
+                    SELECT session_id FROM sessions
+                    ORDER BY last_access DESC LIMIT -1 OFFSET ?
+                    """,
+                    (self.max_sessions,),
+                )
+            ]
+            self._delete(connection, evicted)
+
+        with self._lock:
+            self.expirations += len(expired)
+            self.evictions += len(evicted)
+
+    @staticmethod
+    def _delete(connection: sqlite3.Connection, session_ids: List[str]):
+        rows = [(session_id,) for session_id in session_ids]
+        connection.executemany("DELETE FROM messages WHERE session_id = ?", rows)
+        connection.executemany("DELETE FROM sessions WHERE session_id = ?", rows)
+
+
+def build_session_store(config) -> SessionStore:
+    """Create the session backend selected by config.SESSION_BACKEND"""
+    max_messages = config.MAX_HISTORY * 2
+    if config.HISTORY_SUMMARY:
+        # Summaries are written in the background once more than twice the
+        # verbatim turns have accumulated; keep one more turn than that so a
+        # turn added while the summary is written is not trimmed unsummarized
+        max_messages = max(max_messages, (2 * config.HISTORY_KEEP_TURNS + 2) * 2)
+    ttl_seconds = config.SESSION_TTL or None
+    max_sessions = config.MAX_SESSIONS or None
+    if config.SESSION_BACKEND == "sqlite":
+        return SQLiteSessionStore(
+            config.SESSION_DB_PATH, max_messages, ttl_seconds, max_sessions
+        )
+    if config.SESSION_BACKEND != "memory":
+        raise ValueError(f"Unknown session backend: {config.SESSION_BACKEND}")
+    return MemorySessionStore(
+        max_messages, ttl_seconds, max_sessions, config.SESSION_MAX_BYTES or None
+    )
+
+
 class SessionManager:
-    """Manages conversation sessions and message history"""
+    """
+    Manages conversation sessions and message history.
+
+    With a summarizer, older exchanges are compacted into a rolling summary:
+    once a session holds more than twice keep_turns exchanges, everything but
+    the last keep_turns is summarized on a background thread, so the request
+    that triggered it does not wait for the extra Claude call. The formatted
+    history is further capped at max_tokens estimated tokens.
+    """
 
-    def __init__(self, max_history: int = 5):
+    def __init__(
+        self,
+        max_history: int = 5,
+        store: Optional[SessionStore] = None,
+        summarizer: Optional[Callable[[str, Optional[str]], str]] = None,
+        keep_turns: int = 2,
+        max_tokens: Optional[int] = None,
+    ):
         self.max_history = max_history
-        self.sessions: Dict[str, List[Message]] = {}
-        self.session_counter = 0
+        self.store = store or MemorySessionStore(max_messages=max_history * 2)
+
+        # Rolling summary: summarizer(conversation, previous_summary) -> summary
+        self.summarizer = summarizer
+        self.keep_turns = keep_turns
+        self.max_tokens = max_tokens
+        self._executor = (
+            ThreadPoolExecutor(max_workers=1, thread_name_prefix="rag-summary")
+            if summarizer
+            else None
+        )
+        self._pending: Dict[str, Future] = {}
+        self._rerun: Set[str] = set()
+        self._lock = threading.Lock()
+
+        # Counters
+        self.summaries = 0
+        self.summary_failures = 0
 
     def create_session(self) -> str:
         """Create a new conversation session"""
-        self.session_counter += 1
-        session_id = f"session_{self.session_counter}"
-        self.sessions[session_id] = []
-        return session_id
+        return self.store.create()
 
     def add_message(self, session_id: str, role: str, content: str):
         """Add a message to the conversation history"""
-        if session_id not in self.sessions:
-            self.sessions[session_id] = []
-
-        message = Message(role=role, content=content)
-        self.sessions[session_id].append(message)
-
-        # Keep conversation history within limits
-        if len(self.sessions[session_id]) > self.max_history * 2:
-            self.sessions[session_id] = self.sessions[session_id][
-                -self.max_history * 2 :
-            ]
+        self.store.append(session_id, [Message(role=role, content=content)])
+        self._schedule_summary(session_id)
 
     def add_exchange(self, session_id: str, user_message: str, assistant_message: str):
         """Add a complete question-answer exchange"""
-        self.add_message(session_id, "user", user_message)
-        self.add_message(session_id, "assistant", assistant_message)
+        self.store.append(
+            session_id,
+            [
+                Message(role="user", content=user_message),
+                Message(role="assistant", content=assistant_message),
+            ],
+        )
+        self._schedule_summary(session_id)
 
     def get_conversation_history(self, session_id: Optional[str]) -> Optional[str]:
         """Get formatted conversation history for a session"""
-        if not session_id or session_id not in self.sessions:
+        if not session_id:
             return None
 
-        messages = self.sessions[session_id]
-        if not messages:
+        messages = self.store.get(session_id)
+        summary = self.store.get_summary(session_id) if self.summarizer else None
+        if not messages and not summary:
             return None
 
         # Format messages for context
@@ -58,9 +562,104 @@ class SessionManager:
         for msg in messages:
             formatted_messages.append(f"{msg.role.title()}: {msg.content}")
 
-        return "\n".join(formatted_messages)
+        return self._fit(summary, formatted_messages)
+
+    def token_estimate(self, session_id: Optional[str]) -> int:
+        """Estimate the tokens a session's history adds to each prompt"""
+        history = self.get_conversation_history(session_id)
+        return estimate_tokens(history) if history else 0
 
     def clear_session(self, session_id: str):
         """Clear all messages from a session"""
-        if session_id in self.sessions:
-            self.sessions[session_id] = []
+        self.store.clear(session_id)
+
+    def stats(self) -> Dict[str, Any]:
+        """Get session counts, eviction and summarization counters"""
+        stats = self.store.stats()
+        if self.summarizer:
+            with self._lock:
+                stats["summaries"] = self.summaries
+                stats["summary_failures"] = self.summary_failures
+                stats["summaries_pending"] = len(self._pending)
+        return stats
+
+    def flush(self):
+        """Wait for scheduled summaries to be written"""
+        with self._lock:
+            pending = list(self._pending.values())
+        wait(pending)
+
+    def shutdown(self):
+        """Stop the summary thread, dropping summaries not yet started"""
+        if self._executor:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _fit(self, summary: Optional[str], lines: List[str]) -> str:
+        """Join the summary and messages, dropping the oldest beyond max_tokens"""
+        header = "Summary of earlier conversation: "
+        if summary:
+            lines = [header + summary, *lines]
+        history = "\n".join(lines)
+        if not self.max_tokens:
+            return history
+
+        # Drop the oldest messages first, always keeping the latest one
+        first = 1 if summary else 0
+        while estimate_tokens(history) > self.max_tokens and len(lines) > first + 1:
+            del lines[first]
+            history = "\n".join(lines)
+
+        # Then shorten the summary to what is left of the budget
+        excess = estimate_tokens(history) - self.max_tokens
+        if summary and excess > 0:
+            keep = max(len(lines[0]) - excess * 4, len(header))
+            lines[0] = lines[0][:keep]
+            if keep == len(header):
+                del lines[0]
+            history = "\n".join(lines)
+        return history
+
+    def _schedule_summary(self, session_id: str):
+        """Summarize a session in the background unless already scheduled"""
+        if not self.summarizer:
+            return
+        with self._lock:
+            if session_id in self._pending:
+                # Check again once the running job is done
+                self._rerun.add(session_id)
+                return
+            try:
+                future = self._executor.submit(self._summarize, session_id)
+            except RuntimeError:
+                return  # Shutting down
+            self._pending[session_id] = future
+
+    def _summarize(self, session_id: str):
+        """Background job: summarize until no newer messages are waiting"""
+        while True:
+            self._summarize_once(session_id)
+            with self._lock:
+                if session_id not in self._rerun:
+                    del self._pending[session_id]
+                    return
+                self._rerun.discard(session_id)
+
+    def _summarize_once(self, session_id: str):
+        """Fold all but the last keep_turns exchanges into the summary"""
+        try:
+            messages = self.store.get(session_id)
+            keep = self.keep_turns * 2
+            if len(messages) <= 2 * keep:
+                return
+            older = messages[: len(messages) - keep]
+            conversation = "\n".join(
+                f"{msg.role.title()}: {msg.content}" for msg in older
+            )
+            summary = self.summarizer(conversation, self.store.get_summary(session_id))
+            self.store.compact(session_id, older, summary)
+            with self._lock:
+                self.summaries += 1
+        except Exception as e:
+            print(f"Error summarizing session {session_id}: {e}")
+            with self._lock:
+                self.summary_failures += 1
@@ -112,6 +112,9 @@ def mock_rag_system(mock_vector_store, mock_ai_generator, mock_session_manager,
     }
     mock_system.add_course_folder.return_value = (2, 4)  # courses, chunks
     mock_system.session_manager = mock_session_manager
+    # app.py awaits the async variants
+    mock_system.aquery.side_effect = mock_system.query
+    mock_system.acreate_session.side_effect = mock_session_manager.create_session
     return mock_system
 
 
@@ -153,7 +156,7 @@ def sample_query_requests():
 
 @pytest.fixture
 def app_without_static_mount(mock_rag_system):
-    """Create FastAPI app without static file mounting for testing"""
+    """Get the app of app.py with a mocked RAG system"""
     from .test_app import create_test_app
     
     # Create test app with mocked RAG system
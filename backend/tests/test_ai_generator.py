@@ -0,0 +1,304 @@
+from types import SimpleNamespace
+from unittest.mock import Mock
+
+import pytest
+from ai_generator import AIGenerator, GenerationStats
+from search_tools import ToolResult
+
+
+class FakeStream:
+    """Stand-in for the Anthropic async message stream context manager"""
+
+    def __init__(self, fragments, final_message):
+        self.fragments = fragments
+        self.final_message = final_message
+        self.finished = False
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    async def __aiter__(self):
+        for fragment in self.fragments:
+            yield SimpleNamespace(type="text", text=fragment)
+        for block in self.final_message.content:
+            if block.type == "tool_use":
+                yield SimpleNamespace(type="content_block_start", content_block=block)
+
+    async def get_final_message(self):
+        self.finished = True
+        return self.final_message
+
+
+def text_message(text):
+    return SimpleNamespace(
+        stop_reason="end_turn", content=[SimpleNamespace(type="text", text=text)]
+    )
+
+
+def tool_use_message(tool_id="toolu_1", input_tokens=0):
+    block = SimpleNamespace(
+        type="tool_use",
+        id=tool_id,
+        name="search_course_content",
+        input={"query": "MCP"},
+    )
+    usage = SimpleNamespace(input_tokens=input_tokens, output_tokens=10)
+    return SimpleNamespace(stop_reason="tool_use", content=[block], usage=usage)
+
+
+@pytest.fixture
+def generator():
+    return AIGenerator("test-key", "test-model")
+
+
+@pytest.mark.unit
+class TestStreamResponse:
+    """Test AIGenerator.astream_response"""
+
+    async def test_streams_direct_answer(self, generator):
+        """Test fragments of a direct answer are yielded as they arrive"""
+        generator.async_client = Mock()
+        generator.async_client.messages.stream.return_value = FakeStream(
+            ["Hello ", "world"], text_message("Hello world")
+        )
+
+        fragments = [text async for text in generator.astream_response("hi")]
+
+        assert fragments == ["Hello ", "world"]
+
+    async def test_answer_is_streamed_while_tools_are_allowed(self, generator):
+        """Test a direct answer streams its fragments before the round ends"""
+        stream = FakeStream(
+            ["MCP ", "is ", "a protocol"], text_message("MCP is a protocol")
+        )
+        generator.async_client = Mock()
+        generator.async_client.messages.stream.return_value = stream
+
+        fragments = [
+            (text, stream.finished)
+            async for text in generator.astream_response(
+                "what is MCP",
+                tools=[{"name": "search_course_content"}],
+                tool_manager=Mock(),
+            )
+        ]
+
+        assert fragments == [("MCP ", False), ("is ", False), ("a protocol", False)]
+
+    async def test_streams_answer_after_tool_use(self, generator):
+        """Test tools run before the follow-up answer is streamed"""
+        generator.max_tool_rounds = 1
+        generator.async_client = Mock()
+        generator.async_client.messages.stream.side_effect = [
+            FakeStream([], tool_use_message()),
+            FakeStream(["MCP ", "is a protocol"], text_message("MCP is a protocol")),
+        ]
+        tool_manager = Mock()
+        tool_manager.execute_tools.return_value = [
+            ToolResult("[MCP Course]\nsearch result", ["MCP Course"])
+        ]
+
+        fragments = [
+            text
+            async for text in generator.astream_response(
+                "what is MCP",
+                tools=[{"name": "search_course_content"}],
+                tool_manager=tool_manager,
+            )
+        ]
+
+        assert fragments == ["MCP ", "is a protocol"]
+        tool_manager.execute_tools.assert_called_once_with(
+            [("search_course_content", {"query": "MCP"})]
+        )
+        follow_up = generator.async_client.messages.stream.call_args_list[1].kwargs
+        assert follow_up["messages"][-1]["content"][0]["tool_use_id"] == "toolu_1"
+        assert follow_up["tool_choice"] == {"type": "none"}
+
+    async def test_text_before_tool_use_is_discarded(self, generator):
+        """Test text streamed ahead of a tool call is followed by None"""
+        preamble = tool_use_message()
+        preamble.content.insert(0, SimpleNamespace(type="text", text="Let me search. "))
+        generator.async_client = Mock()
+        generator.async_client.messages.stream.side_effect = [
+            FakeStream(["Let me search. "], preamble),
+            FakeStream(["MCP ", "is a protocol"], text_message("MCP is a protocol")),
+        ]
+        tool_manager = Mock()
+        tool_manager.execute_tools.return_value = [
+            ToolResult("search result", ["MCP Course"])
+        ]
+
+        fragments = [
+            text
+            async for text in generator.astream_response(
+                "what is MCP",
+                tools=[{"name": "search_course_content"}],
+                tool_manager=tool_manager,
+            )
+        ]
+
+        assert fragments == ["Let me search. ", None, "MCP ", "is a protocol"]
+        follow_up = generator.async_client.messages.stream.call_args_list[1].kwargs
+        assert follow_up.get("tool_choice") != {"type": "none"}
+
+
+@pytest.mark.unit
+class TestToolLoop:
+    """Test the multi-round tool loop of generate_response"""
+
+    @pytest.fixture
+    def tool_manager(self):
+        tool_manager = Mock()
+        tool_manager.execute_tools.return_value = [
+            ToolResult("search result", ["Course - Lesson 1"])
+        ]
+        return tool_manager
+
+    def test_second_round_keeps_tools(self, generator, tool_manager):
+        """Test Claude can search again before answering"""
+        generator.client = Mock()
+        generator.client.messages.create.side_effect = [
+            tool_use_message("toolu_1"),
+            tool_use_message("toolu_2"),
+            text_message("Answer"),
+        ]
+        stats = GenerationStats()
+        sources = []
+
+        answer = generator.generate_response(
+            "q",
+            tools=[{"name": "search_course_content"}],
+            tool_manager=tool_manager,
+            stats=stats,
+            sources=sources,
+        )
+
+        assert answer == "Answer"
+        assert sources == ["Course - Lesson 1", "Course - Lesson 1"]
+        calls = [
+            call.kwargs for call in generator.client.messages.create.call_args_list
+        ]
+        assert calls[1]["tool_choice"] == {"type": "auto"}
+        assert calls[2]["tool_choice"] == {"type": "none"}
+        assert calls[0]["messages"] is calls[2]["messages"]
+        assert [m["role"] for m in calls[2]["messages"]] == [
+            "user",
+            "assistant",
+            "user",
+            "assistant",
+            "user",
+        ]
+        assert [r.stop_reason for r in stats.rounds] == [
+            "tool_use",
+            "tool_use",
+            "end_turn",
+        ]
+        assert stats.stop_cause == "max_rounds"
+
+    def test_direct_answer_exits_early(self, generator, tool_manager):
+        """Test a direct answer ends the loop after one call"""
+        generator.client = Mock()
+        generator.client.messages.create.side_effect = [
+            tool_use_message(),
+            text_message("Answer"),
+        ]
+        stats = GenerationStats()
+
+        generator.generate_response(
+            "q", tools=[{"name": "t"}], tool_manager=tool_manager, stats=stats
+        )
+
+        assert generator.client.messages.create.call_count == 2
+        assert generator.client.messages.create.call_args.kwargs["tool_choice"] == {
+            "type": "auto"
+        }
+        assert stats.stop_cause is None
+        assert generator.usage_stats()["rounds"] == 2
+
+    def test_token_budget_withdraws_tools(self, generator, tool_manager):
+        """Test tools are dropped once the token budget is spent"""
+        generator.max_tool_rounds = 5
+        generator.token_budget = 1000
+        generator.client = Mock()
+        generator.client.messages.create.side_effect = [
+            tool_use_message(input_tokens=1200),
+            text_message("Answer"),
+        ]
+        stats = GenerationStats()
+
+        generator.generate_response(
+            "q", tools=[{"name": "t"}], tool_manager=tool_manager, stats=stats
+        )
+
+        assert generator.client.messages.create.call_args.kwargs["tool_choice"] == {
+            "type": "none"
+        }
+        assert stats.stop_cause == "token_budget"
+        assert stats.total_tokens == 1210
+
+
+@pytest.mark.unit
+class TestPromptCaching:
+    """Test prompt caching breakpoints and cache usage statistics"""
+
+    def test_stable_prefix_is_cached_and_history_moves_to_messages(self, generator):
+        """Test the system prompt and tools carry cache_control and stay static"""
+        tools = [{"name": "first"}, {"name": "second"}]
+
+        params = generator._build_params(
+            "question", "User: hi\nAssistant: hello", tools
+        )
+
+        assert params["system"] == [
+            {
+                "type": "text",
+                "text": AIGenerator.SYSTEM_PROMPT,
+                "cache_control": {"type": "ephemeral"},
+            }
+        ]
+        assert params["tools"] == [
+            {"name": "first"},
+            {"name": "second", "cache_control": {"type": "ephemeral"}},
+        ]
+        assert tools[-1] == {"name": "second"}
+        assert params["messages"] == [
+            {
+                "role": "user",
+                "content": [
+                    {
+                        "type": "text",
+                        "text": "Previous conversation:\nUser: hi\nAssistant: hello",
+                    },
+                    {"type": "text", "text": "question"},
+                ],
+            }
+        ]
+        assert generator._build_params("other question")["system"] == params["system"]
+
+    def test_cache_tokens_are_recorded(self, generator):
+        """Test cache read and write tokens from the API usage are reported"""
+        response = text_message("Answer")
+        response.usage = SimpleNamespace(
+            input_tokens=20,
+            output_tokens=5,
+            cache_read_input_tokens=1500,
+            cache_creation_input_tokens=40,
+        )
+        generator.client = Mock()
+        generator.client.messages.create.return_value = response
+        stats = GenerationStats()
+
+        generator.generate_response("q", stats=stats)
+
+        round_stats = stats.rounds[0]
+        assert (round_stats.cache_read_tokens, round_stats.cache_write_tokens) == (
+            1500,
+            40,
+        )
+        assert stats.total_tokens == 1565
+        usage = generator.usage_stats()
+        assert (usage["cache_read_tokens"], usage["cache_write_tokens"]) == (1500, 40)
@@ -0,0 +1,135 @@
+from unittest.mock import patch
+
+import pytest
+from answer_cache import SemanticAnswerCache
+from config import Config
+from course_resolver import CourseResolver
+from rag_system import RAGSystem
+
+
+@pytest.fixture
+def cache():
+    return SemanticAnswerCache(threshold=0.9, max_entries=3, ttl_seconds=60)
+
+
+@pytest.mark.unit
+class TestSemanticAnswerCache:
+    """Test SemanticAnswerCache lookup, eviction and invalidation"""
+
+    def test_similar_query_hits(self, cache):
+        """Test a near-identical embedding returns the cached answer"""
+        cache.lookup([1.0, 0.0], (), version=1)
+        cache.store([1.0, 0.0], (), 1, "Answer", ["Course A - Lesson 1"])
+
+        cached = cache.lookup([0.99, 0.05], (), version=1)
+
+        assert cached.answer == "Answer"
+        assert cached.sources == ["Course A - Lesson 1"]
+        assert cache.stats()["hits"] == 1
+
+    def test_dissimilar_query_misses(self, cache):
+        """Test an embedding below the threshold is a miss"""
+        cache.lookup([1.0, 0.0], (), version=1)
+        cache.store([1.0, 0.0], (), 1, "Answer", [])
+
+        assert cache.lookup([0.0, 1.0], (), version=1) is None
+        assert cache.stats()["misses"] == 2
+
+    def test_scope_partitions_entries(self, cache):
+        """Test identical embeddings in different scopes do not match"""
+        cache.lookup([1.0, 0.0], (1,), version=1)
+        cache.store([1.0, 0.0], (1,), 1, "Lesson 1 answer", [])
+
+        assert cache.lookup([1.0, 0.0], (2,), version=1) is None
+        assert cache.lookup([1.0, 0.0], (1,), version=1).answer == "Lesson 1 answer"
+
+    def test_corpus_change_invalidates(self, cache):
+        """Test a new corpus version clears entries and rejects stale stores"""
+        cache.lookup([1.0, 0.0], (), version=1)
+        cache.store([1.0, 0.0], (), 1, "Old answer", [])
+
+        assert cache.lookup([1.0, 0.0], (), version=2) is None
+        cache.store([1.0, 0.0], (), 1, "Stale answer", [])
+        assert cache.lookup([1.0, 0.0], (), version=2) is None
+        assert cache.stats()["invalidations"] == 1
+
+    def test_lru_eviction(self, cache):
+        """Test the least recently used entry is evicted beyond max_entries"""
+        vectors = [[1.0, 0.0, 0.0, 0.0], [0.0, 1.0, 0.0, 0.0], [0.0, 0.0, 1.0, 0.0]]
+        cache.lookup(vectors[0], (), version=1)
+        for i, vector in enumerate(vectors):
+            cache.store(vector, (), 1, f"Answer {i}", [])
+
+        # Touch the oldest entry so the second one becomes least recently used
+        cache.lookup(vectors[0], (), version=1)
+        cache.store([0.0, 0.0, 0.0, 1.0], (), 1, "Answer 3", [])
+
+        assert cache.lookup(vectors[1], (), version=1) is None
+        assert cache.lookup(vectors[0], (), version=1).answer == "Answer 0"
+        assert cache.stats()["evictions"] == 1
+
+    def test_memory_bound_evicts(self):
+        """Test entries are evicted to stay under max_bytes"""
+        cache = SemanticAnswerCache(threshold=0.9, max_bytes=1500)
+        cache.lookup([1.0, 0.0], (), version=1)
+        cache.store([1.0, 0.0], (), 1, "a" * 900, [])
+        cache.store([0.0, 1.0], (), 1, "b" * 900, [])
+
+        stats = cache.stats()
+        assert stats["entries"] == 1
+        assert stats["bytes"] <= 1500
+
+    def test_ttl_expiry(self, cache):
+        """Test entries older than the TTL are not returned"""
+        with patch("answer_cache.time.monotonic", return_value=0.0):
+            cache.lookup([1.0, 0.0], (), version=1)
+            cache.store([1.0, 0.0], (), 1, "Answer", [])
+
+        with patch("answer_cache.time.monotonic", return_value=120.0):
+            assert cache.lookup([1.0, 0.0], (), version=1) is None
+
+        assert cache.stats()["expirations"] == 1
+
+
+@pytest.mark.unit
+class TestAnswerCacheKey:
+    """Test the answer cache keys RAGSystem builds for queries"""
+
+    @pytest.fixture
+    def rag_system(self):
+        config = Config(
+            ANTHROPIC_API_KEY="test-key",
+            INGEST_MANIFEST_PATH="",
+            ANSWER_CACHE_ENABLED=True,
+        )
+        with patch("rag_system.VectorStore"):
+            system = RAGSystem(config)
+        resolver = CourseResolver(embed=None)
+        resolver.rebuild(
+            ["MCP: Build Rich-Context AI Apps with Anthropic", "Advanced Retrieval"],
+            [[1.0, 0.0], [0.0, 1.0]],
+        )
+        store = system.vector_store
+        store.mentioned_course_titles.side_effect = resolver.mentioned_titles
+        store.embed_query.return_value = [1.0, 0.0]
+        store.corpus_version = 1
+        yield system
+        system.shutdown()
+
+    def test_scope_includes_named_courses(self, rag_system):
+        """Test the same lesson of two named courses does not share answers"""
+        mcp = rag_system._answer_cache_key("What is in lesson 2 of MCP?", None)
+        retrieval = rag_system._answer_cache_key(
+            "What is in lesson 2 of Advanced Retrieval?", None
+        )
+        cache = rag_system.answer_cache
+        cache.lookup(*mcp)
+        cache.store(*mcp, "MCP lesson 2", [])
+
+        assert mcp[1] == ((2,), ("MCP: Build Rich-Context AI Apps with Anthropic",))
+        assert cache.lookup(*retrieval) is None
+        assert cache.lookup(*mcp).answer == "MCP lesson 2"
+
+    def test_follow_up_questions_are_not_cached(self, rag_system):
+        """Test queries with conversation history get no cache key"""
+        assert rag_system._answer_cache_key("and lesson 3?", "User: hi") is None
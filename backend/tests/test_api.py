@@ -110,6 +110,70 @@ class TestQueryAPI:
         assert isinstance(data["session_id"], str)
 
 
+def parse_sse(body):
+    """Split a Server-Sent Events body into (event, data) pairs"""
+    events = []
+    for raw in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in raw.split("\n"))
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+@pytest.mark.api
+class TestQueryStreamAPI:
+    """Test the /api/query/stream endpoint"""
+
+    def test_stream_emits_tokens_then_sources_and_done(self, test_client, mock_rag_system):
+        """Test tokens arrive in order followed by trailing sources and done events"""
+        async def fake_stream(query, session_id):
+            yield {"type": "token", "text": "Hello "}
+            yield {"type": "token", "text": "world"}
+            yield {"type": "sources", "sources": ["Test Course - Lesson 1"]}
+
+        mock_rag_system.astream_query = fake_stream
+
+        response = test_client.post(
+            "/api/query/stream",
+            json={"query": "test query", "session_id": "stream-session"}
+        )
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        assert parse_sse(response.text) == [
+            ("token", {"text": "Hello "}),
+            ("token", {"text": "world"}),
+            ("sources", {"sources": ["Test Course - Lesson 1"]}),
+            ("done", {"session_id": "stream-session"}),
+        ]
+
+    def test_stream_creates_session(self, test_client, mock_rag_system):
+        """Test streaming without a session id creates one"""
+        async def fake_stream(query, session_id):
+            yield {"type": "sources", "sources": []}
+
+        mock_rag_system.astream_query = fake_stream
+
+        response = test_client.post("/api/query/stream", json={"query": "test"})
+
+        events = parse_sse(response.text)
+        assert events[-1] == ("done", {"session_id": "test-session-123"})
+        mock_rag_system.session_manager.create_session.assert_called()
+
+    def test_stream_reports_errors_as_event(self, test_client, mock_rag_system):
+        """Test failures mid-stream are sent as an error event"""
+        async def fake_stream(query, session_id):
+            yield {"type": "token", "text": "partial"}
+            raise Exception("LLM unavailable")
+
+        mock_rag_system.astream_query = fake_stream
+
+        response = test_client.post("/api/query/stream", json={"query": "test"})
+
+        events = parse_sse(response.text)
+        assert events[0] == ("token", {"text": "partial"})
+        assert events[-1] == ("error", {"detail": "LLM unavailable"})
+
+
 @pytest.mark.api
 class TestCoursesAPI:
     """Test the /api/courses endpoint"""
@@ -160,6 +224,47 @@ class TestCoursesAPI:
         assert response.status_code == 200
 
 
+@pytest.mark.api
+class TestHealthAPI:
+    """Test the /api/health and /api/ready endpoints"""
+
+    def indexing_status(self, state):
+        return {
+            "state": state,
+            "error": None,
+            "progress": {"files_total": 4, "files_done": 1, "eta_seconds": 3.0},
+        }
+
+    def test_health_reports_indexing_progress(self, test_client, mock_rag_system):
+        """Test health is ok while indexing and includes progress"""
+        mock_rag_system.get_indexing_status.return_value = self.indexing_status("indexing")
+
+        response = test_client.get("/api/health")
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["status"] == "ok"
+        assert data["indexing"]["progress"]["files_done"] == 1
+
+    def test_not_ready_while_indexing(self, test_client, mock_rag_system):
+        """Test readiness is 503 until indexing finishes"""
+        mock_rag_system.get_indexing_status.return_value = self.indexing_status("indexing")
+
+        response = test_client.get("/api/ready")
+
+        assert response.status_code == 503
+        assert response.json()["progress"]["eta_seconds"] == 3.0
+
+    def test_ready_after_indexing(self, test_client, mock_rag_system):
+        """Test readiness is 200 once indexing has finished"""
+        mock_rag_system.get_indexing_status.return_value = self.indexing_status("ready")
+
+        response = test_client.get("/api/ready")
+
+        assert response.status_code == 200
+        assert response.json()["state"] == "ready"
+
+
 @pytest.mark.api
 class TestCORSAndMiddleware:
     """Test CORS and middleware configuration"""
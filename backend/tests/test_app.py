@@ -1,85 +1,45 @@
-from fastapi import FastAPI, HTTPException
-from fastapi.middleware.cors import CORSMiddleware
-from fastapi.middleware.trustedhost import TrustedHostMiddleware
-from pydantic import BaseModel
-from typing import List, Optional
+import importlib
+import os
+from unittest.mock import patch
 
-from config import config
-from rag_system import RAGSystem
+from fastapi import FastAPI
+from starlette.routing import Mount
 
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
-class QueryRequest(BaseModel):
-    """Request model for course queries"""
-    query: str
-    session_id: Optional[str] = None
 
+def import_app():
+    """
+    Import app.py without building its RAG system.
 
-class QueryResponse(BaseModel):
-    """Response model for course queries"""
-    answer: str
-    sources: List[str]
-    session_id: str
+    app.py creates a RAGSystem at import time, so the import runs with
+    RAGSystem patched out; its endpoints look up the module's rag_system on
+    every request, so tests replace that attribute.
+    """
+    cwd = os.getcwd()
+    os.chdir(BACKEND)  # app.py mounts ../frontend relative to the working dir
+    try:
+        with patch("rag_system.RAGSystem"):
+            return importlib.import_module("app")
+    finally:
+        os.chdir(cwd)
 
 
-class CourseStats(BaseModel):
-    """Response model for course statistics"""
-    total_courses: int
-    course_titles: List[str]
+app_module = import_app()
+QueryRequest = app_module.QueryRequest
+QueryResponse = app_module.QueryResponse
+CourseStats = app_module.CourseStats
 
 
-def create_test_app(rag_system_instance=None):
-    """Create FastAPI app for testing without static file mounting"""
-    if rag_system_instance is None:
-        rag_system_instance = RAGSystem(config)
-    
+def create_test_app(rag_system_instance):
+    """
+    Serve the endpoints and middleware of app.py, without its static file
+    mount, from the given RAG system.
+    """
+    app_module.rag_system = rag_system_instance
     app = FastAPI(title="Test Course Materials RAG System", root_path="")
-    
-    # Add trusted host middleware for proxy
-    app.add_middleware(
-        TrustedHostMiddleware,
-        allowed_hosts=["*"]
+    app.user_middleware = list(app_module.app.user_middleware)
+    app.router.routes.extend(
+        route for route in app_module.app.router.routes if not isinstance(route, Mount)
     )
-    
-    # Enable CORS with proper settings for proxy
-    app.add_middleware(
-        CORSMiddleware,
-        allow_origins=["*"],
-        allow_credentials=True,
-        allow_methods=["*"],
-        allow_headers=["*"],
-        expose_headers=["*"],
-    )
-    
-    @app.post("/api/query", response_model=QueryResponse)
-    async def query_documents(request: QueryRequest):
-        """Process a query and return response with sources"""
-        try:
-            # Create session if not provided
-            session_id = request.session_id
-            if not session_id:
-                session_id = rag_system_instance.session_manager.create_session()
-            
-            # Process query using RAG system
-            answer, sources = rag_system_instance.query(request.query, session_id)
-            
-            return QueryResponse(
-                answer=answer,
-                sources=sources,
-                session_id=session_id
-            )
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=str(e))
-
-    @app.get("/api/courses", response_model=CourseStats)
-    async def get_course_stats():
-        """Get course analytics and statistics"""
-        try:
-            analytics = rag_system_instance.get_course_analytics()
-            return CourseStats(
-                total_courses=analytics["total_courses"],
-                course_titles=analytics["course_titles"]
-            )
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=str(e))
-    
-    return app
\ No newline at end of file
+    return app
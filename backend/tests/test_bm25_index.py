@@ -0,0 +1,136 @@
+import sys
+import types
+
+import numpy as np
+import pytest
+from bm25_index import BM25Index, reciprocal_rank_fusion, tokenize
+from embedding_service import LazySentenceTransformerEmbeddingFunction
+from models import CourseChunk
+from vector_store import VectorStore
+
+
+def chunk_metadata(course, lesson):
+    return {"course_title": course, "lesson_number": lesson}
+
+
+@pytest.fixture
+def index():
+    index = BM25Index()
+    index.add(
+        ["a_0", "a_1", "b_0"],
+        [
+            "Call client.messages.create with a tool_use block",
+            "Prompt caching lowers latency for long prompts",
+            "Chroma stores embeddings and runs similarity search",
+        ],
+        [chunk_metadata("A", 1), chunk_metadata("A", 2), chunk_metadata("B", 1)],
+    )
+    return index
+
+
+@pytest.mark.unit
+class TestBM25Index:
+    """Test the in-memory BM25 index"""
+
+    def test_tokenize_splits_identifiers(self):
+        """Test identifiers are indexed whole and by their parts"""
+        assert tokenize("the tool_use block") == ["tool_use", "tool", "use", "block"]
+        assert tokenize("getUserId") == ["getuserid", "get", "user", "id"]
+
+    def test_exact_identifier_ranks_first(self, index):
+        """Test a chunk mentioning an identifier outranks the others"""
+        hits = index.search("what does client.messages.create return", 3)
+
+        assert hits[0][0] == "a_0"
+        assert all(score > 0 for _, score in hits)
+
+    def test_filters_by_course_and_lesson(self, index):
+        """Test course and lesson filters restrict the hits"""
+        assert index.search("search latency", 5, course_title="B") == [
+            ("b_0", pytest.approx(index.search("search", 5)[0][1]))
+        ]
+        assert [
+            hit for hit, _ in index.search("latency search", 5, lesson_number=2)
+        ] == ["a_1"]
+        assert index.search("search", 5, course_title="Unknown") == []
+
+    def test_re_adding_replaces_chunk(self, index):
+        """Test adding an existing ID replaces its text"""
+        index.add(["a_1"], ["Rewritten about embeddings"], [chunk_metadata("A", 2)])
+
+        assert index.search("caching", 5) == []
+        assert len(index) == 3
+
+    def test_removed_chunks_are_compacted(self, index):
+        """Test removing chunks drops them from results and postings"""
+        index.remove(["a_0", "a_1"])
+
+        assert index.search("tool_use caching", 5) == []
+        assert [hit for hit, _ in index.search("similarity", 5)] == ["b_0"]
+        assert len(index) == 1
+
+        index.remove_course("B")
+        assert index.search("similarity", 5) == []
+
+    def test_reciprocal_rank_fusion(self):
+        """Test items ranked well by both lists come first"""
+        fused = reciprocal_rank_fusion([["x", "y", "z"], ["y", "w"]], k=60)
+
+        assert [item for item, _ in fused] == ["y", "x", "w", "z"]
+
+
+class FakeModel:
+    """Embeds every text to the same vector so only BM25 can tell them apart"""
+
+    def encode(self, texts, convert_to_numpy=True, normalize_embeddings=False):
+        return np.ones((len(texts), 4), dtype=np.float32)
+
+
+@pytest.mark.unit
+class TestHybridSearch:
+    """Test VectorStore hybrid search"""
+
+    @pytest.fixture
+    def store(self, temp_data_dir, monkeypatch):
+        module = types.ModuleType("sentence_transformers")
+        module.SentenceTransformer = lambda **kwargs: FakeModel()
+        monkeypatch.setitem(sys.modules, "sentence_transformers", module)
+        monkeypatch.setattr(LazySentenceTransformerEmbeddingFunction, "models", {})
+        store = VectorStore(temp_data_dir, "fake-model", search_mode="hybrid")
+        chunks = [
+            CourseChunk(
+                content=f"General notes number {i}",
+                course_title="A",
+                lesson_number=1,
+                chunk_index=i,
+            )
+            for i in range(10)
+        ]
+        chunks.append(
+            CourseChunk(
+                content="Pass tool_choice to force a tool",
+                course_title="A",
+                lesson_number=2,
+                chunk_index=10,
+            )
+        )
+        store.add_course_content(chunks)
+        return store
+
+    def test_identifier_found_by_keyword_retriever(self, store):
+        """Test an exact identifier hit is returned although vectors tie"""
+        results = store.search("how do I set tool_choice", limit=3)
+
+        assert results.error is None
+        assert results.ids[0] == "A_10"
+        assert results.documents[0] == "Pass tool_choice to force a tool"
+        assert results.distances[0] == 0
+
+    def test_index_follows_deletes(self, store):
+        """Test deleted chunks disappear from keyword results"""
+        store.search("warm up", limit=1)
+        store.delete_chunks(["A_10"])
+
+        results = store.search("tool_choice", limit=3)
+
+        assert "A_10" not in results.ids
@@ -0,0 +1,201 @@
+import asyncio
+import random
+import threading
+import time
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+from config import Config
+from fastapi.testclient import TestClient
+from rag_system import RAGSystem
+from vector_store import SearchResults
+
+from .test_ai_generator import FakeStream
+from .test_api import parse_sse
+from .test_app import create_test_app
+
+PROMPT_PREFIX = "Answer this question about course materials: "
+
+
+def respond(params):
+    """Ask for one search of the question, then answer with what it found"""
+    last = params["messages"][-1]
+    if isinstance(last["content"], str):
+        question = last["content"][len(PROMPT_PREFIX) :]
+        block = SimpleNamespace(
+            type="tool_use",
+            id=f"toolu_{question}",
+            name="search_course_content",
+            input={"query": question},
+        )
+        return SimpleNamespace(stop_reason="tool_use", content=[block])
+    found = last["content"][0]["content"]
+    return SimpleNamespace(
+        stop_reason="end_turn",
+        content=[SimpleNamespace(type="text", text=f"Answer: {found}")],
+    )
+
+
+class FakeMessages:
+    def create(self, **params):
+        time.sleep(random.uniform(0, 0.005))
+        return respond(params)
+
+
+class AsyncFakeMessages:
+    async def create(self, **params):
+        await asyncio.sleep(random.uniform(0, 0.005))
+        return respond(params)
+
+
+def search_many(searches):
+    """Each search finds a chunk of a course named after its query"""
+    time.sleep(random.uniform(0, 0.005))
+    return [
+        SearchResults(
+            documents=[f"chunk about {search['query']}"],
+            metadata=[{"course_title": search["query"], "lesson_number": 1}],
+            distances=[0.1],
+        )
+        for search in searches
+    ]
+
+
+@pytest.fixture
+def rag_system():
+    config = Config(
+        ANTHROPIC_API_KEY="test-key",
+        INGEST_MANIFEST_PATH="",
+        ANSWER_CACHE_ENABLED=False,
+    )
+    with patch("rag_system.VectorStore"):
+        system = RAGSystem(config)
+    system.vector_store.search_many.side_effect = search_many
+    system.ai_generator.client = SimpleNamespace(messages=FakeMessages())
+    system.ai_generator.async_client = SimpleNamespace(messages=AsyncFakeMessages())
+    yield system
+    system.shutdown()
+
+
+@pytest.mark.unit
+class TestConcurrentQueries:
+    """Stress concurrent queries for cross-talk between requests"""
+
+    async def test_concurrent_queries_keep_their_own_sources(self, rag_system):
+        """Test async and threaded queries each get their own sources and history"""
+        sync_results = {}
+
+        def sync_query(topic):
+            session_id = rag_system.session_manager.create_session()
+            sync_results[topic] = (session_id, rag_system.query(topic, session_id))
+
+        async def async_query(topic):
+            session_id = rag_system.session_manager.create_session()
+            return topic, session_id, await rag_system.aquery(topic, session_id)
+
+        threads = [
+            threading.Thread(target=sync_query, args=(f"threaded-{i}",))
+            for i in range(20)
+        ]
+        for thread in threads:
+            thread.start()
+        async_results = await asyncio.gather(
+            *(async_query(f"async-{i}") for i in range(60))
+        )
+        for thread in threads:
+            thread.join()
+
+        results = [
+            (topic, session_id, result)
+            for topic, (session_id, result) in sync_results.items()
+        ]
+        results += async_results
+        assert len(results) == 80
+        for topic, session_id, (answer, sources) in results:
+            assert sources == [f"{topic} - Lesson 1"]
+            assert answer == f"Answer: [{topic} - Lesson 1]\nchunk about {topic}"
+            assert rag_system.session_manager.get_conversation_history(
+                session_id
+            ).startswith(f"User: {topic}\n")
+        assert len({session_id for _, session_id, _ in results}) == 80
+
+    async def test_session_storage_runs_off_the_event_loop(self, rag_system):
+        """Test session reads and writes of async queries run on worker threads"""
+        manager = rag_system.session_manager
+        threads = []
+        for name in ("create_session", "get_conversation_history", "add_exchange"):
+            method = getattr(manager, name)
+
+            def record(*args, _method=method, **kwargs):
+                threads.append(threading.current_thread())
+                return _method(*args, **kwargs)
+
+            setattr(manager, name, record)
+
+        session_id = await rag_system.acreate_session()
+        await rag_system.aquery("topic", session_id)
+
+        assert len(threads) == 3
+        assert threading.main_thread() not in threads
+
+    def test_query_endpoint_uses_the_async_path(self, rag_system):
+        """Test /api/query answers through aquery and never the blocking query"""
+        client = TestClient(create_test_app(rag_system))
+
+        with patch.object(rag_system, "query", side_effect=AssertionError):
+            response = client.post("/api/query", json={"query": "topic"})
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["answer"].startswith("Answer: ")
+        assert data["sources"] == ["topic - Lesson 1"]
+        history = rag_system.session_manager.get_conversation_history(
+            data["session_id"]
+        )
+        assert history.startswith("User: topic\n")
+
+    def test_stream_endpoint_sends_answer_sources_and_done(self, rag_system):
+        """Test the SSE events of /api/query/stream, discarding pre-search text"""
+
+        def stream(**params):
+            response = respond(params)
+            if response.stop_reason == "tool_use":
+                response.content.insert(0, SimpleNamespace(type="text", text="Hm. "))
+            texts = [block.text for block in response.content if block.type == "text"]
+            return FakeStream(texts, response)
+
+        rag_system.ai_generator.async_client = SimpleNamespace(
+            messages=SimpleNamespace(stream=stream)
+        )
+        client = TestClient(create_test_app(rag_system))
+
+        response = client.post("/api/query/stream", json={"query": "topic"})
+
+        assert response.headers["content-type"].startswith("text/event-stream")
+        events = parse_sse(response.text)
+        session_id = events[-1][1]["session_id"]
+        answer = rag_system.session_manager.get_conversation_history(session_id)
+        assert events == [
+            ("token", {"text": "Hm. "}),
+            ("discard", {}),
+            ("token", {"text": answer.split("Assistant: ", 1)[1]}),
+            ("sources", {"sources": ["topic - Lesson 1"]}),
+            ("done", {"session_id": session_id}),
+        ]
+        assert answer.startswith("User: topic\nAssistant: Answer: ")
+
+    def test_session_ids_are_unique_across_threads(self, rag_system):
+        """Test session ids created concurrently never collide"""
+        ids = []
+
+        def create():
+            ids.extend(rag_system.session_manager.create_session() for _ in range(200))
+
+        threads = [threading.Thread(target=create) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(set(ids)) == 1600
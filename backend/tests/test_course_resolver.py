@@ -0,0 +1,71 @@
+from unittest.mock import Mock
+
+import pytest
+from course_resolver import CourseResolver
+
+TITLES = [
+    "MCP: Build Rich-Context AI Apps with Anthropic",
+    "Advanced Retrieval for AI with Chroma",
+    "Building Towards Computer Use with Anthropic",
+]
+EMBEDDINGS = [[1.0, 0.0, 0.0], [0.0, 1.0, 0.0], [0.0, 0.0, 1.0]]
+
+
+@pytest.fixture
+def embed():
+    return Mock(return_value=[0.1, 0.9, 0.0])
+
+
+@pytest.fixture
+def resolver(embed):
+    resolver = CourseResolver(embed)
+    resolver.rebuild(TITLES, EMBEDDINGS)
+    return resolver
+
+
+@pytest.mark.unit
+class TestCourseResolver:
+    """Test CourseResolver lexical tiers and semantic fallback"""
+
+    @pytest.mark.parametrize(
+        "name, expected",
+        [
+            ("Advanced Retrieval for AI with Chroma", TITLES[1]),
+            ("mcp", TITLES[0]),
+            ("chroma", TITLES[1]),
+            ("computer use", TITLES[2]),
+            ("Computr Use", TITLES[2]),
+        ],
+    )
+    def test_lexical_match_skips_embedding(self, resolver, embed, name, expected):
+        """Test unambiguous lexical matches resolve without embedding the name"""
+        assert resolver.resolve(name) == expected
+        embed.assert_not_called()
+
+    def test_ambiguous_lexical_match_uses_similarity(self, resolver, embed):
+        """Test several lexical candidates are ranked by cosine similarity"""
+        embed.return_value = [0.0, 0.1, 0.9]
+
+        assert resolver.resolve("Anthropic") == TITLES[2]
+        embed.assert_called_once_with("Anthropic")
+
+    def test_semantic_fallback(self, resolver, embed):
+        """Test names with no lexical match fall back to the nearest title"""
+        assert resolver.resolve("vector databases") == TITLES[1]
+
+    def test_empty_index(self, embed):
+        """Test resolving against an empty catalog returns None"""
+        resolver = CourseResolver(embed)
+        resolver.rebuild([], [])
+
+        assert resolver.resolve("MCP") is None
+
+    def test_mentioned_titles(self, resolver, embed):
+        """Test titles are found by words no other title shares"""
+        assert resolver.mentioned_titles("Lesson 2 of the MCP course?") == [TITLES[0]]
+        assert resolver.mentioned_titles("compare chroma and computer use") == [
+            TITLES[1],
+            TITLES[2],
+        ]
+        assert resolver.mentioned_titles("what does lesson 2 cover with AI") == []
+        embed.assert_not_called()
@@ -0,0 +1,185 @@
+import os
+import random
+import re
+import types
+
+import pytest
+from document_processor import DocumentProcessor
+
+DOCS = os.path.join(os.path.dirname(__file__), "..", "..", "docs")
+
+
+def reference_chunk_text(chunk_size, chunk_overlap, text):
+    """The original quadratic chunker, kept to check output compatibility"""
+    text = re.sub(r"\s+", " ", text.strip())
+    sentence_endings = re.compile(
+        r"(?<!\w\.\w.)(?<![A-Z][a-z]\.)(?<=\.|\!|\?)\s+(?=[A-Z])"
+    )
+    sentences = [s.strip() for s in sentence_endings.split(text) if s.strip()]
+
+    chunks = []
+    i = 0
+    while i < len(sentences):
+        current_chunk = []
+        current_size = 0
+        for j in range(i, len(sentences)):
+            total_addition = len(sentences[j]) + (1 if current_chunk else 0)
+            if current_size + total_addition > chunk_size and current_chunk:
+                break
+            current_chunk.append(sentences[j])
+            current_size += total_addition
+
+        chunks.append(" ".join(current_chunk))
+        if chunk_overlap > 0:
+            overlap_size = 0
+            overlap_sentences = 0
+            for k in range(len(current_chunk) - 1, -1, -1):
+                sentence_len = len(current_chunk[k]) + (
+                    1 if k < len(current_chunk) - 1 else 0
+                )
+                if overlap_size + sentence_len <= chunk_overlap:
+                    overlap_size += sentence_len
+                    overlap_sentences += 1
+                else:
+                    break
+            i = max(i + len(current_chunk) - overlap_sentences, i + 1)
+        else:
+            i += len(current_chunk)
+    return chunks
+
+
+def random_text(rng, sentences):
+    words = ["alpha", "Beta", "e.g.", "Dr.", "tool_use", "x" * 40, "v1.2", "and", "the"]
+    parts = []
+    for _ in range(sentences):
+        sentence = " ".join(rng.choice(words) for _ in range(rng.randint(1, 30)))
+        parts.append(sentence.capitalize() + rng.choice([".", "!", "?", ""]))
+    return rng.choice([" ", "\n", "  \t", "\u00a0", "\u2003\x1c"]).join(parts)
+
+
+@pytest.mark.unit
+class TestChunkText:
+    """Test the sentence-based chunker"""
+
+    @pytest.mark.parametrize(
+        "chunk_size,chunk_overlap",
+        [(800, 100), (200, 50), (50, 0), (10, 30), (120, 500)],
+    )
+    def test_matches_reference_on_random_text(self, chunk_size, chunk_overlap):
+        """Test chunks are identical to the original implementation"""
+        rng = random.Random(chunk_size * 1000 + chunk_overlap)
+        processor = DocumentProcessor(chunk_size, chunk_overlap)
+
+        for _ in range(50):
+            text = random_text(rng, rng.randint(0, 60))
+            assert processor.chunk_text(text) == reference_chunk_text(
+                chunk_size, chunk_overlap, text
+            )
+
+    def test_matches_reference_on_course_documents(self):
+        """Test chunks of the bundled course scripts are unchanged"""
+        processor = DocumentProcessor(800, 100)
+
+        for name in sorted(os.listdir(DOCS)):
+            with open(os.path.join(DOCS, name), encoding="utf-8") as f:
+                text = f.read()
+            assert processor.chunk_text(text) == reference_chunk_text(800, 100, text)
+
+    def test_iter_chunks_is_lazy(self):
+        """Test chunks are produced on demand"""
+        processor = DocumentProcessor(20, 0)
+
+        chunks = processor.iter_chunks(
+            "First sentence here. Second sentence here. Third one."
+        )
+
+        assert isinstance(chunks, types.GeneratorType)
+        assert next(chunks) == "First sentence here."
+
+    def test_blank_text_has_no_chunks(self):
+        """Test whitespace-only text yields nothing"""
+        assert DocumentProcessor(800, 100).chunk_text(" \n\t ") == []
+
+
+def write_course(path, text, encoding="utf-8"):
+    with open(path, "wb") as f:
+        f.write(text.encode(encoding) if isinstance(text, str) else text)
+    return str(path)
+
+
+COURSE = """
+Course Title: Streaming Course
+Course Link: https://example.com/course
+Course Instructor: Ada
+
+Lesson 0: Introduction
+Lesson Link: https://example.com/lesson/0
+Welcome to the course. It covers parsing.
+Lesson 1: Details
+Lesson 1 has no link line. It is short.
+"""
+
+
+@pytest.mark.unit
+class TestProcessCourseDocument:
+    """Test the streaming course document parser"""
+
+    def test_parses_metadata_and_lessons(self, tmp_path):
+        """Test header, lesson links and chunk context prefixes"""
+        path = write_course(tmp_path / "course.txt", COURSE)
+
+        course, chunks = DocumentProcessor(800, 0).process_course_document(path)
+
+        assert course.title == "Streaming Course"
+        assert course.course_link == "https://example.com/course"
+        assert course.instructor == "Ada"
+        assert [
+            (lesson.lesson_number, lesson.lesson_link) for lesson in course.lessons
+        ] == [
+            (0, "https://example.com/lesson/0"),
+            (1, None),
+        ]
+        assert [chunk.content for chunk in chunks] == [
+            "Lesson 0 content: Welcome to the course. It covers parsing.",
+            "Course Streaming Course Lesson 1 content: "
+            "Lesson 1 has no link line. It is short.",
+        ]
+        assert [chunk.chunk_index for chunk in chunks] == [0, 1]
+
+    def test_yields_one_lesson_at_a_time(self, tmp_path):
+        """Test lessons are parsed only as the iterator advances"""
+        path = write_course(tmp_path / "course.txt", COURSE)
+
+        course, lessons = DocumentProcessor(800, 0).iter_course_document(path)
+
+        assert course.lessons == []
+        first = next(lessons)
+        assert [chunk.lesson_number for chunk in first] == [0]
+        assert len(course.lessons) == 1
+        assert [chunk.lesson_number for chunk in next(lessons)] == [1]
+        assert next(lessons, None) is None
+
+    def test_document_without_lessons_is_one_section(self, tmp_path):
+        """Test content without lesson markers is chunked as a whole"""
+        path = write_course(
+            tmp_path / "notes.txt",
+            "Notes\r\nCourse Link: x\r\n\r\nFirst part. Second part.\r\n",
+        )
+
+        course, chunks = DocumentProcessor(800, 0).process_course_document(path)
+
+        assert course.title == "Notes"
+        assert course.lessons == []
+        assert [(chunk.content, chunk.lesson_number) for chunk in chunks] == [
+            ("First part. Second part.", None)
+        ]
+
+    def test_invalid_utf8_is_ignored(self, tmp_path):
+        """Test undecodable bytes are dropped rather than failing the file"""
+        path = write_course(
+            tmp_path / "bad.txt", COURSE.encode("utf-8") + b"Broken \xff\xfe bytes.\n"
+        )
+
+        _, chunks = DocumentProcessor(800, 0).process_course_document(path)
+
+        assert chunks[-1].content.endswith("It is short. Broken bytes.")
@@ -0,0 +1,79 @@
+import os
+from unittest.mock import Mock
+
+import pytest
+from embedding_cache import CachedEmbeddingFunction
+
+
+def fake_embed(texts):
+    return [[float(len(text)), 1.0] for text in texts]
+
+
+@pytest.mark.unit
+class TestCachedEmbeddingFunction:
+    """Test CachedEmbeddingFunction memoization and persistence"""
+
+    def test_repeated_text_uses_cache(self):
+        """Test the underlying function only runs for unseen texts"""
+        embed = Mock(side_effect=fake_embed)
+        cache = CachedEmbeddingFunction(embed)
+
+        cache(["MCP"])
+        vectors = cache(["MCP", "Chroma"])
+
+        assert embed.call_count == 2
+        embed.assert_called_with(["Chroma"])
+        assert vectors[0].tolist() == [3.0, 1.0]
+        assert cache.stats()["hits"] == 1
+
+    def test_normalized_keys_share_vectors(self):
+        """Test whitespace variants map to one cache entry"""
+        embed = Mock(side_effect=fake_embed)
+        cache = CachedEmbeddingFunction(embed)
+
+        cache(["what is  MCP "])
+        cache(["what is MCP"])
+
+        assert embed.call_count == 1
+        assert cache.stats()["entries"] == 1
+
+    def test_misses_embedded_in_one_batch(self):
+        """Test duplicate misses are embedded once in a single call"""
+        embed = Mock(side_effect=fake_embed)
+        cache = CachedEmbeddingFunction(embed)
+
+        vectors = cache(["a", "bb", "a"])
+
+        embed.assert_called_once_with(["a", "bb"])
+        assert [v.tolist() for v in vectors] == [[1.0, 1.0], [2.0, 1.0], [1.0, 1.0]]
+
+    def test_lru_eviction(self):
+        """Test the least recently used vector is evicted at capacity"""
+        embed = Mock(side_effect=fake_embed)
+        cache = CachedEmbeddingFunction(embed, max_entries=2)
+
+        cache(["a"])
+        cache(["b"])
+        cache(["a"])
+        cache(["c"])
+        cache(["a"])
+
+        assert embed.call_count == 3
+        assert cache.stats()["evictions"] == 1
+
+    def test_persistence_round_trip(self, temp_data_dir):
+        """Test saved vectors are reloaded for the same model only"""
+        path = os.path.join(temp_data_dir, "embeddings.npz")
+        cache = CachedEmbeddingFunction(fake_embed, persist_path=path, model_name="m1")
+        cache(["MCP", "Chroma"])
+        cache.save()
+
+        embed = Mock(side_effect=fake_embed)
+        reloaded = CachedEmbeddingFunction(embed, persist_path=path, model_name="m1")
+        assert reloaded(["MCP"])[0].tolist() == [3.0, 1.0]
+        embed.assert_not_called()
+
+        other_model = CachedEmbeddingFunction(
+            fake_embed, persist_path=path, model_name="m2"
+        )
+        assert other_model.stats()["entries"] == 0
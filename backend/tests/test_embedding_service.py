@@ -0,0 +1,155 @@
+import os
+import socket
+import sys
+import threading
+import time
+import types
+from unittest.mock import Mock
+
+import numpy as np
+import pytest
+from embedding_service import (
+    EmbeddingService,
+    EmbeddingServiceClient,
+    LazySentenceTransformerEmbeddingFunction,
+)
+
+
+class FakeModel:
+    """Stand-in for SentenceTransformer: embeds each text as [len, words]"""
+
+    def encode(self, texts, convert_to_numpy=True, normalize_embeddings=False):
+        return np.array(
+            [[len(text), len(text.split())] for text in texts], dtype=np.float32
+        )
+
+
+@pytest.fixture
+def fake_model(monkeypatch):
+    """Replace sentence_transformers with a module whose model is FakeModel"""
+    module = types.ModuleType("sentence_transformers")
+    module.SentenceTransformer = Mock(side_effect=lambda **kwargs: FakeModel())
+    monkeypatch.setitem(sys.modules, "sentence_transformers", module)
+    monkeypatch.setattr(LazySentenceTransformerEmbeddingFunction, "models", {})
+    return module.SentenceTransformer
+
+
+@pytest.fixture
+def server(fake_model, temp_data_dir):
+    path = os.path.join(temp_data_dir, "embeddings.sock")
+    server = EmbeddingService(path, "all-MiniLM-L6-v2")
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def service(server):
+    return server.server_address
+
+
+@pytest.mark.unit
+class TestLazyEmbeddingFunction:
+    """Test lazy model loading"""
+
+    def test_model_loads_on_first_embed(self, fake_model):
+        """Test constructing the function does not load the model"""
+        embedding_function = LazySentenceTransformerEmbeddingFunction(
+            "all-MiniLM-L6-v2"
+        )
+
+        fake_model.assert_not_called()
+        assert not embedding_function.is_loaded
+
+        vectors = embedding_function(["two words"])
+
+        fake_model.assert_called_once()
+        assert vectors[0].tolist() == [9.0, 2.0]
+
+    def test_model_is_shared_between_instances(self, fake_model):
+        """Test a loaded model is reused by later instances in the process"""
+        LazySentenceTransformerEmbeddingFunction("all-MiniLM-L6-v2")(["a"])
+        LazySentenceTransformerEmbeddingFunction("all-MiniLM-L6-v2")(["b"])
+
+        fake_model.assert_called_once()
+
+    def test_chroma_config_matches_sentence_transformer(self):
+        """Test Chroma sees the same name and config as the eager function"""
+        embedding_function = LazySentenceTransformerEmbeddingFunction(
+            "all-MiniLM-L6-v2"
+        )
+
+        assert embedding_function.name() == "sentence_transformer"
+        assert embedding_function.get_config()["model_name"] == "all-MiniLM-L6-v2"
+
+
+@pytest.mark.unit
+class TestEmbeddingService:
+    """Test the shared embedding service and its client"""
+
+    def test_client_embeds_through_service(self, service, fake_model):
+        """Test vectors computed by the service match local embeddings"""
+        client = EmbeddingServiceClient(service, model_name="all-MiniLM-L6-v2")
+
+        vectors = client(["one", "three more words"])
+
+        assert [vector.tolist() for vector in vectors] == [[3.0, 1.0], [16.0, 3.0]]
+        assert not client.use_local_model
+        assert fake_model.call_count == 1
+
+    def test_client_falls_back_without_service(self, fake_model, temp_data_dir):
+        """Test an unreachable service makes the client load the model itself"""
+        path = os.path.join(temp_data_dir, "missing.sock")
+        client = EmbeddingServiceClient(path, model_name="all-MiniLM-L6-v2")
+
+        vectors = client(["one"])
+
+        assert client.use_local_model
+        assert vectors[0].tolist() == [3.0, 1.0]
+
+    def test_client_retries_service_after_back_off(self, service, fake_model):
+        """Test a fallback to the local model only lasts until the retry time"""
+        client = EmbeddingServiceClient(
+            service, model_name="all-MiniLM-L6-v2", retry_after=60
+        )
+        client._retry_at = time.monotonic() + 60
+        assert client.use_local_model
+
+        client._retry_at = time.monotonic()
+        vectors = client(["one"])
+
+        assert not client.use_local_model
+        assert vectors[0].tolist() == [3.0, 1.0]
+        assert fake_model.call_count == 1
+
+    def test_hung_service_times_out(self, fake_model, temp_data_dir):
+        """Test a service that never answers makes the client fall back"""
+        path = os.path.join(temp_data_dir, "hung.sock")
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        listener.bind(path)
+        listener.listen()
+        client = EmbeddingServiceClient(
+            path, model_name="all-MiniLM-L6-v2", timeout=0.1
+        )
+
+        try:
+            vectors = client(["one"])
+        finally:
+            listener.close()
+
+        assert client.use_local_model
+        assert vectors[0].tolist() == [3.0, 1.0]
+
+    def test_encode_errors_are_reported_to_the_client(self, server, service):
+        """Test a failed encode answers with an error and keeps the connection"""
+        client = EmbeddingServiceClient(service, model_name="all-MiniLM-L6-v2")
+        embed = server.embedding_function
+        server.embedding_function = Mock(side_effect=MemoryError("out of memory"))
+
+        with pytest.raises(RuntimeError, match="out of memory"):
+            client(["one"])
+        server.embedding_function = embed
+
+        assert client(["one"])[0].tolist() == [3.0, 1.0]
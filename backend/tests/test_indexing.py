@@ -0,0 +1,61 @@
+import threading
+from unittest.mock import patch
+
+import pytest
+from config import Config
+from rag_system import RAGSystem
+
+
+@pytest.fixture
+def rag_system():
+    config = Config(ANTHROPIC_API_KEY="test-key", INGEST_MANIFEST_PATH="")
+    with patch("rag_system.VectorStore"):
+        system = RAGSystem(config)
+    yield system
+    system.shutdown()
+
+
+@pytest.mark.unit
+class TestBackgroundIndexing:
+    """Test background indexing and its status reporting"""
+
+    def test_idle_before_indexing(self, rag_system):
+        """Test status is idle when no indexing run was started"""
+        status = rag_system.get_indexing_status()
+
+        assert status == {"state": "idle", "error": None, "progress": None}
+
+    def test_indexing_runs_in_background(self, rag_system):
+        """Test start_indexing returns while the folder is still being ingested"""
+        release = threading.Event()
+
+        def add_course_folder(folder_path, progress=None):
+            progress.files_total = 3
+            release.wait(5)
+            return 1, 10
+
+        with patch.object(
+            rag_system, "add_course_folder", side_effect=add_course_folder
+        ):
+            assert rag_system.start_indexing("docs")
+            assert not rag_system.start_indexing("docs")
+            status = rag_system.get_indexing_status()
+
+            release.set()
+            rag_system._indexing_thread.join(5)
+
+        assert status["state"] == "indexing"
+        assert status["progress"]["files_total"] == 3
+        assert rag_system.get_indexing_status()["state"] == "ready"
+
+    def test_indexing_errors_are_reported(self, rag_system):
+        """Test a failed run is reported with its error"""
+        with patch.object(
+            rag_system, "add_course_folder", side_effect=OSError("disk full")
+        ):
+            rag_system.start_indexing("docs")
+            rag_system._indexing_thread.join(5)
+
+        status = rag_system.get_indexing_status()
+        assert status["state"] == "failed"
+        assert status["error"] == "disk full"
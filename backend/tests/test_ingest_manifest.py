@@ -0,0 +1,60 @@
+import os
+
+import pytest
+from ingest_manifest import IngestManifest
+
+
+@pytest.fixture
+def course_file(temp_data_dir):
+    path = os.path.join(temp_data_dir, "course.txt")
+    with open(path, "w") as f:
+        f.write("Course Title: Manifest Course\n")
+    return path
+
+
+@pytest.mark.unit
+class TestIngestManifest:
+    """Test the ingested-file manifest"""
+
+    def test_unknown_file_is_changed(self, temp_data_dir, course_file):
+        """Test files never recorded are reported as changed"""
+        manifest = IngestManifest(os.path.join(temp_data_dir, "manifest.json"))
+
+        assert not manifest.is_unchanged(course_file)
+
+    def test_recorded_file_is_unchanged(self, temp_data_dir, course_file):
+        """Test a recorded file matches its entry until it is edited"""
+        manifest = IngestManifest(os.path.join(temp_data_dir, "manifest.json"))
+        manifest.record(course_file, "Manifest Course", ["Manifest_Course_0"])
+
+        assert manifest.is_unchanged(course_file)
+
+        with open(course_file, "a") as f:
+            f.write("Lesson 1: Added\n")
+        assert not manifest.is_unchanged(course_file)
+
+    def test_touched_file_with_same_content_is_unchanged(
+        self, temp_data_dir, course_file
+    ):
+        """Test an mtime-only change falls back to the content hash"""
+        manifest = IngestManifest(os.path.join(temp_data_dir, "manifest.json"))
+        manifest.record(course_file, "Manifest Course", [])
+        stat = os.stat(course_file)
+        os.utime(course_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+        assert manifest.is_unchanged(course_file)
+        assert manifest.get(course_file).mtime_ns == stat.st_mtime_ns + 10**9
+
+    def test_entries_survive_reload(self, temp_data_dir, course_file):
+        """Test saved entries are loaded by a new manifest"""
+        path = os.path.join(temp_data_dir, "manifest.json")
+        manifest = IngestManifest(path)
+        manifest.record(course_file, "Manifest Course", ["Manifest_Course_0"])
+        manifest.save()
+
+        reloaded = IngestManifest(path)
+
+        assert reloaded.is_unchanged(course_file)
+        assert reloaded.get(course_file).chunk_ids == ["Manifest_Course_0"]
+        assert reloaded.owner_of("Manifest Course") == manifest.key(course_file)
+        assert reloaded.paths_under(temp_data_dir) == [manifest.key(course_file)]
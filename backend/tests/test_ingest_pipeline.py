@@ -0,0 +1,203 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import Mock
+
+import pytest
+from document_processor import DocumentProcessor
+import ingest_pipeline
+from ingest_pipeline import IngestPipeline
+from vector_store import VectorStore
+
+
+@pytest.fixture
+def store():
+    store = Mock()
+    store.embed_documents.side_effect = lambda texts: [
+        [float(i)] for i in range(len(texts))
+    ]
+    store.chunk_id.side_effect = VectorStore.chunk_id
+    store.get_course_chunk_documents.return_value = {}
+    return store
+
+
+def doc_paths(folder):
+    return [os.path.join(folder, name) for name in sorted(os.listdir(folder))]
+
+
+@pytest.mark.unit
+class TestIngestPipeline:
+    """Test the staged ingestion pipeline"""
+
+    def test_documents_share_one_embedding_batch(self, temp_docs_folder, store):
+        """Test chunks from several documents are embedded in one model call"""
+        pipeline = IngestPipeline(
+            DocumentProcessor(200, 50), store, parse_workers=1, embed_batch_size=100
+        )
+
+        progress = pipeline.run(doc_paths(temp_docs_folder))
+
+        store.embed_documents.assert_called_once()
+        texts = store.embed_documents.call_args.args[0]
+        assert texts[:2] == ["Course_A", "Course_B"]
+        assert progress.courses_added == 2
+        assert progress.chunks_written == progress.chunks_embedded == len(texts) - 2
+        assert progress.files_done == progress.files_total == 2
+
+    def test_writer_bulk_inserts_with_precomputed_embeddings(
+        self, temp_docs_folder, store
+    ):
+        """Test content is written in one call with matching embeddings"""
+        pipeline = IngestPipeline(
+            DocumentProcessor(200, 50), store, parse_workers=1, embed_batch_size=100
+        )
+
+        pipeline.run(doc_paths(temp_docs_folder))
+
+        store.add_course_content.assert_called_once()
+        chunks, embeddings = store.add_course_content.call_args.args
+        assert len(chunks) == len(embeddings)
+        assert {chunk.course_title for chunk in chunks} == {"Course_A", "Course_B"}
+        titles = [
+            call.args[0].title for call in store.add_course_metadata.call_args_list
+        ]
+        assert titles == ["Course_A", "Course_B"]
+
+    def test_small_batches_flush_per_document(self, temp_docs_folder, store):
+        """Test a batch is flushed once it reaches embed_batch_size chunks"""
+        pipeline = IngestPipeline(
+            DocumentProcessor(200, 50), store, parse_workers=1, embed_batch_size=1
+        )
+
+        pipeline.run(doc_paths(temp_docs_folder))
+
+        assert store.embed_documents.call_count == 2
+        assert store.add_course_content.call_count == 2
+
+    def test_existing_courses_are_skipped(self, temp_docs_folder, store):
+        """Test courses already in the store are not embedded again"""
+        pipeline = IngestPipeline(DocumentProcessor(200, 50), store, parse_workers=1)
+
+        progress = pipeline.run(doc_paths(temp_docs_folder), skip_titles={"Course_A"})
+
+        texts = store.embed_documents.call_args.args[0]
+        assert texts[0] == "Course_B"
+        assert progress.courses_added == 1
+
+    def test_only_changed_chunks_are_embedded(self, temp_docs_folder, store):
+        """Test stored chunks with identical text are not embedded or rewritten"""
+        processor = DocumentProcessor(200, 50)
+        path = doc_paths(temp_docs_folder)[0]
+        _, chunks = processor.process_course_document(path)
+        stored = {VectorStore.chunk_id(chunk): chunk.content for chunk in chunks}
+        stored[VectorStore.chunk_id(chunks[0])] = "old text"
+        stored["Course_A_999"] = "removed chunk"
+        store.get_course_chunk_documents.return_value = stored
+        pipeline = IngestPipeline(processor, store, parse_workers=1)
+
+        progress = pipeline.run([path])
+
+        texts = store.embed_documents.call_args.args[0]
+        assert texts == ["Course_A", chunks[0].content]
+        store.delete_chunks.assert_called_once_with(["Course_A_999"])
+        written, _ = store.add_course_content.call_args.args
+        assert written == [chunks[0]]
+        assert progress.chunks_written == 1
+
+    def test_on_indexed_reports_all_chunk_ids(self, temp_docs_folder, store):
+        """Test the callback receives every chunk ID of each written course"""
+        indexed = []
+        pipeline = IngestPipeline(DocumentProcessor(200, 50), store, parse_workers=1)
+
+        pipeline.run(
+            doc_paths(temp_docs_folder),
+            on_indexed=lambda path, course, ids: indexed.append((course.title, ids)),
+        )
+
+        chunks, _ = store.add_course_content.call_args.args
+        assert [title for title, _ in indexed] == ["Course_A", "Course_B"]
+        assert sum(len(ids) for _, ids in indexed) == len(chunks)
+
+    def test_parse_errors_are_counted(self, temp_data_dir, store):
+        """Test unreadable files are reported without stopping the run"""
+        pipeline = IngestPipeline(DocumentProcessor(200, 50), store, parse_workers=1)
+
+        progress = pipeline.run([os.path.join(temp_data_dir, "missing.txt")])
+
+        assert progress.errors == 1
+        assert progress.courses_added == 0
+        store.embed_documents.assert_not_called()
+
+    def test_failing_callback_does_not_stop_the_writer(self, temp_docs_folder, store):
+        """Test an on_indexed error is counted and later courses are still reported"""
+        indexed = []
+
+        def on_indexed(path, course, ids):
+            indexed.append(course.title)
+            if course.title == "Course_A":
+                raise FileNotFoundError(path)
+
+        pipeline = IngestPipeline(DocumentProcessor(200, 50), store, parse_workers=1)
+        progress = pipeline.run(doc_paths(temp_docs_folder), on_indexed=on_indexed)
+
+        assert indexed == ["Course_A", "Course_B"]
+        assert progress.errors == 1
+
+    def test_failing_stage_does_not_block_the_others(
+        self, temp_data_dir, store, monkeypatch
+    ):
+        """Test the embed stage drains its queue after an unexpected error"""
+        paths = []
+        for number in range(12):
+            path = os.path.join(temp_data_dir, f"course_{number}.txt")
+            with open(path, "w") as file:
+                file.write(
+                    f"Course Title: Course {number}\n\nLesson 0: Intro\nSome text.\n"
+                )
+            paths.append(path)
+        pipeline = IngestPipeline(
+            DocumentProcessor(200, 50), store, parse_workers=1, embed_batch_size=1
+        )
+        monkeypatch.setattr(
+            pipeline, "_embed_batch", Mock(side_effect=RuntimeError("boom"))
+        )
+
+        runner = threading.Thread(target=pipeline.run, args=(paths,), daemon=True)
+        runner.start()
+        runner.join(timeout=10)
+
+        assert not runner.is_alive()
+        assert pipeline.progress.errors == 1
+        assert pipeline.progress.files_done == 12
+
+    def test_parallel_parsing_keeps_the_first_duplicate(
+        self, temp_data_dir, store, monkeypatch
+    ):
+        """Test the first of two files with one title wins even if it parses last"""
+        paths = []
+        for name in ("a_slow.txt", "b_fast.txt"):
+            path = os.path.join(temp_data_dir, name)
+            with open(path, "w") as file:
+                file.write("Course Title: Same Course\n\nLesson 0: Intro\nText.\n")
+            paths.append(path)
+        parse = ingest_pipeline._parse_document
+
+        def slow_first(chunk_size, chunk_overlap, file_path):
+            if file_path == paths[0]:
+                time.sleep(0.2)
+            return parse(chunk_size, chunk_overlap, file_path)
+
+        monkeypatch.setattr(ingest_pipeline, "_parse_document", slow_first)
+        monkeypatch.setattr(
+            ingest_pipeline,
+            "ProcessPoolExecutor",
+            lambda max_workers, mp_context: ThreadPoolExecutor(max_workers),
+        )
+        monkeypatch.setattr(ingest_pipeline.os, "cpu_count", lambda: 2)
+        indexed = []
+        pipeline = IngestPipeline(DocumentProcessor(200, 50), store, parse_workers=2)
+
+        pipeline.run(paths, on_indexed=lambda path, course, ids: indexed.append(path))
+
+        assert indexed == [paths[0]]
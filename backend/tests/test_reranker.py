@@ -0,0 +1,129 @@
+import sys
+import types
+
+import pytest
+from embedding_service import LazySentenceTransformerEmbeddingFunction
+from models import CourseChunk
+from reranker import CrossEncoderReranker
+from vector_store import VectorStore
+
+from .test_search_tools import CountingModel
+
+
+class FakeCrossEncoder:
+    """Scores pairs by the share of query words in the document"""
+
+    def __init__(self):
+        self.calls = []
+
+    def predict(self, pairs, batch_size=32, show_progress_bar=True):
+        self.calls.append(list(pairs))
+        return [len(set(q.split()) & set(d.split())) / len(q.split()) for q, d in pairs]
+
+
+@pytest.fixture
+def cross_encoder(monkeypatch):
+    encoder = FakeCrossEncoder()
+    module = types.ModuleType("sentence_transformers")
+    module.CrossEncoder = lambda name, device="cpu": encoder
+    module.SentenceTransformer = lambda **kwargs: CountingModel()
+    monkeypatch.setitem(sys.modules, "sentence_transformers", module)
+    monkeypatch.setattr(CrossEncoderReranker, "models", {})
+    monkeypatch.setattr(LazySentenceTransformerEmbeddingFunction, "models", {})
+    return encoder
+
+
+@pytest.mark.unit
+class TestCrossEncoderReranker:
+    """Test batched cross-encoder scoring, its cache and latency budget"""
+
+    def test_searches_scored_in_one_pass_and_cached(self, cross_encoder):
+        """Test all pairs go through one predict call and repeats hit the cache"""
+        reranker = CrossEncoderReranker("fake")
+        searches = [
+            ("mcp tools", ["a", "b"], ["mcp", "mcp tools"]),
+            ("evals", ["a"], ["mcp"]),
+        ]
+
+        assert reranker.score(searches, version=1) == [[0.5, 1.0], [0.0]]
+        assert reranker.score([("mcp  tools", ["b"], ["mcp tools"])], version=1) == [
+            [1.0]
+        ]
+
+        assert len(cross_encoder.calls) == 1
+        assert reranker.stats()["hits"] == 1
+        assert reranker.stats()["entries"] == 3
+
+    def test_corpus_change_drops_cached_scores(self, cross_encoder):
+        """Test scores are recomputed once the corpus version changes"""
+        reranker = CrossEncoderReranker("fake")
+        reranker.score([("mcp", ["a"], ["mcp"])], version=1)
+        reranker.score([("mcp", ["a"], ["other"])], version=2)
+
+        assert len(cross_encoder.calls) == 2
+        assert cross_encoder.calls[1] == [("mcp", "other")]
+
+    def test_over_budget_batches_are_skipped(self, cross_encoder):
+        """Test scoring is skipped when the estimate exceeds the budget"""
+        reranker = CrossEncoderReranker("fake", budget=0.5)
+        reranker.score([("mcp", ["a"], ["mcp"])])
+        reranker._seconds_per_pair = 0.2
+
+        assert reranker.score([("evals", ["a", "b", "c"], ["x", "y", "z"])]) is None
+        assert reranker.score([("mcp", ["a"], ["mcp"])]) == [[1.0]]
+        assert reranker.stats()["skipped"] == 1
+        assert reranker.stats()["seconds_per_pair"] == pytest.approx(
+            0.2 * reranker.SKIP_RELAXATION
+        )
+        assert len(cross_encoder.calls) == 1
+
+
+@pytest.mark.unit
+class TestVectorStoreReranking:
+    """Test VectorStore re-ranking an over-fetched candidate pool"""
+
+    @pytest.fixture
+    def store(self, temp_data_dir, cross_encoder):
+        store = VectorStore(
+            temp_data_dir,
+            "fake-model",
+            max_results=1,
+            rerank_model="fake",
+            rerank_candidates=4,
+        )
+        store.add_course_content(
+            [
+                CourseChunk(
+                    content=text, course_title="A", lesson_number=1, chunk_index=i
+                )
+                for i, text in enumerate(
+                    ["tools", "tools and evals", "vision inputs", "toast"]
+                )
+            ]
+        )
+        return store
+
+    def test_top_results_by_cross_encoder_score(self, store, cross_encoder):
+        """Test the pool is scored once and the best scoring chunk is returned"""
+        results = store.search_many(
+            [{"query": "evals and tools"}, {"query": "vision", "limit": 2}]
+        )
+
+        assert len(cross_encoder.calls) == 1
+        assert len(cross_encoder.calls[0]) == 8
+        assert results[0].documents == ["tools and evals"]
+        assert results[0].distances == [0.0]
+        assert results[1].documents[0] == "vision inputs"
+        assert len(results[1].documents) == 2
+
+    def test_skipped_reranking_keeps_retrieval_order(self, store):
+        """Test an over-budget batch returns the first results of the pool"""
+        store.reranker._seconds_per_pair = 10.0
+        expected = store.course_content.query(
+            query_embeddings=[store.embed_query("toast")], n_results=1
+        )
+
+        results = store.search("toast")
+
+        assert results.ids == expected["ids"][0]
+        assert store.reranker.stats()["skipped"] == 1
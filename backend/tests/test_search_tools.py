@@ -0,0 +1,256 @@
+import sys
+import threading
+import time
+import types
+from unittest.mock import Mock
+
+import numpy as np
+import pytest
+from embedding_service import LazySentenceTransformerEmbeddingFunction
+from models import CourseChunk
+from search_tools import CourseSearchTool, Tool, ToolManager
+from vector_store import SearchResults, VectorStore
+
+
+class EchoTool(Tool):
+    """Tool that records how it was called"""
+
+    def __init__(self, name):
+        self.name = name
+        self.batches = []
+
+    def get_tool_definition(self):
+        return {"name": self.name}
+
+    def execute(self, **kwargs):
+        return f"{self.name}:{kwargs['value']}"
+
+    def execute_many(self, calls):
+        self.batches.append(calls)
+        return super().execute_many(calls)
+
+
+class SlowTool(EchoTool):
+    """Tool that blocks until released or its delay passes"""
+
+    def __init__(self, name, delay, timeout=None):
+        super().__init__(name)
+        self.delay = delay
+        self.timeout = timeout
+        self.threads = []
+
+    def execute(self, **kwargs):
+        self.threads.append(threading.current_thread().name)
+        time.sleep(self.delay)
+        return super().execute(**kwargs)
+
+
+class CountingModel:
+    """Letter-count embeddings that record each encode call"""
+
+    def __init__(self):
+        self.calls = []
+
+    def encode(self, texts, convert_to_numpy=True, normalize_embeddings=False):
+        self.calls.append(list(texts))
+        return np.array(
+            [[text.count(c) + 1 for c in "aeiost"] for text in texts], dtype=np.float32
+        )
+
+
+def results(*documents):
+    return SearchResults(
+        documents=list(documents),
+        metadata=[{"course_title": "MCP", "lesson_number": 1} for _ in documents],
+        distances=[0.1 for _ in documents],
+    )
+
+
+@pytest.mark.unit
+class TestToolManager:
+    """Test dispatching parallel tool calls"""
+
+    def test_execute_tools_batches_per_tool_in_order(self):
+        """Test calls are grouped per tool and outputs keep call order"""
+        manager = ToolManager()
+        first, second = EchoTool("first"), EchoTool("second")
+        manager.register_tool(first)
+        manager.register_tool(second)
+
+        results = manager.execute_tools(
+            [
+                ("first", {"value": 1}),
+                ("second", {"value": 2}),
+                ("missing", {}),
+                ("first", {"value": 3}),
+            ]
+        )
+
+        assert [r.content for r in results] == [
+            "first:1",
+            "second:2",
+            "Tool 'missing' not found",
+            "first:3",
+        ]
+        assert first.batches == [[{"value": 1}, {"value": 3}]]
+        assert second.batches == [[{"value": 2}]]
+
+    def test_tools_run_concurrently(self):
+        """Test different tools overlap instead of adding their latencies"""
+        manager = ToolManager(max_workers=2)
+        slow, slower = SlowTool("slow", 0.2), SlowTool("slower", 0.3)
+        manager.register_tool(slow)
+        manager.register_tool(slower)
+
+        started = time.perf_counter()
+        results = manager.execute_tools(
+            [("slower", {"value": 1}), ("slow", {"value": 2})]
+        )
+        elapsed = time.perf_counter() - started
+
+        assert [r.content for r in results] == ["slower:1", "slow:2"]
+        assert elapsed < 0.45
+        assert slow.threads[0].startswith("rag-tool") and slow.threads != slower.threads
+        assert [r.timing.tool_name for r in results] == ["slower", "slow"]
+        assert results[0].timing.seconds >= 0.3 > results[1].timing.seconds >= 0.2
+
+    def test_timed_out_tool_returns_error(self):
+        """Test a tool past its timeout is abandoned without failing the others"""
+        manager = ToolManager(timeout=5)
+        manager.register_tool(SlowTool("stuck", 0.5, timeout=0.05))
+        manager.register_tool(EchoTool("fast"))
+
+        results = manager.execute_tools(
+            [("stuck", {"value": 1}), ("fast", {"value": 2})]
+        )
+
+        assert [r.content for r in results] == [
+            "Tool 'stuck' timed out after 0.05s",
+            "fast:2",
+        ]
+        assert [r.timing.timed_out for r in results] == [True, False]
+
+    def test_failing_tool_does_not_fail_the_others(self):
+        """Test an exception in one tool's group becomes that group's output only"""
+        manager = ToolManager()
+        manager.register_tool(EchoTool("broken"))
+        manager.register_tool(EchoTool("fast"))
+
+        results = manager.execute_tools(
+            [("broken", {"unexpected": 1}), ("fast", {"value": 2})]
+        )
+
+        assert [r.content for r in results] == [
+            "Tool 'broken' failed: 'value'",
+            "fast:2",
+        ]
+        assert [r.timing.timed_out for r in results] == [False, False]
+
+
+@pytest.mark.unit
+class TestCourseSearchTool:
+    """Test CourseSearchTool batching"""
+
+    def test_execute_many_uses_one_store_call(self):
+        """Test all searches go through search_many and keep their own sources"""
+        store = Mock()
+        store.search_many.return_value = [
+            results("chunk a"),
+            results(),
+            SearchResults.empty("boom"),
+        ]
+        tool = CourseSearchTool(store)
+
+        outputs = tool.execute_many(
+            [
+                {"query": "a"},
+                {"query": "b", "course_name": "MCP"},
+                {"query": "c", "lesson_number": 2},
+            ]
+        )
+
+        store.search_many.assert_called_once_with(
+            [
+                {"query": "a", "course_name": None, "lesson_number": None},
+                {"query": "b", "course_name": "MCP", "lesson_number": None},
+                {"query": "c", "course_name": None, "lesson_number": 2},
+            ]
+        )
+        assert [r.content for r in outputs] == [
+            "[MCP - Lesson 1]\nchunk a",
+            "No relevant content found in course 'MCP'.",
+            "boom",
+        ]
+        assert [r.sources for r in outputs] == [["MCP - Lesson 1"], [], []]
+
+
+@pytest.mark.unit
+class TestSearchMany:
+    """Test VectorStore.search_many"""
+
+    @pytest.fixture
+    def model(self):
+        return CountingModel()
+
+    @pytest.fixture
+    def store(self, temp_data_dir, monkeypatch, model):
+        module = types.ModuleType("sentence_transformers")
+        module.SentenceTransformer = lambda **kwargs: model
+        monkeypatch.setitem(sys.modules, "sentence_transformers", module)
+        monkeypatch.setattr(LazySentenceTransformerEmbeddingFunction, "models", {})
+        store = VectorStore(temp_data_dir, "fake-model", max_results=2)
+        store.add_course_content(
+            [
+                CourseChunk(
+                    content=text, course_title="A", lesson_number=lesson, chunk_index=i
+                )
+                for i, (text, lesson) in enumerate(
+                    [
+                        ("tools and settings", 1),
+                        ("vision inputs", 1),
+                        ("eval sets", 2),
+                        ("toast", 2),
+                    ]
+                )
+            ]
+        )
+        model.calls.clear()
+        return store
+
+    def test_matches_single_searches(self, store):
+        """Test batched results equal one search() per query"""
+        searches = [
+            {"query": "tools"},
+            {"query": "eval", "lesson_number": 2},
+            {"query": "vision", "lesson_number": 1, "limit": 1},
+            {"query": "toast", "lesson_number": 2},
+        ]
+
+        batched = store.search_many(searches)
+
+        assert batched == [store.search(**search) for search in searches]
+
+    def test_one_embedding_pass_and_one_query_per_filter(self, store, model):
+        """Test queries are embedded together and grouped by filter"""
+        store.course_content = Mock(wraps=store.course_content)
+
+        batched = store.search_many(
+            [
+                {"query": "tools"},
+                {"query": "eval", "lesson_number": 2},
+                {"query": "toast", "lesson_number": 2},
+            ]
+        )
+
+        assert model.calls == [["tools", "eval", "toast"]]
+        assert store.course_content.query.call_count == 2
+        assert batched[2].documents[0] == "toast"
+
+    def test_unknown_course_only_fails_its_search(self, store):
+        """Test a failed course resolution leaves the other searches intact"""
+        batched = store.search_many(
+            [{"query": "tools", "course_name": "Nope"}, {"query": "tools"}]
+        )
+
+        assert batched[0].error == "No course found matching 'Nope'"
+        assert batched[1].error is None and len(batched[1].documents) == 2
@@ -0,0 +1,270 @@
+import os
+import threading
+
+import pytest
+from session_manager import (
+    MemorySessionStore,
+    Message,
+    SessionManager,
+    SQLiteSessionStore,
+)
+
+
+class FakeClock:
+    """Stand-in for time.monotonic / time.time"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr("session_manager.time.monotonic", clock)
+    monkeypatch.setattr("session_manager.time.time", clock)
+    return clock
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def make_store(request, temp_data_dir):
+    def make(**kwargs):
+        kwargs.setdefault("max_messages", 4)
+        if request.param == "memory":
+            return MemorySessionStore(**kwargs)
+        kwargs.pop("max_bytes", None)
+        return SQLiteSessionStore(
+            os.path.join(temp_data_dir, "sessions.sqlite3"), **kwargs
+        )
+
+    return make
+
+
+@pytest.mark.unit
+class TestSessionStores:
+    """Test behaviour shared by the session backends"""
+
+    def test_history_keeps_last_messages(self, make_store):
+        """Test only the newest max_history exchanges are kept"""
+        manager = SessionManager(max_history=2, store=make_store())
+        session_id = manager.create_session()
+
+        for i in range(3):
+            manager.add_exchange(session_id, f"question {i}", f"answer {i}")
+
+        assert manager.get_conversation_history(session_id) == (
+            "User: question 1\nAssistant: answer 1\n"
+            "User: question 2\nAssistant: answer 2"
+        )
+
+    def test_unknown_and_cleared_sessions_have_no_history(self, make_store):
+        """Test missing or cleared sessions return None"""
+        manager = SessionManager(max_history=2, store=make_store())
+        manager.add_message("client-id", "user", "hello")
+        assert manager.get_conversation_history("client-id") == "User: hello"
+
+        manager.clear_session("client-id")
+
+        assert manager.get_conversation_history("client-id") is None
+        assert manager.get_conversation_history("never-seen") is None
+        assert manager.get_conversation_history(None) is None
+
+    def test_idle_sessions_expire(self, make_store, clock):
+        """Test sessions idle past the TTL are dropped and counted"""
+        store = make_store(ttl_seconds=60)
+        old = store.create()
+        store.append(old, [])
+        clock.now += 30
+        active = store.create()
+        clock.now += 40
+
+        assert store.get(old) == []
+        store.append(active, [])
+        assert store.stats()["expirations"] == 1
+
+    def test_least_recently_used_sessions_are_evicted(self, make_store, clock):
+        """Test the session bound evicts the least recently used session"""
+        store = make_store(max_sessions=2)
+        manager = SessionManager(max_history=2, store=store)
+        first = manager.create_session()
+        manager.add_message(first, "user", "first")
+        clock.now += 1
+        second = manager.create_session()
+        clock.now += 1
+        manager.get_conversation_history(first)
+        clock.now += 1
+        manager.create_session()
+
+        assert manager.get_conversation_history(first) == "User: first"
+        assert manager.get_conversation_history(second) is None
+        assert store.stats()["evictions"] == 1
+
+
+class FakeSummarizer:
+    """Records summarize calls and returns numbered summaries"""
+
+    def __init__(self, fail=False):
+        self.calls = []
+        self.fail = fail
+
+    def __call__(self, conversation, previous_summary):
+        self.calls.append((conversation, previous_summary))
+        if self.fail:
+            raise RuntimeError("API unavailable")
+        return f"summary {len(self.calls)}"
+
+
+@pytest.mark.unit
+class TestHistorySummary:
+    """Test rolling summaries and the history token cap"""
+
+    def test_older_exchanges_are_summarized(self, make_store):
+        """Test exchanges beyond twice keep_turns fold into the summary"""
+        summarizer = FakeSummarizer()
+        manager = SessionManager(
+            2, make_store(max_messages=8), summarizer=summarizer, keep_turns=1
+        )
+        session_id = manager.create_session()
+
+        for i in range(3):
+            manager.add_exchange(session_id, f"question {i}", f"answer {i}")
+        manager.flush()
+
+        assert summarizer.calls == [
+            (
+                "User: question 0\nAssistant: answer 0\n"
+                "User: question 1\nAssistant: answer 1",
+                None,
+            )
+        ]
+        assert manager.get_conversation_history(session_id) == (
+            "Summary of earlier conversation: summary 1\n"
+            "User: question 2\nAssistant: answer 2"
+        )
+
+        for i in range(3, 5):
+            manager.add_exchange(session_id, f"question {i}", f"answer {i}")
+        manager.flush()
+
+        assert summarizer.calls[-1] == (
+            "User: question 2\nAssistant: answer 2\n"
+            "User: question 3\nAssistant: answer 3",
+            "summary 1",
+        )
+        assert manager.get_conversation_history(session_id) == (
+            "Summary of earlier conversation: summary 2\n"
+            "User: question 4\nAssistant: answer 4"
+        )
+        assert manager.stats()["summaries"] == 2
+
+    def test_compact_only_removes_summarized_messages(self, make_store):
+        """Test messages trimmed or added during summarization are kept"""
+        store = make_store(max_messages=3)
+        session_id = store.create()
+        messages = [Message(role="user", content=f"m{i}") for i in range(4)]
+        store.append(session_id, messages[:3])
+        store.append(session_id, messages[3:])  # Trims m0
+
+        assert store.compact(session_id, messages[:2], "m0 and m1") == 1
+        assert store.get(session_id) == messages[2:]
+        assert store.get_summary(session_id) == "m0 and m1"
+
+        store.clear(session_id)
+        assert store.get_summary(session_id) is None
+        assert store.compact(session_id, messages, "gone") == 0
+
+    def test_failed_summary_keeps_history(self, make_store):
+        """Test a summarizer error is counted and leaves messages in place"""
+        manager = SessionManager(
+            2,
+            make_store(max_messages=8),
+            summarizer=FakeSummarizer(fail=True),
+            keep_turns=1,
+        )
+        session_id = manager.create_session()
+
+        for i in range(3):
+            manager.add_exchange(session_id, f"q{i}", f"a{i}")
+        manager.flush()
+
+        assert manager.get_conversation_history(session_id).startswith("User: q0\n")
+        assert manager.stats()["summary_failures"] >= 1
+
+    def test_history_is_capped_at_max_tokens(self):
+        """Test the oldest messages are dropped to fit the token cap"""
+        manager = SessionManager(max_history=3, max_tokens=15)
+        session_id = manager.create_session()
+        manager.add_exchange(session_id, "a" * 20, "b" * 20)
+        manager.add_message(session_id, "user", "c" * 20)
+
+        assert (
+            manager.get_conversation_history(session_id)
+            == "Assistant: " + "b" * 20 + "\nUser: " + "c" * 20
+        )
+        assert manager.token_estimate(session_id) == 15
+
+        manager.add_message(session_id, "assistant", "d" * 100)
+        assert manager.get_conversation_history(session_id) == "Assistant: " + "d" * 100
+        assert manager.token_estimate("never-seen") == 0
+
+
+@pytest.mark.unit
+class TestMemorySessionStore:
+    """Test the in-memory backend's memory cap"""
+
+    def test_memory_cap_evicts_oldest_sessions(self):
+        """Test sessions are evicted once their messages exceed max_bytes"""
+        store = MemorySessionStore(max_messages=4, max_bytes=3000)
+        manager = SessionManager(max_history=2, store=store)
+        sessions = [manager.create_session() for _ in range(3)]
+
+        for session_id in sessions:
+            manager.add_message(session_id, "user", "x" * 1000)
+
+        assert manager.get_conversation_history(sessions[0]) is None
+        assert store.stats()["sessions"] == 2
+        assert store.stats()["bytes"] <= 3000
+        assert store.stats()["evictions"] == 1
+
+
+@pytest.mark.unit
+class TestSQLiteSessionStore:
+    """Test sharing sessions through SQLite"""
+
+    def test_sessions_are_shared_between_stores(self, temp_data_dir):
+        """Test a second store on the same file (another worker) sees sessions"""
+        path = os.path.join(temp_data_dir, "sessions.sqlite3")
+        worker_a = SessionManager(2, SQLiteSessionStore(path, max_messages=4))
+        worker_b = SessionManager(2, SQLiteSessionStore(path, max_messages=4))
+
+        first = worker_a.create_session()
+        second = worker_b.create_session()
+        worker_a.add_exchange(first, "hi", "hello")
+
+        assert first != second
+        assert worker_b.get_conversation_history(first) == "User: hi\nAssistant: hello"
+
+    def test_concurrent_appends(self, temp_data_dir):
+        """Test threads appending to one session leave a consistent window"""
+        store = SQLiteSessionStore(
+            os.path.join(temp_data_dir, "sessions.sqlite3"), max_messages=4
+        )
+        session_id = store.create()
+        manager = SessionManager(2, store)
+
+        threads = [
+            threading.Thread(
+                target=lambda i=i: [
+                    manager.add_message(session_id, "user", f"{i}") for _ in range(20)
+                ]
+            )
+            for i in range(4)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(store.get(session_id)) == 4
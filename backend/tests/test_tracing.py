@@ -0,0 +1,193 @@
+import asyncio
+import json
+import sys
+import types
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+from config import Config
+from embedding_service import LazySentenceTransformerEmbeddingFunction
+from models import Course, CourseChunk
+from rag_system import RAGSystem
+from search_tools import ToolManager
+from tracing import Tracer, tracer
+from vector_store import VectorStore
+
+from .test_concurrency import AsyncFakeMessages, FakeMessages, search_many
+from .test_search_tools import CountingModel, EchoTool
+
+
+@pytest.fixture
+def export_path(tmp_path):
+    """Enable the shared tracer with OTLP/JSON export for one test"""
+    path = str(tmp_path / "traces.jsonl")
+    tracer.configure(True, path)
+    tracer.reset()
+    yield path
+    tracer.configure(False)
+    tracer.reset()
+
+
+def read_traces(path):
+    """Spans of each exported trace, keyed by span name"""
+    traces = []
+    with open(path) as f:
+        for line in f:
+            spans = json.loads(line)["resourceSpans"][0]["scopeSpans"][0]["spans"]
+            traces.append({span["name"]: span for span in spans})
+    return traces
+
+
+def stages(metrics):
+    """Stage label to observation count from the Prometheus text"""
+    counts = {}
+    for line in metrics.splitlines():
+        if line.startswith("rag_stage_duration_seconds_count"):
+            label, value = line.split(" ")
+            counts[label.split('"')[1]] = int(value)
+    return counts
+
+
+@pytest.mark.unit
+class TestTracer:
+    """Test spans, histograms and export"""
+
+    def test_disabled_tracer_records_nothing(self):
+        """Test a disabled tracer hands out one shared no-op span"""
+        disabled = Tracer()
+
+        with disabled.span("a", x=1) as span:
+            span.set("y", 2)
+
+        assert disabled.span("b") is span
+        assert stages(disabled.metrics()) == {}
+
+    def test_spans_nest_and_export_as_otlp(self, export_path):
+        """Test child spans point at their parent and errors set the status"""
+        with tracer.span("request", mode="sync"):
+            with tracer.span("inner", count=3, ratio=0.5, hit=True):
+                pass
+            with pytest.raises(RuntimeError):
+                with tracer.span("failing"):
+                    raise RuntimeError("boom")
+
+        (trace,) = read_traces(export_path)
+        root = trace["request"]
+        assert "parentSpanId" not in root
+        assert trace["inner"]["parentSpanId"] == root["spanId"]
+        assert {span["traceId"] for span in trace.values()} == {root["traceId"]}
+        assert trace["inner"]["attributes"] == [
+            {"key": "count", "value": {"intValue": "3"}},
+            {"key": "ratio", "value": {"doubleValue": 0.5}},
+            {"key": "hit", "value": {"boolValue": True}},
+        ]
+        assert trace["failing"]["status"] == {"code": 2, "message": "RuntimeError"}
+        assert int(root["endTimeUnixNano"]) >= int(trace["inner"]["endTimeUnixNano"])
+
+    def test_metrics_are_cumulative_histograms(self):
+        """Test the Prometheus rendering of a stage histogram"""
+        histograms = Tracer(enabled=True, buckets=(0.1, 1.0))
+        for seconds in (0.05, 0.5, 5.0):
+            with patch("tracing.time.perf_counter", side_effect=[0.0, seconds]):
+                with histograms.span("stage"):
+                    pass
+
+        lines = histograms.metrics().splitlines()
+
+        assert lines[1] == "# TYPE rag_stage_duration_seconds histogram"
+        assert lines[2:] == [
+            'rag_stage_duration_seconds_bucket{stage="stage",le="0.1"} 1',
+            'rag_stage_duration_seconds_bucket{stage="stage",le="1"} 2',
+            'rag_stage_duration_seconds_bucket{stage="stage",le="+Inf"} 3',
+            'rag_stage_duration_seconds_sum{stage="stage"} 5.550000',
+            'rag_stage_duration_seconds_count{stage="stage"} 3',
+        ]
+
+    def test_tool_spans_nest_across_threads(self, export_path):
+        """Test tool calls on the pool threads stay in the request's trace"""
+        manager = ToolManager()
+        manager.register_tool(EchoTool("echo"))
+
+        with tracer.span("request"):
+            manager.execute_tools([("echo", {"value": 1}), ("echo", {"value": 2})])
+        manager.shutdown()
+
+        (trace,) = read_traces(export_path)
+        assert trace["tool.echo"]["parentSpanId"] == trace["request"]["spanId"]
+
+    async def test_concurrent_tasks_get_separate_traces(self, export_path):
+        """Test each asyncio task nests its spans under its own root"""
+
+        async def request(name):
+            with tracer.span(name):
+                await asyncio.sleep(0.01)
+                with tracer.span(f"{name}.child"):
+                    await asyncio.sleep(0.01)
+
+        await asyncio.gather(request("a"), request("b"))
+
+        traces = read_traces(export_path)
+        assert len(traces) == 2
+        for trace in traces:
+            (name,) = [name for name in trace if "." not in name]
+            assert trace[f"{name}.child"]["parentSpanId"] == trace[name]["spanId"]
+
+
+@pytest.mark.unit
+class TestInstrumentation:
+    """Test the stages recorded for a request"""
+
+    def test_vector_store_search_stages(self, temp_data_dir, monkeypatch, export_path):
+        """Test course resolution, embedding and Chroma query are timed"""
+        module = types.ModuleType("sentence_transformers")
+        module.SentenceTransformer = lambda **kwargs: CountingModel()
+        monkeypatch.setitem(sys.modules, "sentence_transformers", module)
+        monkeypatch.setattr(LazySentenceTransformerEmbeddingFunction, "models", {})
+        store = VectorStore(
+            temp_data_dir, "fake-model", max_results=2, search_mode="hybrid"
+        )
+        store.add_course_metadata(Course(title="Tracing"))
+        store.add_course_content(
+            [CourseChunk(content="spans", course_title="Tracing", chunk_index=0)]
+        )
+
+        store.search("spans", course_name="Tracing")
+
+        (trace,) = read_traces(export_path)
+        root = trace["vector_store.search"]["spanId"]
+        for stage in ["resolve_course", "embed", "chroma_query", "hybrid_fusion"]:
+            assert trace[f"vector_store.{stage}"]["parentSpanId"] == root
+
+    async def test_query_stages(self, export_path):
+        """Test sync and async queries time both Claude calls and the tool"""
+        config = Config(
+            ANTHROPIC_API_KEY="test-key",
+            INGEST_MANIFEST_PATH="",
+            ANSWER_CACHE_ENABLED=False,
+        )
+        config.TRACING_ENABLED = True
+        config.TRACE_EXPORT_PATH = export_path
+        with patch("rag_system.VectorStore"):
+            system = RAGSystem(config)
+        system.vector_store.search_many.side_effect = search_many
+        system.ai_generator.client = SimpleNamespace(messages=FakeMessages())
+        system.ai_generator.async_client = SimpleNamespace(messages=AsyncFakeMessages())
+
+        system.query("tracing")
+        await system.aquery("tracing")
+        system.shutdown()
+
+        assert stages(tracer.metrics()) == {
+            "anthropic.first_call": 2,
+            "anthropic.followup_call": 2,
+            "rag.query": 2,
+            "tool.search_course_content": 2,
+        }
+        for trace in read_traces(export_path):
+            root = trace["rag.query"]["spanId"]
+            assert trace["tool.search_course_content"]["parentSpanId"] == root
+            assert trace["anthropic.followup_call"]["attributes"][0] == {
+                "key": "round",
+                "value": {"intValue": "2"},
+            }
@@ -0,0 +1,457 @@
+import os
+import subprocess
+import sys
+import types
+from unittest.mock import Mock
+
+import numpy as np
+import pytest
+from embedding_service import LazySentenceTransformerEmbeddingFunction
+from models import Course, CourseChunk
+from vector_backends import (
+    MemmapCollection,
+    MemmapVectorClient,
+    PartitionedCollection,
+    open_vector_backend,
+)
+from vector_store import VectorStore
+
+from .test_search_tools import CountingModel
+
+
+def rows(count, dim=8, seed=0):
+    """Random vectors with course/lesson metadata spread over the rows"""
+    rng = np.random.default_rng(seed)
+    vectors = rng.normal(size=(count, dim)).astype(np.float32)
+    ids = [f"chunk_{i}" for i in range(count)]
+    metadatas = [
+        {"course_title": f"Course {i % 3}", "lesson_number": i % 4}
+        for i in range(count)
+    ]
+    documents = [f"text {i}" for i in range(count)]
+    return ids, vectors, metadatas, documents
+
+
+def brute_force(vectors, query, mask, k):
+    """Row indexes and squared L2 distances of the k nearest masked rows"""
+    distances = ((vectors - query) ** 2).sum(axis=1)
+    distances[~mask] = np.inf
+    top = np.argsort(distances, kind="stable")[:k]
+    return top[np.isfinite(distances[top])], distances
+
+
+@pytest.fixture
+def collection(tmp_path):
+    ids, vectors, metadatas, documents = rows(200)
+    collection = MemmapCollection(str(tmp_path / "content"))
+    collection.upsert(
+        ids=ids, embeddings=vectors, metadatas=metadatas, documents=documents
+    )
+    return collection
+
+
+@pytest.mark.unit
+class TestMemmapCollection:
+    """Test the memory-mapped vector index"""
+
+    @pytest.mark.parametrize(
+        "where",
+        [
+            None,
+            {"course_title": "Course 1"},
+            {"lesson_number": 2},
+            {"$and": [{"course_title": "Course 2"}, {"lesson_number": 1}]},
+        ],
+    )
+    def test_query_matches_brute_force(self, collection, where):
+        """Test filtered exact search returns the nearest rows and L2 distances"""
+        ids, vectors, metadatas, _ = rows(200)
+        queries = np.random.default_rng(1).normal(size=(3, 8)).astype(np.float32)
+        clauses = where.get("$and", [where]) if where else []
+        mask = np.array(
+            [all(m[k] == v for c in clauses for k, v in c.items()) for m in metadatas]
+        )
+
+        results = collection.query(query_embeddings=queries, n_results=5, where=where)
+
+        for row, query in enumerate(queries):
+            top, distances = brute_force(vectors, query, mask, 5)
+            assert results["ids"][row] == [ids[i] for i in top]
+            assert results["metadatas"][row] == [metadatas[i] for i in top]
+            assert np.allclose(results["distances"][row], distances[top], atol=1e-4)
+
+    def test_upsert_replaces_and_delete_filters(self, collection):
+        """Test upserts replace rows by ID and deletes honour filters"""
+        collection.upsert(
+            ids=["chunk_0"],
+            embeddings=[[0.0] * 8],
+            metadatas=[{"course_title": "New"}],
+            documents=["new"],
+        )
+        collection.delete(where={"course_title": "Course 1"})
+
+        assert collection.get(ids=["chunk_0", "chunk_1"])["documents"] == ["new"]
+        assert collection.get(where={"course_title": "New"})["ids"] == ["chunk_0"]
+        assert collection.count() == 200 - 67
+        nearest = collection.query(query_embeddings=[[0.0] * 8], n_results=1)
+        assert nearest["ids"] == [["chunk_0"]]
+
+    def test_other_instances_see_commits_through_shared_mappings(
+        self, collection, tmp_path
+    ):
+        """Test a second reader maps the same files and picks up later writes"""
+        reader = MemmapCollection(str(tmp_path / "content"))
+        assert reader.count() == 200
+        assert isinstance(reader._current().vectors, np.memmap)
+
+        collection.upsert(
+            ids=["late"], embeddings=[[9.0] * 8], metadatas=[{}], documents=["late"]
+        )
+        collection.delete(ids=["chunk_5"])
+
+        assert reader.query(query_embeddings=[[9.0] * 8], n_results=1)["ids"] == [
+            ["late"]
+        ]
+        assert reader.get(ids=["chunk_5"])["ids"] == []
+
+    def test_writes_from_another_process(self, collection, tmp_path):
+        """Test rows written by a separate process are visible after its commit"""
+        script = (
+            "import sys; sys.path.insert(0, sys.argv[1]);"
+            "from vector_backends import MemmapCollection;"
+            "MemmapCollection(sys.argv[2]).upsert("
+            "ids=['remote'], embeddings=[[5.0] * 8],"
+            "metadatas=[{'lesson_number': 7}], documents=['r'])"
+        )
+        backend = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        subprocess.run(
+            [sys.executable, "-c", script, backend, str(tmp_path / "content")],
+            check=True,
+        )
+
+        assert collection.get(where={"lesson_number": 7})["ids"] == ["remote"]
+        assert collection.count() == 201
+
+    def test_rewrite_drops_dead_rows(self, collection, tmp_path, monkeypatch):
+        """Test deleted rows are compacted into a new generation of files"""
+        monkeypatch.setattr(MemmapCollection, "MIN_DEAD_ROWS", 10)
+        collection.delete(where={"lesson_number": 0})
+        collection.delete(where={"lesson_number": 1})
+        collection.delete(where={"lesson_number": 2})
+
+        assert collection._header["generation"] == 1
+        assert collection._header["count"] == 50
+        assert not (tmp_path / "content" / "vectors-0").exists()
+        assert collection.get(where={"course_title": "Course 2"})["ids"][:2] == [
+            "chunk_11",
+            "chunk_23",
+        ]
+
+    def test_snapshot_filters_survive_later_rewrites(self, collection, monkeypatch):
+        """Test a query's snapshot keeps its own course rows while writers rewrite"""
+        monkeypatch.setattr(MemmapCollection, "MIN_DEAD_ROWS", 10)
+        snapshot = collection._current()
+
+        # Compacting renumbers both the rows and the course codes of Course 1
+        collection.delete(where={"course_title": "Course 0"})
+        collection.delete(where={"course_title": "Course 2"})
+        assert collection._header["generation"] == 1
+        assert collection._header["titles"] == ["Course 1"]
+
+        found = collection._candidates(snapshot, {"course_title": "Course 1"})
+        assert found.tolist() == list(range(1, 200, 3))
+
+    def test_ivf_lists_match_exact_search_when_all_probed(self, tmp_path):
+        """Test IVF lists are trained once large enough and probing all is exact"""
+        ids, vectors, metadatas, documents = rows(400)
+        exact = MemmapCollection(str(tmp_path / "exact"))
+        ivf = MemmapCollection(str(tmp_path / "ivf"), ivf_lists=4, ivf_probes=4)
+        for store in (exact, ivf):
+            store.upsert(
+                ids=ids, embeddings=vectors, metadatas=metadatas, documents=documents
+            )
+        queries = vectors[:5] + 0.01
+
+        assert ivf._current().centroids.shape == (4, 8)
+        probed = ivf.query(query_embeddings=queries, n_results=5)
+        expected = exact.query(query_embeddings=queries, n_results=5)
+        assert probed["ids"] == expected["ids"]
+        assert np.allclose(probed["distances"], expected["distances"], atol=1e-4)
+
+        ivf.ivf_probes = 1
+        narrow = ivf.query(
+            query_embeddings=queries, n_results=3, where={"course_title": "Course 0"}
+        )
+        # One probed list may hold too few filtered rows; results stay complete
+        assert [len(hits) for hits in narrow["ids"]] == [3] * 5
+        assert {m["course_title"] for metas in narrow["metadatas"] for m in metas} == {
+            "Course 0"
+        }
+        assert narrow["ids"][0][0] == "chunk_0" and narrow["ids"][3][0] == "chunk_3"
+
+    def test_course_rows_follow_writes(self, collection, tmp_path, monkeypatch):
+        """Test per-course row lists track appends, other writers and rewrites"""
+        monkeypatch.setattr(MemmapCollection, "MIN_DEAD_ROWS", 10)
+        reader = MemmapCollection(str(tmp_path / "content"))
+        assert len(reader.get(where={"course_title": "Course 1"})["ids"]) == 67
+
+        collection.upsert(
+            ids=["late"],
+            embeddings=[[9.0] * 8],
+            metadatas=[{"course_title": "Course 1"}],
+            documents=["l"],
+        )
+        collection.delete(where={"lesson_number": 0})
+        collection.delete(where={"lesson_number": 1})
+        collection.delete(where={"lesson_number": 2})
+
+        assert collection._header["generation"] == 1
+        scoped = reader.query(
+            query_embeddings=[[9.0] * 8],
+            n_results=40,
+            where={"course_title": "Course 1"},
+        )
+        assert scoped["ids"][0][0] == "late"
+        assert len(scoped["ids"][0]) == 1 + sum(
+            1 for i in range(200) if i % 3 == 1 and i % 4 == 3
+        )
+        assert reader.get(where={"course_title": "Course 9"})["ids"] == []
+
+
+@pytest.mark.unit
+class TestQuantizedCollection:
+    """Test int8 and binary codes with float32 re-ranking"""
+
+    @pytest.mark.parametrize("quantization, code_bytes", [("int8", 8), ("binary", 1)])
+    def test_reranked_results_are_exact(self, tmp_path, quantization, code_bytes):
+        """Test a shortlist covering every row re-ranks to the exact results"""
+        ids, vectors, metadatas, documents = rows(200)
+        exact = MemmapCollection(str(tmp_path / "exact"))
+        quantized = MemmapCollection(
+            str(tmp_path / "codes"), quantization=quantization, oversample=40
+        )
+        for store in (exact, quantized):
+            store.upsert(
+                ids=ids, embeddings=vectors, metadatas=metadatas, documents=documents
+            )
+        queries = np.random.default_rng(1).normal(size=(3, 8)).astype(np.float32)
+
+        found = quantized.query(
+            query_embeddings=queries, n_results=5, where={"lesson_number": 1}
+        )
+        expected = exact.query(
+            query_embeddings=queries, n_results=5, where={"lesson_number": 1}
+        )
+
+        assert found["ids"] == expected["ids"]
+        assert np.allclose(found["distances"], expected["distances"], atol=1e-4)
+        assert os.path.getsize(tmp_path / "codes" / "codes-0") == 200 * code_bytes
+
+    def test_int8_shortlist_finds_near_duplicates(self, tmp_path):
+        """Test a small shortlist of int8 codes still ranks a near copy first"""
+        ids, vectors, metadatas, documents = rows(400, dim=32)
+        collection = MemmapCollection(
+            str(tmp_path / "codes"), quantization="int8", oversample=2
+        )
+        collection.upsert(
+            ids=ids, embeddings=vectors, metadatas=metadatas, documents=documents
+        )
+
+        found = collection.query(query_embeddings=vectors[:20] + 0.01, n_results=1)
+
+        assert found["ids"] == [[chunk_id] for chunk_id in ids[:20]]
+
+    def test_changed_quantization_rewrites_on_open(self, collection, tmp_path):
+        """Test reopening with another encoding rewrites the codes"""
+        quantized = MemmapCollection(
+            str(tmp_path / "content"), quantization="binary", oversample=100
+        )
+
+        assert quantized._header["generation"] == 1
+        assert quantized._header["quantization"] == "binary"
+        assert quantized.count() == 200
+        assert (
+            quantized.query(query_embeddings=[[1.0] * 8], n_results=3)["ids"]
+            == collection.query(query_embeddings=[[1.0] * 8], n_results=3)["ids"]
+        )
+
+
+@pytest.fixture
+def chroma(tmp_path):
+    import chromadb
+
+    ids, vectors, metadatas, documents = rows(200)
+    client = chromadb.PersistentClient(path=str(tmp_path / "chroma"))
+    content = client.get_or_create_collection("content", embedding_function=None)
+    content.upsert(
+        ids=ids, embeddings=vectors, metadatas=metadatas, documents=documents
+    )
+    return content
+
+
+@pytest.mark.unit
+class TestPartitionedCollection:
+    """Test per-course partitions in front of Chroma"""
+
+    @pytest.mark.parametrize(
+        "where",
+        [
+            {"course_title": "Course 1"},
+            {"$and": [{"course_title": "Course 2"}, {"lesson_number": 1}]},
+            {"course_title": "Missing"},
+        ],
+    )
+    def test_scoped_query_matches_chroma_filter(self, chroma, where):
+        """Test partition search returns what Chroma's where filter returns"""
+        partitioned = PartitionedCollection(chroma, max_bytes=1 << 20)
+        queries = np.random.default_rng(1).normal(size=(3, 8)).astype(np.float32)
+
+        found = partitioned.query(query_embeddings=queries, n_results=5, where=where)
+        expected = chroma.query(query_embeddings=queries, n_results=5, where=where)
+
+        assert found["ids"] == expected["ids"]
+        assert found["documents"] == expected["documents"]
+        assert found["metadatas"] == expected["metadatas"]
+        assert np.allclose(
+            np.array(found["distances"]), np.array(expected["distances"]), atol=1e-3
+        )
+        assert partitioned.stats()["loads"] == 1
+
+    def test_writes_keep_partitions_current(self, chroma):
+        """Test upserts update loaded partitions and deletes drop them"""
+        partitioned = PartitionedCollection(chroma, max_bytes=1 << 20)
+        where = {"course_title": "Course 0"}
+        partitioned.query(query_embeddings=[[0.0] * 8], n_results=1, where=where)
+
+        partitioned.upsert(
+            ids=["near"], embeddings=[[0.0] * 8], metadatas=[where], documents=["near"]
+        )
+        assert partitioned.query(
+            query_embeddings=[[0.0] * 8], n_results=1, where=where
+        )["ids"] == [["near"]]
+        assert partitioned.stats()["loads"] == 1
+
+        partitioned.delete(ids=["near"])
+        assert partitioned.query(
+            query_embeddings=[[0.0] * 8], n_results=1, where=where
+        )["ids"] != [["near"]]
+        partitioned.delete(where=where)
+        assert partitioned.query(
+            query_embeddings=[[0.0] * 8], n_results=1, where=where
+        )["ids"] == [[]]
+        assert partitioned.stats()["loads"] == 3
+
+    def test_load_racing_an_upsert_is_not_kept(self, chroma):
+        """Test a partition loaded while its course is written is reloaded next time"""
+        partitioned = PartitionedCollection(chroma, max_bytes=1 << 20)
+        where = {"course_title": "Course 0"}
+        load = chroma.get
+
+        def get_then_write(**kwargs):
+            stored = load(**kwargs)
+            if kwargs.get("where") == where:
+                # Indexer writes after the loader read its snapshot
+                partitioned.upsert(
+                    ids=["new"],
+                    embeddings=[[0.0] * 8],
+                    metadatas=[where],
+                    documents=["new"],
+                )
+            return stored
+
+        partitioned.collection = Mock(
+            wraps=chroma, get=Mock(side_effect=get_then_write)
+        )
+        partitioned.query(query_embeddings=[[0.0] * 8], n_results=1, where=where)
+        partitioned.collection = chroma
+
+        assert partitioned.stats()["partitions"] == 0
+        assert partitioned.query(
+            query_embeddings=[[0.0] * 8], n_results=1, where=where
+        )["ids"] == [["new"]]
+        assert partitioned.stats()["partitions"] == 1
+
+    def test_least_recently_used_partitions_are_evicted(self, chroma):
+        """Test partitions beyond max_bytes are evicted and unscoped queries pass"""
+        partitioned = PartitionedCollection(chroma, max_bytes=15000)
+        for course in ("Course 0", "Course 1", "Course 0", "Course 2"):
+            partitioned.query(
+                query_embeddings=[[0.0] * 8],
+                n_results=1,
+                where={"course_title": course},
+            )
+
+        assert list(partitioned._partitions) == ["Course 0", "Course 2"]
+        assert partitioned.stats()["evictions"] == 1
+        everywhere = partitioned.query(query_embeddings=[[0.0] * 8], n_results=3)
+        assert (
+            everywhere["ids"]
+            == chroma.query(query_embeddings=[[0.0] * 8], n_results=3)["ids"]
+        )
+
+
+@pytest.mark.unit
+class TestOpenVectorBackend:
+    """Test backend selection"""
+
+    def test_memmap_client_under_path(self, tmp_path):
+        """Test the memmap client keeps collections under path/memmap"""
+        client = open_vector_backend("memmap", str(tmp_path))
+        client.get_or_create_collection("course_content").upsert(
+            ids=["a"], embeddings=[[1.0, 0.0]], documents=["a"]
+        )
+        client.delete_collection("course_content")
+
+        assert isinstance(client, MemmapVectorClient)
+        assert (tmp_path / "memmap" / "course_content" / "header.json").exists()
+        assert client.get_or_create_collection("course_content").count() == 0
+
+    def test_quantization_needs_memmap(self, tmp_path):
+        """Test Chroma rejects quantized embeddings"""
+        with pytest.raises(ValueError, match="memmap"):
+            open_vector_backend("chroma", str(tmp_path), quantization="int8")
+
+    def test_unknown_backend(self, tmp_path):
+        """Test an unknown backend name is rejected"""
+        with pytest.raises(ValueError, match="Unknown vector backend"):
+            open_vector_backend("faiss", str(tmp_path))
+
+
+@pytest.mark.unit
+class TestVectorStoreOnMemmap:
+    """Test VectorStore with the memmap backend"""
+
+    def test_search_resolve_and_delete(self, tmp_path, monkeypatch):
+        """Test searches, course resolution and deletes work as with Chroma"""
+        module = types.ModuleType("sentence_transformers")
+        module.SentenceTransformer = lambda **kwargs: CountingModel()
+        monkeypatch.setitem(sys.modules, "sentence_transformers", module)
+        monkeypatch.setattr(LazySentenceTransformerEmbeddingFunction, "models", {})
+        store = VectorStore(
+            str(tmp_path), "fake-model", max_results=2, backend="memmap"
+        )
+        for title in ("Alpha", "Beta"):
+            store.add_course_metadata(Course(title=title))
+        store.add_course_content(
+            [
+                CourseChunk(
+                    content=text,
+                    course_title=title,
+                    lesson_number=lesson,
+                    chunk_index=i,
+                )
+                for i, (text, title, lesson) in enumerate(
+                    [
+                        ("tools and settings", "Alpha", 1),
+                        ("toast", "Alpha", 2),
+                        ("tools", "Beta", 1),
+                    ]
+                )
+            ]
+        )
+
+        assert store.search("toast", course_name="Alpha").documents[0] == "toast"
+        assert store.search("tools", course_name="Beta").ids == ["Beta_2"]
+        store.delete_course("Alpha")
+        assert store.get_existing_course_titles() == ["Beta"]
+        assert store.search("toast").ids == ["Beta_2"]
@@ -0,0 +1,273 @@
+import contextvars
+import json
+import random
+import threading
+import time
+from bisect import bisect_left
+from typing import Any, Dict, List, Optional, Sequence
+
+# Upper bounds in seconds of the latency histogram buckets
+DEFAULT_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+)
+
+_current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar(
+    "rag_current_span", default=None
+)
+
+
+class Span:
+    """A timed stage of a request, nested under the span that was current"""
+
+    __slots__ = (
+        "tracer",
+        "name",
+        "attributes",
+        "parent",
+        "trace",
+        "trace_id",
+        "span_id",
+        "start_ns",
+        "end_ns",
+        "duration",
+        "error",
+        "_started",
+        "_token",
+    )
+
+    def __init__(
+        self,
+        tracer: "Tracer",
+        name: str,
+        parent: Optional["Span"],
+        attributes: Dict[str, Any],
+    ):
+        self.tracer = tracer
+        self.name = name
+        self.attributes = attributes
+        self.parent = parent
+        if parent is None:
+            self.trace_id = f"{random.getrandbits(128):032x}"
+            # Finished spans of the trace, exported when this root span ends
+            self.trace: Optional[List[Span]] = [] if tracer.export_path else None
+        else:
+            self.trace_id = parent.trace_id
+            self.trace = parent.trace
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.start_ns = 0
+        self.end_ns = 0
+        self.duration = 0.0
+        self.error: Optional[str] = None
+        self._started = 0.0
+        self._token: Optional[contextvars.Token] = None
+
+    def set(self, key: str, value: Any):
+        """Set an attribute of the span"""
+        self.attributes[key] = value
+
+    def __enter__(self) -> "Span":
+        self.start_ns = time.time_ns()
+        self._started = time.perf_counter()
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, traceback) -> bool:
+        self.duration = time.perf_counter() - self._started
+        self.end_ns = self.start_ns + int(self.duration * 1e9)
+        if exc_type is not None:
+            self.error = exc_type.__name__
+        try:
+            _current_span.reset(self._token)
+        except ValueError:
+            pass  # Ended in another context, e.g. an abandoned async generator
+        self.tracer._finish(self)
+        return False
+
+
+class _NoopSpan:
+    """Shared stand-in returned while tracing is disabled"""
+
+    def set(self, key: str, value: Any):
+        pass
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, traceback) -> bool:
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram in the Prometheus sense"""
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Last one is +Inf
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    @property
+    def count(self) -> int:
+        return sum(self.counts)
+
+
+class Tracer:
+    """
+    Context-variable based request tracing.
+
+    span() opens a span nested under the current one; the current span
+    follows asyncio tasks, and work submitted to thread pools through
+    contextvars.copy_context().run keeps its parent. Every finished span is
+    timed into a histogram per span name, rendered by metrics() in the
+    Prometheus text format. With an export path, each finished trace is
+    appended to it as one line of OpenTelemetry (OTLP/JSON) spans.
+
+    While disabled, span() returns a shared no-op span, so an instrumented
+    call costs one attribute check.
+    """
+
+    METRIC = "rag_stage_duration_seconds"
+
+    def __init__(
+        self,
+        enabled: bool = False,
+        export_path: Optional[str] = None,
+        service_name: str = "rag-chatbot",
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        self.enabled = enabled
+        self.export_path = export_path
+        self.service_name = service_name
+        self.buckets = buckets
+        self._histograms: Dict[str, Histogram] = {}
+        self._lock = threading.Lock()
+        self._export_lock = threading.Lock()
+
+    def configure(self, enabled: bool, export_path: Optional[str] = None):
+        """Turn tracing on or off and set where traces are exported"""
+        self.export_path = export_path
+        self.enabled = enabled
+
+    def span(self, name: str, **attributes: Any):
+        """Open a span named after the stage it times, as a context manager"""
+        if not self.enabled:
+            return _NOOP_SPAN
+        return Span(self, name, _current_span.get(), attributes)
+
+    def reset(self):
+        """Drop all recorded histograms"""
+        with self._lock:
+            self._histograms = {}
+
+    def metrics(self) -> str:
+        """Render the stage histograms in the Prometheus text format"""
+        lines = [
+            f"# HELP {self.METRIC} Time spent in each stage of a request",
+            f"# TYPE {self.METRIC} histogram",
+        ]
+        with self._lock:
+            histograms = sorted(self._histograms.items())
+            for stage, histogram in histograms:
+                label = f'stage="{stage}"'
+                cumulative = 0
+                for bound, count in zip([*histogram.buckets, "+Inf"], histogram.counts):
+                    cumulative += count
+                    le = bound if isinstance(bound, str) else f"{bound:g}"
+                    lines.append(
+                        f'{self.METRIC}_bucket{{{label},le="{le}"}} {cumulative}'
+                    )
+                lines.append(f"{self.METRIC}_sum{{{label}}} {histogram.sum:.6f}")
+                lines.append(f"{self.METRIC}_count{{{label}}} {cumulative}")
+        return "\n".join(lines) + "\n"
+
+    def _finish(self, span: Span):
+        """Record a finished span and export its trace once the root ends"""
+        with self._lock:
+            histogram = self._histograms.get(span.name)
+            if histogram is None:
+                histogram = self._histograms[span.name] = Histogram(self.buckets)
+            histogram.observe(span.duration)
+
+        if span.trace is not None:
+            span.trace.append(span)
+            if span.parent is None:
+                self._export(span.trace)
+
+    def _export(self, spans: List[Span]):
+        """Append one trace to the export file as an OTLP/JSON line"""
+        payload = {
+            "resourceSpans": [
+                {
+                    "resource": {
+                        "attributes": [
+                            _otlp_attribute("service.name", self.service_name)
+                        ]
+                    },
+                    "scopeSpans": [
+                        {
+                            "scope": {"name": "rag_tracing"},
+                            "spans": [_otlp_span(span) for span in spans],
+                        }
+                    ],
+                }
+            ]
+        }
+        line = json.dumps(payload, separators=(",", ":"))
+        with self._export_lock:
+            with open(self.export_path, "a", encoding="utf-8") as file:
+                file.write(line + "\n")
+
+
+def _otlp_attribute(key: str, value: Any) -> Dict[str, Any]:
+    """Encode an attribute as an OTLP/JSON key-value pair"""
+    if isinstance(value, bool):
+        encoded = {"boolValue": value}
+    elif isinstance(value, int):
+        encoded = {"intValue": str(value)}
+    elif isinstance(value, float):
+        encoded = {"doubleValue": value}
+    else:
+        encoded = {"stringValue": str(value)}
+    return {"key": key, "value": encoded}
+
+
+def _otlp_span(span: Span) -> Dict[str, Any]:
+    """Encode a finished span in the OTLP/JSON format"""
+    encoded = {
+        "traceId": span.trace_id,
+        "spanId": span.span_id,
+        "name": span.name,
+        "kind": 1,  # SPAN_KIND_INTERNAL
+        "startTimeUnixNano": str(span.start_ns),
+        "endTimeUnixNano": str(span.end_ns),
+        "attributes": [
+            _otlp_attribute(key, value) for key, value in span.attributes.items()
+        ],
+        "status": ({"code": 2, "message": span.error} if span.error else {"code": 1}),
+    }
+    if span.parent is not None:
+        encoded["parentSpanId"] = span.parent.span_id
+    return encoded
+
+
+# Process-wide tracer; RAGSystem configures it from Config
+tracer = Tracer()
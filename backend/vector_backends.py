@@ -0,0 +1,1204 @@
+"""
+Storage backends behind VectorStore.
+
+VectorStore talks to its backend through the subset of the ChromaDB client and
+collection API it needs, so ChromaDB's PersistentClient is one backend and
+MemmapVectorClient, a NumPy index in memory-mapped files, is the other.
+"""
+
+import fcntl
+import json
+import mmap
+import os
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Metadata columns stored next to the vectors, one value per row
+_COLUMNS = {
+    "course": np.int32,  # Index of metadata["course_title"] in the header titles
+    "lesson": np.int32,  # metadata["lesson_number"], -1 when missing
+    "cluster": np.int32,  # IVF list of the row, -1 before the lists are trained
+    "alive": np.uint8,  # 0 once the row is deleted or replaced by an upsert
+    "sqnorm": np.float32,  # Squared vector norm, for L2 distances
+    "offset": np.int64,  # Start of the row's line in the records file
+    "scale": np.float32,  # Step of the row's int8 codes, 0 for other encodings
+}
+_NO_VALUE = -1
+
+# Rows copied per step when rewriting or assigning IVF lists
+_COPY_ROWS = 65536
+# Rows of quantized codes decoded per step of a search
+_SCAN_ROWS = 8192
+
+QUANTIZATIONS = ("none", "int8", "binary")
+
+# Set bits per byte value, for NumPy versions without bitwise_count
+_BIT_COUNTS = np.array([bin(value).count("1") for value in range(256)], np.uint8)
+_popcount = getattr(np, "bitwise_count", _BIT_COUNTS.__getitem__)
+
+
+class VectorCollection(ABC):
+    """
+    A named set of (id, embedding, document, metadata) rows.
+
+    Method signatures and return values follow ChromaDB's Collection, whose
+    persistent collections are the default implementation. Filters ("where")
+    match metadata values exactly and may be combined with "$and".
+    """
+
+    @abstractmethod
+    def upsert(
+        self,
+        ids: List[str],
+        documents: Optional[List[str]] = None,
+        metadatas: Optional[List[Dict[str, Any]]] = None,
+        embeddings: Optional[Sequence[Any]] = None,
+    ):
+        """Add rows, replacing rows with the same IDs"""
+        pass
+
+    @abstractmethod
+    def query(
+        self,
+        query_embeddings: Sequence[Any],
+        n_results: int = 10,
+        where: Optional[Dict] = None,
+        include: Sequence[str] = ("documents", "metadatas", "distances"),
+    ) -> Dict[str, Any]:
+        """Nearest rows of each query embedding, as lists per query"""
+        pass
+
+    @abstractmethod
+    def get(
+        self,
+        ids: Optional[List[str]] = None,
+        where: Optional[Dict] = None,
+        limit: Optional[int] = None,
+        offset: Optional[int] = None,
+        include: Sequence[str] = ("documents", "metadatas"),
+    ) -> Dict[str, Any]:
+        """Rows by ID or filter"""
+        pass
+
+    @abstractmethod
+    def delete(self, ids: Optional[List[str]] = None, where: Optional[Dict] = None):
+        """Delete rows by ID or filter"""
+        pass
+
+    @abstractmethod
+    def count(self) -> int:
+        """Number of stored rows"""
+        pass
+
+
+class VectorBackend(ABC):
+    """A set of collections; follows ChromaDB's client API"""
+
+    @abstractmethod
+    def get_or_create_collection(
+        self, name: str, embedding_function: Any = None
+    ) -> VectorCollection:
+        """Open a collection, creating it if needed"""
+        pass
+
+    @abstractmethod
+    def delete_collection(self, name: str):
+        """Delete a collection and all of its rows"""
+        pass
+
+    @abstractmethod
+    def get_max_batch_size(self) -> int:
+        """Most rows a single upsert, get or delete should touch"""
+        pass
+
+
+@dataclass
+class _Snapshot:
+    """Mapped view of a collection's committed rows"""
+
+    count: int
+    vectors: np.ndarray
+    columns: Dict[str, np.ndarray]
+    records: Any
+    centroids: Optional[np.ndarray]
+    codes: Optional[np.ndarray] = None
+    quantization: str = "none"
+    vectors_path: str = ""
+    # Course codes of titles, and rows of each course code in row order;
+    # replaced rather than changed, so readers of a snapshot can use them
+    title_codes: Dict[str, int] = field(default_factory=dict)
+    course_rows: Dict[int, np.ndarray] = field(default_factory=dict)
+
+
+def _map(path: str, dtype, shape) -> np.ndarray:
+    """Read-only mapping of the first rows of a file; pages are shared"""
+    if not shape[0]:
+        return np.zeros(shape, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r", shape=shape)
+
+
+def _code_layout(quantization: str, dim: int) -> Tuple[Any, int]:
+    """dtype and width of the codes of one vector"""
+    if quantization == "int8":
+        return np.int8, dim
+    return np.uint8, (dim + 7) // 8
+
+
+def _quantize(
+    vectors: np.ndarray, quantization: str
+) -> Tuple[Optional[np.ndarray], np.ndarray]:
+    """
+    Encode vectors as (codes, per-row int8 scales).
+
+    int8 codes are each vector divided by its largest magnitude over 127 and
+    rounded; binary codes are the packed signs of the components.
+    """
+    scales = np.zeros(len(vectors), dtype=np.float32)
+    if quantization == "int8":
+        scales = np.abs(vectors).max(axis=1) / 127
+        steps = np.where(scales == 0, 1, scales)[:, None]
+        return np.round(vectors / steps).astype(np.int8), scales
+    if quantization == "binary":
+        return np.packbits(vectors > 0, axis=1), scales
+    return None, scales
+
+
+def _squared_l2(
+    sqnorms: np.ndarray, vectors: np.ndarray, queries: np.ndarray
+) -> np.ndarray:
+    """Squared L2 distances between vectors and queries, one column per query"""
+    distances = (
+        sqnorms[:, None]
+        + (queries * queries).sum(axis=1)[None, :]
+        - 2 * (vectors @ queries.T)
+    )
+    return np.maximum(distances, 0, out=distances)
+
+
+def _top_k(candidates: np.ndarray, distances: np.ndarray, k: int):
+    """(candidates, distances) of the k smallest distances in each column"""
+    k = min(k, len(candidates))
+    hits = []
+    for column in distances.T:
+        top = np.argpartition(column, k - 1)[:k]
+        top = top[np.argsort(column[top], kind="stable")]
+        hits.append((candidates[top], column[top]))
+    return hits
+
+
+def _nearest(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """Index of the nearest centroid of each vector"""
+    distances = (centroids * centroids).sum(axis=1) - 2 * vectors @ centroids.T
+    return distances.argmin(axis=1).astype(np.int32)
+
+
+def _kmeans(vectors: np.ndarray, lists: int, iterations: int = 10) -> np.ndarray:
+    """Train IVF centroids with Lloyd's algorithm, seeded for repeatability"""
+    rng = np.random.default_rng(0)
+    centroids = vectors[rng.choice(len(vectors), lists, replace=False)].copy()
+    for _ in range(iterations):
+        assignment = _nearest(vectors, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignment, vectors)
+        sizes = np.bincount(assignment, minlength=lists)
+        filled = sizes > 0
+        centroids[filled] = sums[filled] / sizes[filled, None]
+    return centroids
+
+
+class MemmapCollection(VectorCollection):
+    """
+    Exact (or IVF) nearest neighbour search over a float32 memory-mapped file.
+
+    Each row is a float32 vector in vectors-<generation>, a value in every
+    metadata column file (see _COLUMNS), a JSON ID line in ids-<generation> and
+    a JSON [document, metadata] line in records-<generation>. Files are only
+    appended to, apart from the one-byte "alive" flags, and header.json, which
+    is replaced atomically, says how many rows are committed. Readers map the
+    committed rows read-only, so worker processes share the same page cache,
+    and remap when the header changes. Writers hold an exclusive flock.
+
+    Search computes squared L2 distances (Chroma's default) for all rows that
+    pass the course_title / lesson_number filter, evaluated on the integer
+    columns. With ivf_lists set, rows are also partitioned into that many
+    k-means lists once there are enough of them, and only the ivf_probes
+    lists nearest to a query are scanned.
+
+    With quantization set to "int8" or "binary", each row is also encoded in
+    codes-<generation> (a byte per dimension, or a bit per dimension). Search
+    then scans only the codes, by scaled int8 dot product or Hamming distance,
+    and re-ranks the oversample * n_results closest rows by exact distance.
+    The float32 vectors of those rows are read from disk, the rest stay there.
+
+    Deleted and replaced rows are only flagged; once they outnumber the live
+    rows, or the live rows have doubled since the lists were trained, the live
+    rows are rewritten into a new generation of files. A collection opened
+    with a new quantization or ivf_lists setting is rewritten straight away.
+    """
+
+    MIN_DEAD_ROWS = 1024  # Dead rows tolerated regardless of the live count
+    MIN_ROWS_PER_LIST = 32  # Live rows per IVF list before lists are trained
+
+    def __init__(
+        self,
+        path: str,
+        embedding_function: Any = None,
+        ivf_lists: int = 0,
+        ivf_probes: int = 8,
+        quantization: str = "none",
+        oversample: int = 4,
+    ):
+        if quantization not in QUANTIZATIONS:
+            raise ValueError(f"Unknown quantization: {quantization}")
+        self.path = path
+        self.embedding_function = embedding_function
+        self.ivf_lists = ivf_lists
+        self.ivf_probes = ivf_probes
+        self.quantization = quantization
+        self.oversample = oversample
+
+        self._lock = threading.RLock()
+        self._header_key = None
+        self._header: Dict[str, Any] = self._empty_header(0)
+        self._ids: List[str] = []
+        self._rows: Dict[str, int] = {}
+        self._ids_read = 0
+        self._snapshot = self._load_snapshot()
+        self._refresh()
+        if self._rewrite_due(self._header):
+            with self._writing() as header:
+                if self._rewrite_due(header):
+                    self._rewrite()
+
+    def _empty_header(self, generation: int) -> Dict[str, Any]:
+        return {
+            "generation": generation,
+            "quantization": self.quantization,
+            "dim": 0,
+            "count": 0,
+            "live": 0,
+            "titles": [],
+            "records_bytes": 0,
+            "ids_bytes": 0,
+            "trained": 0,
+        }
+
+    def _file(self, name: str, generation: Optional[int] = None) -> str:
+        if generation is None:
+            generation = self._header["generation"]
+        return os.path.join(self.path, f"{name}-{generation}")
+
+    def _generation_files(self, generation: int) -> List[str]:
+        names = ["vectors", "codes", "ids", "records", "centroids", *_COLUMNS]
+        return [self._file(name, generation) for name in names]
+
+    # Reading
+
+    def _refresh(self):
+        """Reload the header and remap the files if another writer committed"""
+        header_path = os.path.join(self.path, "header.json")
+        with self._lock:
+            try:
+                stat = os.stat(header_path)
+            except FileNotFoundError:
+                key = None
+            else:
+                key = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+            if key == self._header_key:
+                return
+            if key is None:
+                header = self._empty_header(0)
+            else:
+                with open(header_path, encoding="utf-8") as file:
+                    header = json.load(file)
+            previous = self._snapshot
+            if (
+                header["generation"] != self._header["generation"]
+                or header["ids_bytes"] < self._ids_read
+            ):
+                self._ids, self._rows, self._ids_read = [], {}, 0
+                previous = None
+            self._header = header
+            self._header_key = key
+            self._read_ids()
+            snapshot = self._load_snapshot()
+            snapshot.title_codes = {
+                title: code for code, title in enumerate(header["titles"])
+            }
+            snapshot.course_rows = self._index_courses(snapshot, previous)
+            self._snapshot = snapshot
+
+    def _read_ids(self):
+        """Read ID lines committed since the last refresh"""
+        end = self._header["ids_bytes"]
+        if end <= self._ids_read:
+            return
+        with open(self._file("ids"), "rb") as file:
+            file.seek(self._ids_read)
+            data = file.read(end - self._ids_read)
+        for line in data.splitlines():
+            chunk_id = json.loads(line)
+            self._rows[chunk_id] = len(self._ids)
+            self._ids.append(chunk_id)
+        self._ids_read = end
+
+    def _load_snapshot(self) -> _Snapshot:
+        header = self._header
+        count = header["count"]
+        columns = {
+            name: _map(self._file(name), dtype, (count,))
+            for name, dtype in _COLUMNS.items()
+        }
+        records: Any = b""
+        if header["records_bytes"]:
+            with open(self._file("records"), "rb") as file:
+                records = mmap.mmap(
+                    file.fileno(), header["records_bytes"], access=mmap.ACCESS_READ
+                )
+        centroids = None
+        if header["trained"]:
+            centroids = np.load(self._file("centroids") + ".npy")
+        vectors = _map(self._file("vectors"), np.float32, (count, header["dim"]))
+        codes = None
+        if header["quantization"] != "none":
+            dtype, width = _code_layout(header["quantization"], header["dim"])
+            codes = _map(self._file("codes"), dtype, (count, width))
+        return _Snapshot(
+            count=count,
+            vectors=vectors,
+            columns=columns,
+            records=records,
+            centroids=centroids,
+            codes=codes,
+            quantization=header["quantization"],
+            vectors_path=self._file("vectors"),
+        )
+
+    def _current(self) -> _Snapshot:
+        with self._lock:
+            self._refresh()
+            return self._snapshot
+
+    def _candidates(self, snapshot: _Snapshot, where: Optional[Dict]) -> np.ndarray:
+        """
+        Sorted live rows matching a where filter.
+
+        A course_title filter starts from that course's row list, so the cost
+        grows with the size of the course rather than of the collection.
+        """
+        filters = {}
+        for clause in where.get("$and", [where]) if where else []:
+            for key, value in clause.items():
+                if key not in ("course_title", "lesson_number"):
+                    raise ValueError(f"Unsupported filter field: {key}")
+                filters[key] = value
+
+        columns = snapshot.columns
+        if "course_title" not in filters:
+            mask = columns["alive"] == 1
+            if "lesson_number" in filters:
+                mask &= columns["lesson"] == filters["lesson_number"]
+            return np.flatnonzero(mask)
+
+        code = snapshot.title_codes.get(filters["course_title"])
+        rows = snapshot.course_rows.get(code, np.zeros(0, dtype=np.int64))
+        keep = columns["alive"][rows] == 1
+        if "lesson_number" in filters:
+            keep &= columns["lesson"][rows] == filters["lesson_number"]
+        return rows[keep]
+
+    @staticmethod
+    def _index_courses(
+        snapshot: _Snapshot, previous: Optional[_Snapshot]
+    ) -> Dict[int, np.ndarray]:
+        """Per-course row lists of a snapshot, extending those of the previous one"""
+        indexed = previous.count if previous is not None else 0
+        course_rows = dict(previous.course_rows) if previous is not None else {}
+        if snapshot.count <= indexed:
+            return course_rows
+        courses = np.asarray(snapshot.columns["course"][indexed : snapshot.count])
+        order = np.argsort(courses, kind="stable")
+        codes, starts = np.unique(courses[order], return_index=True)
+        for code, rows in zip(codes.tolist(), np.split(order + indexed, starts[1:])):
+            rows_before = course_rows.get(code)
+            course_rows[code] = (
+                rows if rows_before is None else np.concatenate([rows_before, rows])
+            )
+        return course_rows
+
+    @staticmethod
+    def _record_line(snapshot: _Snapshot, row: int) -> bytes:
+        """The JSON [document, metadata] line of a row"""
+        start = int(snapshot.columns["offset"][row])
+        return snapshot.records[start : snapshot.records.find(b"\n", start) + 1]
+
+    def _record(self, snapshot: _Snapshot, row: int):
+        """The (document, metadata) of a row"""
+        return json.loads(self._record_line(snapshot, row))
+
+    def _rows_of(self, snapshot: _Snapshot, ids: List[str]) -> List[int]:
+        """Live rows of the given IDs, skipping unknown ones"""
+        rows = (self._rows.get(chunk_id) for chunk_id in ids)
+        return [
+            row
+            for row in rows
+            if row is not None
+            and row < snapshot.count
+            and snapshot.columns["alive"][row]
+        ]
+
+    def count(self) -> int:
+        with self._lock:
+            self._refresh()
+            return self._header["live"]
+
+    def get(
+        self,
+        ids: Optional[List[str]] = None,
+        where: Optional[Dict] = None,
+        limit: Optional[int] = None,
+        offset: Optional[int] = None,
+        include: Sequence[str] = ("documents", "metadatas"),
+    ) -> Dict[str, Any]:
+        with self._lock:
+            snapshot = self._current()
+            if ids is not None:
+                rows = np.array(self._rows_of(snapshot, ids), dtype=np.int64)
+                if where:
+                    rows = rows[np.isin(rows, self._candidates(snapshot, where))]
+            else:
+                rows = self._candidates(snapshot, where)
+            start = offset or 0
+            rows = rows[start : start + limit if limit is not None else None]
+            row_ids = [self._ids[row] for row in rows]
+        records = [self._record(snapshot, row) for row in rows]
+        return {
+            "ids": row_ids,
+            "documents": (
+                [record[0] for record in records] if "documents" in include else None
+            ),
+            "metadatas": (
+                [record[1] for record in records] if "metadatas" in include else None
+            ),
+            "embeddings": (
+                np.array(snapshot.vectors[rows]) if "embeddings" in include else None
+            ),
+        }
+
+    def query(
+        self,
+        query_embeddings: Sequence[Any],
+        n_results: int = 10,
+        where: Optional[Dict] = None,
+        include: Sequence[str] = ("documents", "metadatas", "distances"),
+    ) -> Dict[str, Any]:
+        with self._lock:
+            snapshot = self._current()
+            ids = self._ids
+        queries = np.asarray(query_embeddings, dtype=np.float32)
+        queries = queries.reshape(len(query_embeddings), -1)
+        candidates = self._candidates(snapshot, where)
+
+        if snapshot.centroids is None:
+            hits = self._nearest_rows(snapshot, candidates, queries, n_results)
+        else:
+            hits = [
+                self._nearest_rows(
+                    snapshot,
+                    self._probe(snapshot, candidates, query, n_results),
+                    query[None, :],
+                    n_results,
+                )[0]
+                for query in queries
+            ]
+
+        results: Dict[str, Any] = {
+            "ids": [],
+            "documents": [],
+            "metadatas": [],
+            "distances": [],
+        }
+        for rows, distances in hits:
+            records = [self._record(snapshot, row) for row in rows]
+            results["ids"].append([ids[row] for row in rows])
+            results["documents"].append([record[0] for record in records])
+            results["metadatas"].append([record[1] for record in records])
+            results["distances"].append(distances.tolist())
+        for key in ("documents", "metadatas", "distances"):
+            if key not in include:
+                results[key] = None
+        return results
+
+    def _probe(
+        self,
+        snapshot: _Snapshot,
+        candidates: np.ndarray,
+        query: np.ndarray,
+        n_results: int,
+    ) -> np.ndarray:
+        """Candidates in the IVF lists nearest the query"""
+        probes = min(self.ivf_probes, len(snapshot.centroids))
+        centroid_distances = ((snapshot.centroids - query) ** 2).sum(axis=1)
+        nearest = np.argpartition(centroid_distances, probes - 1)[:probes]
+        probed = candidates[np.isin(snapshot.columns["cluster"][candidates], nearest)]
+        # A selective filter can leave too few rows in the probed lists
+        return probed if len(probed) >= n_results else candidates
+
+    def _nearest_rows(
+        self,
+        snapshot: _Snapshot,
+        candidates: np.ndarray,
+        queries: np.ndarray,
+        n_results: int,
+    ):
+        """(rows, squared L2 distances) of the nearest candidates per query"""
+        if not len(candidates) or n_results <= 0:
+            empty = np.zeros(0, dtype=np.float32)
+            return [(np.zeros(0, dtype=np.int64), empty) for _ in queries]
+        if snapshot.codes is None:
+            distances = self._exact_distances(snapshot, candidates, queries)
+            return _top_k(candidates, distances, n_results)
+
+        # Shortlist on the codes, then re-rank with full-precision vectors
+        shortlists = _top_k(
+            candidates,
+            self._code_distances(snapshot, candidates, queries),
+            n_results * self.oversample,
+        )
+        hits = []
+        with open(snapshot.vectors_path, "rb") as file:
+            for (rows, _), query in zip(shortlists, queries):
+                rows = np.sort(rows)
+                vectors = self._read_vectors(snapshot, file.fileno(), rows)
+                exact = self._exact_distances(snapshot, rows, query[None, :], vectors)
+                hits += _top_k(rows, exact, n_results)
+        return hits
+
+    @staticmethod
+    def _read_vectors(snapshot: _Snapshot, fd: int, rows: np.ndarray) -> np.ndarray:
+        """
+        Read float32 vectors of a few rows from disk.
+
+        Reading through the mapping would map whole page cache folios around
+        each row, so scattered rows would soon make the full matrix resident.
+        """
+        dim = snapshot.vectors.shape[1]
+        size = dim * 4
+        data = b"".join(os.pread(fd, size, int(row) * size) for row in rows)
+        return np.frombuffer(data, dtype=np.float32).reshape(len(rows), dim)
+
+    @staticmethod
+    def _exact_distances(
+        snapshot: _Snapshot,
+        rows: np.ndarray,
+        queries: np.ndarray,
+        vectors: Optional[np.ndarray] = None,
+    ) -> np.ndarray:
+        """Squared L2 distances between rows and queries, one column per query"""
+        if vectors is None and len(rows) == snapshot.count:
+            vectors = snapshot.vectors  # Scan the mapping without a copy
+        elif vectors is None:
+            vectors = snapshot.vectors[rows]
+        return _squared_l2(snapshot.columns["sqnorm"][rows], vectors, queries)
+
+    @staticmethod
+    def _code_distances(
+        snapshot: _Snapshot, rows: np.ndarray, queries: np.ndarray
+    ) -> np.ndarray:
+        """Approximate distances from the codes, one column per query"""
+        distances = np.empty((len(rows), len(queries)), dtype=np.float32)
+        query_norms = (queries * queries).sum(axis=1)
+        query_bits = np.packbits(queries > 0, axis=1)
+        for start in range(0, len(rows), _SCAN_ROWS):
+            block = rows[start : start + _SCAN_ROWS]
+            if len(rows) == snapshot.count:
+                codes = snapshot.codes[start : start + _SCAN_ROWS]
+            else:
+                codes = snapshot.codes[block]
+            if snapshot.quantization == "int8":
+                dots = codes.astype(np.float32) @ queries.T
+                dots *= snapshot.columns["scale"][block][:, None]
+                distances[start : start + len(block)] = (
+                    snapshot.columns["sqnorm"][block][:, None]
+                    + query_norms[None, :]
+                    - 2 * dots
+                )
+            else:
+                for column, bits in enumerate(query_bits):
+                    distances[start : start + len(block), column] = _popcount(
+                        codes ^ bits
+                    ).sum(axis=1)
+        return distances
+
+    # Writing
+
+    @contextmanager
+    def _writing(self):
+        """Exclusive access across threads and processes, on current data"""
+        with self._lock:
+            os.makedirs(self.path, exist_ok=True)
+            with open(os.path.join(self.path, "lock"), "a") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                self._refresh()
+                yield self._header
+
+    def upsert(
+        self,
+        ids: List[str],
+        documents: Optional[List[str]] = None,
+        metadatas: Optional[List[Dict[str, Any]]] = None,
+        embeddings: Optional[Sequence[Any]] = None,
+    ):
+        if not ids:
+            return
+        if embeddings is None:
+            embeddings = self.embedding_function(documents)
+        vectors = np.asarray(embeddings, dtype=np.float32).reshape(len(ids), -1)
+        documents = documents or [None] * len(ids)
+        metadatas = [metadata or {} for metadata in metadatas or [None] * len(ids)]
+
+        with self._writing() as header:
+            if header["dim"] and vectors.shape[1] != header["dim"]:
+                raise ValueError(
+                    f"Embedding dimension {vectors.shape[1]} does not match "
+                    f"collection dimension {header['dim']}"
+                )
+            header["dim"] = vectors.shape[1]
+            snapshot = self._snapshot
+            replaced = self._rows_of(snapshot, list(dict.fromkeys(ids)))
+            self._flag_dead(replaced)
+
+            courses = []
+            title_codes = dict(snapshot.title_codes)
+            for metadata in metadatas:
+                title = metadata.get("course_title")
+                if title is not None and title not in title_codes:
+                    title_codes[title] = len(header["titles"])
+                    header["titles"].append(title)
+                courses.append(title_codes.get(title, _NO_VALUE))
+            lessons = [metadata.get("lesson_number") for metadata in metadatas]
+            alive = np.ones(len(ids))
+            # Repeated IDs within one batch: the last row wins
+            last = {chunk_id: position for position, chunk_id in enumerate(ids)}
+            for position, chunk_id in enumerate(ids):
+                if last[chunk_id] != position:
+                    alive[position] = 0
+
+            self._append_rows(
+                header,
+                ids,
+                vectors,
+                [
+                    json.dumps([document, metadata]).encode() + b"\n"
+                    for document, metadata in zip(documents, metadatas)
+                ],
+                {
+                    "course": courses,
+                    "lesson": [
+                        _NO_VALUE if lesson is None else lesson for lesson in lessons
+                    ],
+                    "cluster": self._assign(vectors, snapshot.centroids),
+                    "alive": alive,
+                    "sqnorm": (vectors * vectors).sum(axis=1),
+                },
+            )
+            header["live"] += int(alive.sum()) - len(replaced)
+            self._commit(header)
+
+    def delete(self, ids: Optional[List[str]] = None, where: Optional[Dict] = None):
+        with self._writing() as header:
+            snapshot = self._snapshot
+            if ids is not None:
+                rows = np.array(self._rows_of(snapshot, ids), dtype=np.int64)
+                if where:
+                    rows = rows[np.isin(rows, self._candidates(snapshot, where))]
+            else:
+                rows = self._candidates(snapshot, where)
+            rows = np.unique(rows)
+            if not len(rows):
+                return
+            self._flag_dead(rows.tolist())
+            header["live"] -= len(rows)
+            self._commit(header)
+
+    def reset(self):
+        """Remove all rows, leaving an empty collection"""
+        with self._writing() as header:
+            old = header["generation"]
+            self._write_header(self._empty_header(old + 1))
+            self._remove_generation(old)
+
+    @staticmethod
+    def _assign(vectors: np.ndarray, centroids: Optional[np.ndarray]) -> np.ndarray:
+        """IVF list of each vector, or -1 while no lists are trained"""
+        if centroids is None:
+            return np.full(len(vectors), _NO_VALUE)
+        return _nearest(vectors, centroids)
+
+    def _append_rows(
+        self,
+        header: Dict[str, Any],
+        ids: List[str],
+        vectors: np.ndarray,
+        lines: List[bytes],
+        columns: Dict[str, Any],
+    ):
+        """Append rows after the committed rows of header's generation"""
+        starts = np.cumsum([0] + [len(line) for line in lines[:-1]])
+        codes, scales = _quantize(vectors, header["quantization"])
+        columns = {**columns, "offset": header["records_bytes"] + starts}
+        columns["scale"] = scales
+        count = header["count"]
+        self._append(header, "vectors", vectors.tobytes(), count * vectors[0].nbytes)
+        if codes is not None:
+            self._append(header, "codes", codes.tobytes(), count * codes[0].nbytes)
+        for name, dtype in _COLUMNS.items():
+            values = np.asarray(columns[name]).astype(dtype)
+            self._append(header, name, values.tobytes(), count * values.itemsize)
+        header["records_bytes"] = self._append(
+            header, "records", b"".join(lines), header["records_bytes"]
+        )
+        header["ids_bytes"] = self._append(
+            header,
+            "ids",
+            b"".join(json.dumps(chunk_id).encode() + b"\n" for chunk_id in ids),
+            header["ids_bytes"],
+        )
+        header["count"] += len(ids)
+
+    def _append(self, header: Dict[str, Any], name: str, data: bytes, size: int):
+        """Write data after the committed size of a file, returning the new size"""
+        with open(self._file(name, header["generation"]), "ab") as file:
+            # Drop anything an interrupted write left after the committed rows
+            file.truncate(size)
+            file.write(data)
+        return size + len(data)
+
+    def _flag_dead(self, rows: List[int]):
+        if not rows:
+            return
+        with open(self._file("alive"), "r+b") as file:
+            for row in sorted(rows):
+                file.seek(row)
+                file.write(b"\0")
+
+    def _commit(self, header: Dict[str, Any]):
+        """Publish a write, then rewrite the live rows when due"""
+        self._write_header(header)
+        if self._rewrite_due(header):
+            self._rewrite()
+
+    def _rewrite_due(self, header: Dict[str, Any]) -> bool:
+        live, dead = header["live"], header["count"] - header["live"]
+        if dead > max(live, self.MIN_DEAD_ROWS):
+            return True
+        if header["count"] and header["quantization"] != self.quantization:
+            return True
+        return bool(
+            self.ivf_lists
+            and live >= self.ivf_lists * self.MIN_ROWS_PER_LIST
+            and live >= 2 * header["trained"]
+        )
+
+    def _write_header(self, header: Dict[str, Any]):
+        path = os.path.join(self.path, "header.json")
+        with open(path + ".tmp", "w", encoding="utf-8") as file:
+            json.dump(header, file)
+        os.replace(path + ".tmp", path)
+        self._refresh()
+
+    def _remove_generation(self, generation: int):
+        # Readers that still map these files keep their pages until they remap
+        for path in self._generation_files(generation):
+            for name in (path, path + ".npy"):
+                if os.path.exists(name):
+                    os.remove(name)
+
+    def _rewrite(self):
+        """Copy the live rows into a new generation, training IVF lists"""
+        snapshot = self._snapshot
+        old = self._header["generation"]
+        header = self._empty_header(old + 1)
+        header["dim"] = self._header["dim"]
+        live = np.flatnonzero(snapshot.columns["alive"] == 1)
+
+        centroids = None
+        if self.ivf_lists and len(live) >= self.ivf_lists * self.MIN_ROWS_PER_LIST:
+            sample = np.random.default_rng(0).choice(
+                live, min(len(live), self.ivf_lists * 256), replace=False
+            )
+            centroids = _kmeans(
+                np.asarray(snapshot.vectors[np.sort(sample)]), self.ivf_lists
+            )
+            np.save(self._file("centroids", old + 1) + ".npy", centroids)
+            header["trained"] = len(live)
+
+        # Course codes are renumbered to the titles still in use
+        codes: Dict[int, int] = {}
+        for start in range(0, len(live), _COPY_ROWS):
+            rows = live[start : start + _COPY_ROWS]
+            vectors = np.asarray(snapshot.vectors[rows])
+            courses = []
+            for code in snapshot.columns["course"][rows].tolist():
+                if code != _NO_VALUE and code not in codes:
+                    codes[code] = len(header["titles"])
+                    header["titles"].append(self._header["titles"][code])
+                courses.append(codes.get(code, _NO_VALUE))
+            self._append_rows(
+                header,
+                [self._ids[row] for row in rows],
+                vectors,
+                [self._record_line(snapshot, row) for row in rows],
+                {
+                    "course": courses,
+                    "lesson": snapshot.columns["lesson"][rows],
+                    "cluster": self._assign(vectors, centroids),
+                    "alive": np.ones(len(rows)),
+                    "sqnorm": snapshot.columns["sqnorm"][rows],
+                },
+            )
+        header["live"] = header["count"]
+        self._write_header(header)
+        self._remove_generation(old)
+
+
+@dataclass
+class _Partition:
+    """IDs, lesson numbers and embeddings of one course's chunks"""
+
+    ids: List[str]
+    lessons: np.ndarray
+    vectors: np.ndarray
+    sqnorms: np.ndarray
+
+    @classmethod
+    def build(cls, ids: List[str], lessons: List[Any], vectors: Any) -> "_Partition":
+        vectors = np.asarray(vectors, dtype=np.float32)
+        vectors = vectors.reshape(len(ids), -1) if len(ids) else vectors.reshape(0, 0)
+        return cls(
+            ids=list(ids),
+            lessons=np.array(
+                [_NO_VALUE if lesson is None else lesson for lesson in lessons],
+                dtype=np.int32,
+            ),
+            vectors=vectors,
+            sqnorms=(vectors * vectors).sum(axis=1),
+        )
+
+    @property
+    def nbytes(self) -> int:
+        return self.vectors.nbytes + self.lessons.nbytes + 64 * len(self.ids)
+
+
+def _scope(where: Optional[Dict]) -> Tuple[Optional[str], Optional[int]]:
+    """(course_title, lesson_number) of a course-scoped filter, else (None, None)"""
+    filters = {}
+    for clause in where.get("$and", [where]) if where else []:
+        filters.update(clause)
+    if set(filters) - {"course_title", "lesson_number"}:
+        return None, None
+    return filters.get("course_title"), filters.get("lesson_number")
+
+
+class PartitionedCollection:
+    """
+    Per-course partitions in front of a ChromaDB collection.
+
+    Chroma evaluates a where filter against its SQLite metadata on every
+    query, so a course-scoped search costs more than an unfiltered one over
+    the whole corpus. This wrapper keeps the IDs, lesson numbers and
+    embeddings of searched courses in memory and answers course-scoped
+    queries by exact search over that course alone, fetching only the hits'
+    documents from Chroma. A partition is loaded on the first scoped query of
+    its course, updated by upserts that carry embeddings, dropped by other
+    writes and evicted least recently used beyond max_bytes. A load that
+    overlaps a write to its course answers its query but is not kept, since
+    it may predate the write. Everything else goes straight to the wrapped
+    collection.
+    """
+
+    def __init__(self, collection: Any, max_bytes: int):
+        self.collection = collection
+        self.max_bytes = max_bytes
+        self._partitions: "OrderedDict[str, _Partition]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        # Write generations per course, and of writes whose courses are
+        # unknown, so a load that raced a write is not kept
+        self._course_writes: Dict[str, int] = {}
+        self._other_writes = 0
+
+        # Counters
+        self.hits = 0
+        self.loads = 0
+        self.evictions = 0
+
+    def __getattr__(self, name: str):
+        return getattr(self.collection, name)
+
+    def query(
+        self,
+        query_embeddings: Sequence[Any],
+        n_results: int = 10,
+        where: Optional[Dict] = None,
+        include: Sequence[str] = ("documents", "metadatas", "distances"),
+    ) -> Dict[str, Any]:
+        course_title, lesson_number = _scope(where)
+        if course_title is None:
+            return self.collection.query(
+                query_embeddings=query_embeddings,
+                n_results=n_results,
+                where=where,
+                include=list(include),
+            )
+
+        partition = self._partition(course_title)
+        candidates = np.arange(len(partition.ids))
+        if lesson_number is not None:
+            candidates = candidates[partition.lessons == lesson_number]
+        queries = np.asarray(query_embeddings, dtype=np.float32)
+        queries = queries.reshape(len(query_embeddings), -1)
+        hits = [(candidates[:0], np.zeros(0, dtype=np.float32)) for _ in queries]
+        if len(candidates) and n_results > 0:
+            distances = _squared_l2(
+                partition.sqnorms[candidates], partition.vectors[candidates], queries
+            )
+            hits = _top_k(candidates, distances, n_results)
+
+        # Documents and metadata of the hits only, looked up by ID
+        found = list(
+            dict.fromkeys(partition.ids[row] for rows, _ in hits for row in rows)
+        )
+        records = {}
+        if found:
+            stored = self.collection.get(ids=found, include=["documents", "metadatas"])
+            records = dict(
+                zip(stored["ids"], zip(stored["documents"], stored["metadatas"]))
+            )
+        results: Dict[str, Any] = {
+            "ids": [],
+            "documents": [],
+            "metadatas": [],
+            "distances": [],
+        }
+        for rows, distances in hits:
+            kept = [
+                (partition.ids[row], distance)
+                for row, distance in zip(rows, distances.tolist())
+                if partition.ids[row] in records
+            ]
+            results["ids"].append([chunk_id for chunk_id, _ in kept])
+            results["documents"].append([records[chunk_id][0] for chunk_id, _ in kept])
+            results["metadatas"].append([records[chunk_id][1] for chunk_id, _ in kept])
+            results["distances"].append([distance for _, distance in kept])
+        for key in ("documents", "metadatas", "distances"):
+            if key not in include:
+                results[key] = None
+        return results
+
+    def upsert(
+        self,
+        ids: List[str],
+        documents: Optional[List[str]] = None,
+        metadatas: Optional[List[Dict[str, Any]]] = None,
+        embeddings: Optional[Sequence[Any]] = None,
+    ):
+        self.collection.upsert(
+            ids=ids, documents=documents, metadatas=metadatas, embeddings=embeddings
+        )
+        courses: Dict[str, List[int]] = {}
+        for position, metadata in enumerate(metadatas or []):
+            courses.setdefault(metadata.get("course_title"), []).append(position)
+        with self._lock:
+            if metadatas is None:
+                self._other_writes += 1
+            for course_title, positions in courses.items():
+                self._wrote(course_title)
+                partition = self._partitions.get(course_title)
+                if partition is None:
+                    continue  # Loaded from Chroma by its first scoped query
+                if embeddings is None:
+                    self._drop(course_title)
+                    continue
+                rows = dict(
+                    zip(partition.ids, zip(partition.lessons, partition.vectors))
+                )
+                for position in positions:
+                    rows[ids[position]] = (
+                        metadatas[position].get("lesson_number"),
+                        embeddings[position],
+                    )
+                self._drop(course_title)
+                self._store(
+                    course_title,
+                    _Partition.build(
+                        list(rows),
+                        [lesson for lesson, _ in rows.values()],
+                        [vector for _, vector in rows.values()],
+                    ),
+                )
+
+    def delete(self, ids: Optional[List[str]] = None, where: Optional[Dict] = None):
+        self.collection.delete(ids=ids, where=where)
+        course_title, _ = _scope(where)
+        with self._lock:
+            if ids is None and course_title is not None:
+                self._wrote(course_title)
+                self._drop(course_title)
+                return
+            self._other_writes += 1
+            if ids is None:
+                self.clear()
+            else:
+                deleted = set(ids)
+                for title, partition in list(self._partitions.items()):
+                    if not deleted.isdisjoint(partition.ids):
+                        self._drop(title)
+
+    def clear(self):
+        """Forget all loaded partitions"""
+        self._partitions.clear()
+        self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Get partition counts and load/eviction counters"""
+        with self._lock:
+            return {
+                "partitions": len(self._partitions),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "loads": self.loads,
+                "evictions": self.evictions,
+            }
+
+    def _partition(self, course_title: str) -> _Partition:
+        with self._lock:
+            partition = self._partitions.get(course_title)
+            if partition is not None:
+                self._partitions.move_to_end(course_title)
+                self.hits += 1
+                return partition
+            writes = (self._other_writes, self._course_writes.get(course_title))
+        stored = self.collection.get(
+            where={"course_title": course_title}, include=["embeddings", "metadatas"]
+        )
+        partition = _Partition.build(
+            stored["ids"],
+            [metadata.get("lesson_number") for metadata in stored["metadatas"]],
+            stored["embeddings"] if stored["ids"] else [],
+        )
+        with self._lock:
+            self.loads += 1
+            # Writes during the load may be missing from it; use it this once
+            unchanged = writes == (
+                self._other_writes,
+                self._course_writes.get(course_title),
+            )
+            if unchanged and course_title not in self._partitions:
+                self._store(course_title, partition)
+        return partition
+
+    def _wrote(self, course_title: str):
+        self._course_writes[course_title] = self._course_writes.get(course_title, 0) + 1
+
+    def _store(self, course_title: str, partition: _Partition):
+        if partition.nbytes > self.max_bytes:
+            return
+        self._partitions[course_title] = partition
+        self._bytes += partition.nbytes
+        while self._bytes > self.max_bytes:
+            _, evicted = self._partitions.popitem(last=False)
+            self._bytes -= evicted.nbytes
+            self.evictions += 1
+
+    def _drop(self, course_title: str):
+        partition = self._partitions.pop(course_title, None)
+        if partition is not None:
+            self._bytes -= partition.nbytes
+
+
+class MemmapVectorClient(VectorBackend):
+    """Collections of MemmapCollection files in one directory"""
+
+    MAX_BATCH_SIZE = 10000
+
+    def __init__(
+        self,
+        path: str,
+        ivf_lists: int = 0,
+        ivf_probes: int = 8,
+        quantization: str = "none",
+        oversample: int = 4,
+    ):
+        self.path = path
+        self.ivf_lists = ivf_lists
+        self.ivf_probes = ivf_probes
+        self.quantization = quantization
+        self.oversample = oversample
+        self._collections: Dict[str, MemmapCollection] = {}
+        self._lock = threading.Lock()
+
+    def get_or_create_collection(
+        self, name: str, embedding_function: Any = None
+    ) -> MemmapCollection:
+        with self._lock:
+            collection = self._collections.get(name)
+            if collection is None:
+                collection = MemmapCollection(
+                    os.path.join(self.path, name),
+                    embedding_function,
+                    self.ivf_lists,
+                    self.ivf_probes,
+                    self.quantization,
+                    self.oversample,
+                )
+                self._collections[name] = collection
+            elif embedding_function is not None:
+                collection.embedding_function = embedding_function
+            return collection
+
+    def delete_collection(self, name: str):
+        self.get_or_create_collection(name).reset()
+
+    def get_max_batch_size(self) -> int:
+        return self.MAX_BATCH_SIZE
+
+
+def open_vector_backend(
+    backend: str,
+    path: str,
+    ivf_lists: int = 0,
+    ivf_probes: int = 8,
+    quantization: str = "none",
+    oversample: int = 4,
+):
+    """
+    Open the storage backend selected by config.VECTOR_BACKEND.
+
+    "chroma" is a ChromaDB PersistentClient at path; "memmap" keeps its files
+    in the memmap/ subdirectory of path and alone supports quantization.
+    """
+    if backend == "chroma":
+        if quantization != "none":
+            raise ValueError("Quantized embeddings need the memmap vector backend")
+        import chromadb
+        from chromadb.config import Settings
+
+        return chromadb.PersistentClient(
+            path=path, settings=Settings(anonymized_telemetry=False)
+        )
+    if backend == "memmap":
+        return MemmapVectorClient(
+            os.path.join(path, "memmap"),
+            ivf_lists,
+            ivf_probes,
+            quantization,
+            oversample,
+        )
+    raise ValueError(f"Unknown vector backend: {backend}")
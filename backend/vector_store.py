@@ -1,10 +1,23 @@
-from dataclasses import dataclass
+import json
+import threading
+from dataclasses import dataclass, field
 from typing import Any, Dict, List, Optional
 
-import chromadb
-from chromadb.config import Settings
+from bm25_index import BM25Index, reciprocal_rank_fusion
+from course_resolver import CourseResolver
+from embedding_cache import CachedEmbeddingFunction
+from embedding_service import (
+    EmbeddingServiceClient,
+    LazySentenceTransformerEmbeddingFunction,
+)
 from models import Course, CourseChunk
-from sentence_transformers import SentenceTransformer
+from reranker import CrossEncoderReranker
+from tracing import tracer
+from vector_backends import (
+    PartitionedCollection,
+    VectorCollection,
+    open_vector_backend,
+)
 
 
 @dataclass
@@ -15,20 +28,22 @@ class SearchResults:
     metadata: List[Dict[str, Any]]
     distances: List[float]
     error: Optional[str] = None
+    ids: List[str] = field(default_factory=list)
 
     @classmethod
-    def from_chroma(cls, chroma_results: Dict) -> "SearchResults":
-        """Create SearchResults from ChromaDB query results"""
+    def from_chroma(cls, chroma_results: Dict, row: int = 0) -> "SearchResults":
+        """Create SearchResults from one query of ChromaDB query results"""
         return cls(
             documents=(
-                chroma_results["documents"][0] if chroma_results["documents"] else []
+                chroma_results["documents"][row] if chroma_results["documents"] else []
             ),
             metadata=(
-                chroma_results["metadatas"][0] if chroma_results["metadatas"] else []
+                chroma_results["metadatas"][row] if chroma_results["metadatas"] else []
             ),
             distances=(
-                chroma_results["distances"][0] if chroma_results["distances"] else []
+                chroma_results["distances"][row] if chroma_results["distances"] else []
             ),
+            ids=chroma_results["ids"][row] if chroma_results.get("ids") else [],
         )
 
     @classmethod
@@ -40,24 +55,121 @@ class SearchResults:
         """Check if results are empty"""
         return len(self.documents) == 0
 
+    def select(self, rows: List[int]) -> "SearchResults":
+        """Create results holding only the given rows, in that order"""
+        return SearchResults(
+            documents=[self.documents[row] for row in rows],
+            metadata=[self.metadata[row] for row in rows],
+            distances=[self.distances[row] for row in rows],
+            error=self.error,
+            ids=[self.ids[row] for row in rows] if self.ids else [],
+        )
+
+
+@dataclass
+class _PendingSearch:
+    """One search of a search_many batch, filled in as it is planned"""
+
+    position: int
+    query: str
+    course_name: Optional[str] = None
+    lesson_number: Optional[int] = None
+    limit: Optional[int] = None
+    course_title: Optional[str] = None
+    filter_dict: Optional[Dict] = None
+    pool: int = 0
+    depth: int = 0
+    embedding: Any = None
+
 
 class VectorStore:
-    """Vector storage using ChromaDB for course content and metadata"""
+    """Vector storage for course content and metadata, in ChromaDB by default"""
 
-    def __init__(self, chroma_path: str, embedding_model: str, max_results: int = 5):
+    def __init__(
+        self,
+        chroma_path: str,
+        embedding_model: str,
+        max_results: int = 5,
+        embedding_cache_size: int = 4096,
+        embedding_cache_path: Optional[str] = None,
+        embedding_service_socket: Optional[str] = None,
+        embedding_service_timeout: float = 30.0,
+        embedding_service_retry: float = 30.0,
+        search_mode: str = "vector",
+        hybrid_candidates: int = 20,
+        rrf_k: int = 60,
+        backend: str = "chroma",
+        ivf_lists: int = 0,
+        ivf_probes: int = 8,
+        quantization: str = "none",
+        quantization_oversample: int = 4,
+        partition_cache_bytes: int = 64 * 1024 * 1024,
+        rerank_model: Optional[str] = None,
+        rerank_candidates: int = 20,
+        rerank_batch_size: int = 32,
+        rerank_cache_size: int = 4096,
+        rerank_budget: float = 0.25,
+    ):
         self.max_results = max_results
-        # Initialize ChromaDB client
-        self.client = chromadb.PersistentClient(
-            path=chroma_path, settings=Settings(anonymized_telemetry=False)
+        self.search_mode = search_mode
+        self.hybrid_candidates = hybrid_candidates
+        self.rrf_k = rrf_k
+        self.partition_cache_bytes = partition_cache_bytes
+        self.rerank_candidates = rerank_candidates
+        # Bumped on every write so caches derived from the corpus can invalidate
+        self.corpus_version = 0
+        # ChromaDB client, or the memory-mapped index with the same API
+        self.client = open_vector_backend(
+            backend,
+            chroma_path,
+            ivf_lists,
+            ivf_probes,
+            quantization,
+            quantization_oversample,
         )
 
-        # Set up sentence transformer embedding function
-        self.embedding_function = (
-            chromadb.utils.embedding_functions.SentenceTransformerEmbeddingFunction(
+        # Set up sentence transformer embedding function; the model is loaded
+        # on first embed, or lives in a shared embedding service process
+        if embedding_service_socket:
+            self.embedding_function = EmbeddingServiceClient(
+                embedding_service_socket,
+                model_name=embedding_model,
+                timeout=embedding_service_timeout,
+                retry_after=embedding_service_retry,
+            )
+        else:
+            self.embedding_function = LazySentenceTransformerEmbeddingFunction(
                 model_name=embedding_model
             )
+
+        # Memoize query embeddings so repeated queries skip the model
+        self.query_embedder = CachedEmbeddingFunction(
+            self.embedding_function,
+            max_entries=embedding_cache_size,
+            persist_path=embedding_cache_path,
+            model_name=embedding_model,
         )
 
+        # Optional cross-encoder that re-orders an over-fetched candidate pool
+        self.reranker = None
+        if rerank_model:
+            self.reranker = CrossEncoderReranker(
+                rerank_model,
+                batch_size=rerank_batch_size,
+                max_entries=rerank_cache_size,
+                budget=rerank_budget,
+            )
+
+        # In-memory course title index, rebuilt lazily after catalog changes
+        self.course_resolver = CourseResolver(self.embed_query)
+        self._resolver_stale = True
+        self._resolver_lock = threading.Lock()
+
+        # In-memory BM25 index over course_content, loaded on first hybrid search
+        self.keyword_index = BM25Index()
+        self._keyword_index_loaded = False
+        self._keyword_index_lock = threading.Lock()
+
         # Create collections for different types of data
         self.course_catalog = self._create_collection(
             "course_catalog"
@@ -67,10 +179,27 @@ class VectorStore:
         )  # Actual course material
 
     def _create_collection(self, name: str):
-        """Create or get a ChromaDB collection"""
-        return self.client.get_or_create_collection(
+        """Create or get a collection of the storage backend"""
+        collection = self.client.get_or_create_collection(
             name=name, embedding_function=self.embedding_function
         )
+        # Chroma filters metadata in SQLite per query, so course-scoped searches
+        # go through in-memory course partitions; memmap indexes courses itself
+        if (
+            name == "course_content"
+            and self.partition_cache_bytes > 0
+            and not isinstance(collection, VectorCollection)
+        ):
+            collection = PartitionedCollection(collection, self.partition_cache_bytes)
+        return collection
+
+    def embed_query(self, text: str) -> List[float]:
+        """Embed a query string, reusing cached vectors for repeated queries"""
+        return self.query_embedder([text])[0]
+
+    def embed_documents(self, texts: List[str]) -> List[Any]:
+        """Embed documents in one model call, bypassing the query cache"""
+        return self.embedding_function(texts)
 
     def search(
         self,
@@ -91,41 +220,284 @@ class VectorStore:
         Returns:
             SearchResults object with documents and metadata
         """
-        # Step 1: Resolve course name if provided
-        course_title = None
-        if course_name:
-            course_title = self._resolve_course_name(course_name)
-            if not course_title:
-                return SearchResults.empty(f"No course found matching '{course_name}'")
+        return self.search_many(
+            [
+                {
+                    "query": query,
+                    "course_name": course_name,
+                    "lesson_number": lesson_number,
+                    "limit": limit,
+                }
+            ]
+        )[0]
+
+    def search_many(self, searches: List[Dict[str, Any]]) -> List[SearchResults]:
+        """
+        Run several searches with one embedding pass and batched queries.
 
-        # Step 2: Build filter for content search
-        filter_dict = self._build_filter(course_title, lesson_number)
+        All query texts are embedded in a single model call, and searches that
+        share a filter and result depth go to Chroma as one multi-query call.
+
+        Args:
+            searches: Keyword arguments of search() for each search
 
-        # Step 3: Search course content
-        # Use provided limit or fall back to configured max_results
-        search_limit = limit if limit is not None else self.max_results
+        Returns:
+            SearchResults for each search, in the same order
+        """
+        with tracer.span("vector_store.search", searches=len(searches)):
+            return self._search_many(searches)
+
+    def _search_many(self, searches: List[Dict[str, Any]]) -> List[SearchResults]:
+        results: List[Optional[SearchResults]] = [None] * len(searches)
+        groups: Dict[str, List[_PendingSearch]] = {}
+
+        for position, arguments in enumerate(searches):
+            pending = _PendingSearch(position, **arguments)
+
+            # Step 1: Resolve course name if provided
+            if pending.course_name:
+                with tracer.span("vector_store.resolve_course"):
+                    pending.course_title = self._resolve_course_name(
+                        pending.course_name
+                    )
+                if not pending.course_title:
+                    results[position] = SearchResults.empty(
+                        f"No course found matching '{pending.course_name}'"
+                    )
+                    continue
+
+            # Step 2: Build filter for content search
+            pending.filter_dict = self._build_filter(
+                pending.course_title, pending.lesson_number
+            )
 
+            # Use provided limit or fall back to configured max_results;
+            # re-ranking picks that many from a larger pool of candidates
+            if pending.limit is None:
+                pending.limit = self.max_results
+            pending.pool = pending.limit
+            if self.reranker:
+                pending.pool = max(pending.limit, self.rerank_candidates)
+            pending.depth = pending.pool
+            if self.search_mode == "hybrid":
+                pending.depth = max(pending.pool, self.hybrid_candidates)
+
+            key = json.dumps([pending.filter_dict, pending.depth], sort_keys=True)
+            groups.setdefault(key, []).append(pending)
+
+        # Step 3: Search course content, one Chroma call per filter
+        embeddings: List[Any] = []
+        if groups:
+            queued = [pending for group in groups.values() for pending in group]
+            try:
+                with tracer.span("vector_store.embed", queries=len(queued)):
+                    embeddings = self.query_embedder(
+                        [pending.query for pending in queued]
+                    )
+            except Exception as e:
+                for pending in queued:
+                    results[pending.position] = SearchResults.empty(
+                        f"Search error: {str(e)}"
+                    )
+                groups = {}
+            for pending, embedding in zip(queued, embeddings):
+                pending.embedding = embedding
+
+        for group in groups.values():
+            try:
+                with tracer.span("vector_store.chroma_query", queries=len(group)):
+                    dense = self.course_content.query(
+                        query_embeddings=[pending.embedding for pending in group],
+                        n_results=group[0].depth,
+                        where=group[0].filter_dict,
+                    )
+                if self.search_mode == "hybrid":
+                    with tracer.span("vector_store.hybrid_fusion"):
+                        found = self._hybrid_search(group, dense)
+                else:
+                    found = [
+                        SearchResults.from_chroma(dense, row)
+                        for row in range(len(group))
+                    ]
+            except Exception as e:
+                found = [SearchResults.empty(f"Search error: {str(e)}") for _ in group]
+            for pending, result in zip(group, found):
+                results[pending.position] = result
+
+        if self.reranker:
+            searched = [pending for group in groups.values() for pending in group]
+            with tracer.span("vector_store.rerank", searches=len(searched)):
+                self._rerank(searched, results)
+        return results
+
+    def _rerank(
+        self, searched: List[_PendingSearch], results: List[Optional[SearchResults]]
+    ):
+        """
+        Re-order each search's candidate pool by cross-encoder score.
+
+        All pools are scored in one pass and cut to their limit. Distances of
+        re-ranked results are 1 - score. If the reranker fails or skips the
+        batch to stay within its latency budget, pools are cut in retrieval
+        order instead.
+        """
+        pools = [
+            (pending, results[pending.position])
+            for pending in searched
+            if not results[pending.position].error
+        ]
+        scores = None
         try:
-            results = self.course_content.query(
-                query_texts=[query], n_results=search_limit, where=filter_dict
+            scores = self.reranker.score(
+                [
+                    (pending.query, found.ids, found.documents)
+                    for pending, found in pools
+                ],
+                version=self.corpus_version,
             )
-            return SearchResults.from_chroma(results)
         except Exception as e:
-            return SearchResults.empty(f"Search error: {str(e)}")
+            print(f"Error re-ranking search results: {e}")
+
+        for row, (pending, found) in enumerate(pools):
+            if scores is None:
+                results[pending.position] = found.select(
+                    list(range(min(pending.limit, len(found.ids))))
+                )
+                continue
+            order = sorted(range(len(found.ids)), key=lambda i: -scores[row][i])
+            reranked = found.select(order[: pending.limit])
+            reranked.distances = [1 - scores[row][i] for i in order[: pending.limit]]
+            results[pending.position] = reranked
+
+    def _hybrid_search(
+        self, group: List[_PendingSearch], dense: Dict
+    ) -> List[SearchResults]:
+        """
+        Fuse dense and BM25 rankings with reciprocal-rank fusion.
+
+        Both retrievers return hybrid_candidates hits. Distances of the fused
+        results are 1 - score / best score, so the top hit is at 0.
+        """
+        keyword_index = self._ensure_keyword_index()
+        found = {}
+        rankings = []
+        for row, pending in enumerate(group):
+            keyword = keyword_index.search(
+                pending.query,
+                pending.depth,
+                pending.course_title,
+                pending.lesson_number,
+            )
+            dense_ids = dense["ids"][row]
+            rankings.append(
+                reciprocal_rank_fusion(
+                    [dense_ids, [chunk_id for chunk_id, _ in keyword]], k=self.rrf_k
+                )[: pending.pool]
+            )
+            found.update(
+                zip(
+                    dense_ids,
+                    zip(dense["documents"][row], dense["metadatas"][row]),
+                )
+            )
+
+        missing = list(
+            dict.fromkeys(
+                chunk_id
+                for fused in rankings
+                for chunk_id, _ in fused
+                if chunk_id not in found
+            )
+        )
+        if missing:
+            # Keyword-only hits were not part of the dense results
+            extra = self.course_content.get(
+                ids=missing, include=["documents", "metadatas"]
+            )
+            found.update(zip(extra["ids"], zip(extra["documents"], extra["metadatas"])))
+
+        results = []
+        for fused in rankings:
+            fused = [
+                (chunk_id, score) for chunk_id, score in fused if chunk_id in found
+            ]
+            best = fused[0][1] if fused else 1.0
+            results.append(
+                SearchResults(
+                    documents=[found[chunk_id][0] for chunk_id, _ in fused],
+                    metadata=[found[chunk_id][1] for chunk_id, _ in fused],
+                    distances=[1 - score / best for _, score in fused],
+                    ids=[chunk_id for chunk_id, _ in fused],
+                )
+            )
+        return results
+
+    def _ensure_keyword_index(self) -> BM25Index:
+        """Build the BM25 index from stored chunks the first time it is needed"""
+        with self._keyword_index_lock:
+            if not self._keyword_index_loaded:
+                self.keyword_index.clear()
+                batch_size = self.client.get_max_batch_size()
+                offset = 0
+                while True:
+                    batch = self.course_content.get(
+                        include=["documents", "metadatas"],
+                        limit=batch_size,
+                        offset=offset,
+                    )
+                    if not batch["ids"]:
+                        break
+                    self.keyword_index.add(
+                        batch["ids"], batch["documents"], batch["metadatas"]
+                    )
+                    offset += len(batch["ids"])
+                self._keyword_index_loaded = True
+        return self.keyword_index
+
+    def _update_keyword_index(self, update):
+        """Apply a change to the BM25 index unless it has not been loaded yet"""
+        # Hold the lock so a concurrent load either sees the write or runs first
+        with self._keyword_index_lock:
+            if self._keyword_index_loaded:
+                update(self.keyword_index)
 
     def _resolve_course_name(self, course_name: str) -> Optional[str]:
-        """Use vector search to find best matching course by name"""
+        """Find best matching course title using the in-memory course index"""
         try:
-            results = self.course_catalog.query(query_texts=[course_name], n_results=1)
-
-            if results["documents"][0] and results["metadatas"][0]:
-                # Return the title (which is now the ID)
-                return results["metadatas"][0][0]["title"]
+            self._refresh_course_resolver()
+            return self.course_resolver.resolve(course_name)
         except Exception as e:
             print(f"Error resolving course name: {e}")
 
         return None
 
+    def mentioned_course_titles(self, text: str) -> List[str]:
+        """Course titles a question names, using the in-memory course index"""
+        try:
+            self._refresh_course_resolver()
+            return self.course_resolver.mentioned_titles(text)
+        except Exception as e:
+            print(f"Error finding course names: {e}")
+
+        return []
+
+    def _refresh_course_resolver(self):
+        """Rebuild the course index from the catalog if it changed"""
+        if not self._resolver_stale:
+            return
+
+        with self._resolver_lock:
+            if not self._resolver_stale:
+                return
+            # Clear the flag first so a concurrent catalog write re-marks it
+            self._resolver_stale = False
+            try:
+                results = self.course_catalog.get(include=["embeddings"])
+                self.course_resolver.rebuild(results["ids"], results["embeddings"])
+            except Exception:
+                self._resolver_stale = True
+                raise
+
     def _build_filter(
         self, course_title: Optional[str], lesson_number: Optional[int]
     ) -> Optional[Dict]:
@@ -147,8 +519,14 @@ class VectorStore:
 
         return {"lesson_number": lesson_number}
 
-    def add_course_metadata(self, course: Course):
-        """Add course information to the catalog for semantic search"""
+    def add_course_metadata(self, course: Course, embedding: Optional[Any] = None):
+        """
+        Add course information to the catalog for semantic search.
+
+        Args:
+            course: Course to add
+            embedding: Precomputed title embedding (computed by Chroma if None)
+        """
         import json
 
         course_text = course.title
@@ -164,7 +542,7 @@ class VectorStore:
                 }
             )
 
-        self.course_catalog.add(
+        self.course_catalog.upsert(
             documents=[course_text],
             metadatas=[
                 {
@@ -178,10 +556,21 @@ class VectorStore:
                 }
             ],
             ids=[course.title],
+            embeddings=[embedding] if embedding is not None else None,
         )
+        self._resolver_stale = True
+        self.corpus_version += 1
 
-    def add_course_content(self, chunks: List[CourseChunk]):
-        """Add course content chunks to the vector store"""
+    def add_course_content(
+        self, chunks: List[CourseChunk], embeddings: Optional[List[Any]] = None
+    ):
+        """
+        Add course content chunks to the vector store.
+
+        Args:
+            chunks: Chunks to add
+            embeddings: Precomputed chunk embeddings (computed by Chroma if None)
+        """
         if not chunks:
             return
 
@@ -195,12 +584,56 @@ class VectorStore:
             for chunk in chunks
         ]
         # Use title with chunk index for unique IDs
-        ids = [
-            f"{chunk.course_title.replace(' ', '_')}_{chunk.chunk_index}"
-            for chunk in chunks
-        ]
+        ids = [self.chunk_id(chunk) for chunk in chunks]
+
+        # Insert in slices no larger than Chroma's maximum batch size
+        batch_size = self.client.get_max_batch_size()
+        for start in range(0, len(ids), batch_size):
+            end = start + batch_size
+            self.course_content.upsert(
+                documents=documents[start:end],
+                metadatas=metadatas[start:end],
+                ids=ids[start:end],
+                embeddings=embeddings[start:end] if embeddings is not None else None,
+            )
+        self._update_keyword_index(lambda index: index.add(ids, documents, metadatas))
+        self.corpus_version += 1
+
+    @staticmethod
+    def chunk_id(chunk: CourseChunk) -> str:
+        """Stable ID of a content chunk: course title plus chunk index"""
+        return f"{chunk.course_title.replace(' ', '_')}_{chunk.chunk_index}"
+
+    def get_course_chunk_documents(self, course_title: str) -> Dict[str, str]:
+        """Get stored chunk texts for a course, keyed by chunk ID"""
+        results = self.course_content.get(
+            where={"course_title": course_title}, include=["documents"]
+        )
+        return dict(zip(results["ids"], results["documents"]))
 
-        self.course_content.add(documents=documents, metadatas=metadatas, ids=ids)
+    def delete_chunks(self, chunk_ids: List[str]):
+        """Delete content chunks by ID"""
+        if not chunk_ids:
+            return
+        batch_size = self.client.get_max_batch_size()
+        for start in range(0, len(chunk_ids), batch_size):
+            self.course_content.delete(ids=chunk_ids[start : start + batch_size])
+        self._update_keyword_index(lambda index: index.remove(chunk_ids))
+        self.corpus_version += 1
+
+    def delete_course(self, course_title: str):
+        """Delete a course from the catalog along with all of its chunks"""
+        self.course_content.delete(where={"course_title": course_title})
+        self.course_catalog.delete(ids=[course_title])
+        self._update_keyword_index(lambda index: index.remove_course(course_title))
+        self._resolver_stale = True
+        self.corpus_version += 1
+
+    def partition_stats(self) -> Optional[Dict[str, Any]]:
+        """Get per-course partition statistics, or None when not partitioned"""
+        if isinstance(self.course_content, PartitionedCollection):
+            return self.course_content.stats()
+        return None
 
     def clear_all_data(self):
         """Clear all data from both collections"""
@@ -212,6 +645,9 @@ class VectorStore:
             self.course_content = self._create_collection("course_content")
         except Exception as e:
             print(f"Error clearing data: {e}")
+        self._update_keyword_index(lambda index: index.clear())
+        self._resolver_stale = True
+        self.corpus_version += 1
 
     def get_existing_course_titles(self) -> List[str]:
         """Get all existing course titles from the vector store"""
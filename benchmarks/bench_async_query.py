@@ -0,0 +1,94 @@
+"""
+Concurrent query throughput: blocking RAGSystem.query vs async RAGSystem.aquery.
+
+"blocking" reproduces the old /api/query handler, an async endpoint calling the
+synchronous pipeline on the event loop. "async" awaits RAGSystem.aquery, and
+"stream" consumes every event of RAGSystem.astream_query.
+
+Usage:
+    uv run python benchmarks/bench_async_query.py --requests 64 --concurrency 16
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+
+from config import Config  # noqa: E402
+from rag_system import RAGSystem  # noqa: E402
+from simulated import SimulatedVectorStore, simulated_clients  # noqa: E402
+
+
+def build_rag_system(llm_latency: float, search_latency: float, workers: int):
+    """Build a real RAGSystem wired to simulated LLM and vector store"""
+    SimulatedVectorStore.search_latency = search_latency
+    config = Config(SEARCH_WORKERS=workers, ANSWER_CACHE_ENABLED=False)
+    with patch("rag_system.VectorStore", SimulatedVectorStore):
+        rag = RAGSystem(config)
+    rag.ai_generator.client, rag.ai_generator.async_client = simulated_clients(
+        llm_latency
+    )
+    return rag
+
+
+async def run(mode: str, rag: RAGSystem, requests: int, concurrency: int):
+    """Issue requests with bounded concurrency and collect per-request latency"""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def handler(i: int):
+        # Mirrors the body of the /api/query endpoint
+        if mode == "blocking":
+            return rag.query(f"question {i}")
+        if mode == "stream":
+            return [event async for event in rag.astream_query(f"question {i}")]
+        return await rag.aquery(f"question {i}")
+
+    async def one(i: int):
+        async with semaphore:
+            start = time.perf_counter()
+            await handler(i)
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    elapsed = time.perf_counter() - start
+    return elapsed, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=64)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--llm-latency", type=float, default=0.25)
+    parser.add_argument("--search-latency", type=float, default=0.02)
+    parser.add_argument("--workers", type=int, default=Config.SEARCH_WORKERS)
+    args = parser.parse_args()
+
+    rag = build_rag_system(args.llm_latency, args.search_latency, args.workers)
+    print(
+        f"{args.requests} requests, concurrency {args.concurrency}, "
+        f"LLM {args.llm_latency * 1000:.0f} ms/call, "
+        f"search {args.search_latency * 1000:.0f} ms, {args.workers} search workers"
+    )
+    for mode in ("blocking", "async", "stream"):
+        elapsed, latencies = asyncio.run(
+            run(mode, rag, args.requests, args.concurrency)
+        )
+        latencies.sort()
+        p95 = latencies[int(0.95 * (len(latencies) - 1))]
+        print(
+            f"{mode:>9}: {args.requests / elapsed:7.1f} req/s  "
+            f"p50 {statistics.median(latencies) * 1000:7.0f} ms  "
+            f"p95 {p95 * 1000:7.0f} ms  total {elapsed:6.2f} s"
+        )
+    rag.executor.shutdown()
+
+
+if __name__ == "__main__":
+    main()
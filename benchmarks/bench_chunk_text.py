@@ -0,0 +1,122 @@
+"""
+Chunker throughput: the original chunk_text loop vs the current chunker.
+
+Synthetic transcripts of increasing size are built from the sentences of the
+bundled docs/ scripts, then chunked by both implementations. Output is checked
+to be identical before timings are reported.
+
+Usage:
+    uv run python benchmarks/bench_chunk_text.py --sizes 1 4 16
+"""
+
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+
+from config import Config  # noqa: E402
+from document_processor import DocumentProcessor  # noqa: E402
+
+DOCS = os.path.join(os.path.dirname(__file__), "..", "docs")
+
+
+def legacy_chunk_text(chunk_size: int, chunk_overlap: int, text: str):
+    """The chunk_text implementation this benchmark replaces"""
+    text = re.sub(r"\s+", " ", text.strip())
+    sentence_endings = re.compile(
+        r"(?<!\w\.\w.)(?<![A-Z][a-z]\.)(?<=\.|\!|\?)\s+(?=[A-Z])"
+    )
+    sentences = sentence_endings.split(text)
+    sentences = [s.strip() for s in sentences if s.strip()]
+
+    chunks = []
+    i = 0
+    while i < len(sentences):
+        current_chunk = []
+        current_size = 0
+        for j in range(i, len(sentences)):
+            sentence = sentences[j]
+            space_size = 1 if current_chunk else 0
+            total_addition = len(sentence) + space_size
+            if current_size + total_addition > chunk_size and current_chunk:
+                break
+            current_chunk.append(sentence)
+            current_size += total_addition
+
+        if current_chunk:
+            chunks.append(" ".join(current_chunk))
+            if chunk_overlap > 0:
+                overlap_size = 0
+                overlap_sentences = 0
+                for k in range(len(current_chunk) - 1, -1, -1):
+                    sentence_len = len(current_chunk[k]) + (
+                        1 if k < len(current_chunk) - 1 else 0
+                    )
+                    if overlap_size + sentence_len <= chunk_overlap:
+                        overlap_size += sentence_len
+                        overlap_sentences += 1
+                    else:
+                        break
+                next_start = i + len(current_chunk) - overlap_sentences
+                i = max(next_start, i + 1)
+            else:
+                i += len(current_chunk)
+        else:
+            i += 1
+
+    return chunks
+
+
+def synthetic_text(megabytes: float, seed: int) -> str:
+    """Shuffle docs/ sentences into a transcript of roughly the given size"""
+    sentences = []
+    for name in sorted(os.listdir(DOCS)):
+        with open(os.path.join(DOCS, name), encoding="utf-8") as file:
+            sentences += re.findall(r"[^.!?]+[.!?]", file.read())
+
+    rng = random.Random(seed)
+    target = int(megabytes * 1024 * 1024)
+    parts, size = [], 0
+    while size < target:
+        sentence = rng.choice(sentences).strip()
+        parts.append(sentence)
+        size += len(sentence) + 1
+    return " ".join(parts)
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=float, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--chunk-size", type=int, default=Config.CHUNK_SIZE)
+    parser.add_argument("--chunk-overlap", type=int, default=Config.CHUNK_OVERLAP)
+    args = parser.parse_args()
+
+    processor = DocumentProcessor(args.chunk_size, args.chunk_overlap)
+    print(f"chunk_size {args.chunk_size}, chunk_overlap {args.chunk_overlap}")
+    for megabytes in args.sizes:
+        text = synthetic_text(megabytes, seed=0)
+        legacy, legacy_s = timed(
+            lambda: legacy_chunk_text(args.chunk_size, args.chunk_overlap, text)
+        )
+        current, current_s = timed(lambda: processor.chunk_text(text))
+        assert current == legacy, "chunk_text output differs from the original"
+        print(
+            f"{megabytes:6.1f} MB: {len(current):7d} chunks  "
+            f"original {legacy_s:6.2f} s ({megabytes / legacy_s:5.1f} MB/s)  "
+            f"current {current_s:6.2f} s ({megabytes / current_s:5.1f} MB/s)  "
+            f"x{legacy_s / current_s:.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""
+Cold start: eager vs lazy vs shared-service embedding model loading.
+
+Each run starts a fresh interpreter that imports the backend, constructs a
+RAGSystem (what importing app.py does) and embeds one query. "eager" loads the
+SentenceTransformer up front like the old VectorStore constructor, "lazy" defers
+it to the first embed, and "service" sends embeddings to one shared
+embedding_service.py process, started once before the runs.
+
+Usage:
+    uv run python benchmarks/bench_cold_start.py --runs 3
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "backend"))
+
+sys.path.insert(0, BACKEND)
+
+from config import Config  # noqa: E402
+
+PROBE = """
+import json, resource, sys, time
+sys.path.insert(0, {backend!r})
+start = time.perf_counter()
+{preload}
+from config import Config
+from rag_system import RAGSystem
+imported = time.perf_counter()
+config = Config(
+    EMBEDDING_MODEL={model!r},
+    CHROMA_PATH={chroma_path!r},
+    INGEST_MANIFEST_PATH="",
+    EMBEDDING_SERVICE_SOCKET={socket_path!r},
+)
+rag = RAGSystem(config)
+ready = time.perf_counter()
+rag.vector_store.embed_query("How do I build an MCP server?")
+embedded = time.perf_counter()
+print(json.dumps({{
+    "import_s": imported - start,
+    "ready_s": ready - start,
+    "first_embed_s": embedded - ready,
+    "rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+}}))
+"""
+
+EAGER_PRELOAD = """
+from chromadb.utils.embedding_functions import SentenceTransformerEmbeddingFunction
+SentenceTransformerEmbeddingFunction(model_name={model!r})
+"""
+
+
+def probe(mode: str, model: str, workdir: str, socket_path: str) -> dict:
+    """Measure one cold start in a fresh interpreter"""
+    code = PROBE.format(
+        backend=BACKEND,
+        model=model,
+        preload=EAGER_PRELOAD.format(model=model) if mode == "eager" else "",
+        chroma_path=tempfile.mkdtemp(dir=workdir),
+        socket_path=socket_path if mode == "service" else "",
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, cwd=BACKEND
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def start_service(model: str, socket_path: str) -> subprocess.Popen:
+    """Start embedding_service.py and wait until it accepts connections"""
+    service = subprocess.Popen(
+        [
+            sys.executable,
+            os.path.join(BACKEND, "embedding_service.py"),
+            "--socket",
+            socket_path,
+            "--model",
+            model,
+        ],
+        cwd=BACKEND,
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+    for line in service.stdout:
+        if "listening" in line:
+            return service
+    raise RuntimeError("Embedding service exited before listening")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--model", default=Config.EMBEDDING_MODEL)
+    parser.add_argument("--modes", nargs="+", default=["eager", "lazy", "service"])
+    args = parser.parse_args()
+
+    print(f"{args.runs} cold starts per mode, model {args.model}")
+    with tempfile.TemporaryDirectory() as workdir:
+        socket_path = os.path.join(workdir, "embeddings.sock")
+        service = None
+        if "service" in args.modes:
+            started = time.perf_counter()
+            service = start_service(args.model, socket_path)
+            print(f"embedding service up in {time.perf_counter() - started:.2f} s")
+
+        try:
+            for mode in args.modes:
+                try:
+                    runs = [
+                        probe(mode, args.model, workdir, socket_path)
+                        for _ in range(args.runs)
+                    ]
+                except RuntimeError as e:
+                    print(f"{mode:>8}: failed: {e}")
+                    continue
+
+                def median(key):
+                    return statistics.median(run[key] for run in runs)
+
+                print(
+                    f"{mode:>8}: import {median('import_s'):6.2f} s  "
+                    f"ready {median('ready_s'):6.2f} s  "
+                    f"first embed {median('first_embed_s'):6.2f} s  "
+                    f"peak RSS {median('rss_mb'):7.0f} MB"
+                )
+        finally:
+            if service:
+                service.terminate()
+                service.wait()
+
+
+if __name__ == "__main__":
+    main()
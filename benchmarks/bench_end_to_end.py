@@ -0,0 +1,275 @@
+"""
+End-to-end query latency and throughput against a local fake Anthropic API.
+
+fake_anthropic.py serves the Messages API on localhost and the real anthropic
+SDK clients of AIGenerator talk to it over HTTP, so every request makes a
+tool_use call, a search and an answering call. Modes:
+
+    query        RAGSystem.query on --concurrency threads
+    aquery       RAGSystem.aquery with --concurrency requests in flight
+    stream       RAGSystem.astream_query, also timing the first token
+    http         POST /api/query to the FastAPI app served by uvicorn
+    http-stream  POST /api/query/stream to the FastAPI app, timing the first token
+
+Retrieval uses SimulatedVectorStore by default; --store docs indexes docs/
+into a temporary Chroma directory instead, embedded by the configured model or
+with --embedder hash by the deterministic HashingEmbeddingModel.
+
+Usage:
+    uv run python benchmarks/bench_end_to_end.py --concurrency 1 8 32 --output e2e.json
+"""
+
+import argparse
+import asyncio
+import os
+import socket
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+BACKEND = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "backend"))
+
+sys.path.insert(0, BACKEND)
+
+import httpx  # noqa: E402
+import uvicorn  # noqa: E402
+from config import Config  # noqa: E402
+from config import config as app_config  # noqa: E402
+from fake_anthropic import FakeAnthropicServer  # noqa: E402
+from rag_system import RAGSystem  # noqa: E402
+from report import latency_summary, peak_rss_mb, write_report  # noqa: E402
+from simulated import SimulatedVectorStore, install_hashing_model  # noqa: E402
+
+DOCS = os.path.join(os.path.dirname(__file__), "..", "docs")
+MODES = ("query", "aquery", "stream", "http", "http-stream")
+
+
+def question(i: int) -> str:
+    return f"What does lesson {i % 8} say about topic {i}?"
+
+
+def build_rag_system(args, workdir: str) -> RAGSystem:
+    """Build a real RAGSystem on a simulated or docs/ backed vector store"""
+    config = Config(
+        ANTHROPIC_API_KEY="benchmark",
+        CHROMA_PATH=os.path.join(workdir, "chroma"),
+        INGEST_MANIFEST_PATH="",
+        EMBEDDING_CACHE_SIZE=0,
+        ANSWER_CACHE_ENABLED=False,
+        SEARCH_WORKERS=args.search_workers,
+    )
+    if args.store == "simulated":
+        SimulatedVectorStore.search_latency = args.search_latency
+        with patch("rag_system.VectorStore", SimulatedVectorStore):
+            return RAGSystem(config)
+
+    if args.embedder == "hash":
+        install_hashing_model()
+    rag = RAGSystem(config)
+    courses, chunks = rag.add_course_folder(DOCS)
+    print(f"Indexed {courses} courses, {chunks} chunks from docs/")
+    return rag
+
+
+def load_app(rag: RAGSystem):
+    """Import the FastAPI app and point its endpoints at our RAGSystem"""
+    app_config.ANSWER_CACHE_ENABLED = False
+    cwd = os.getcwd()
+    os.chdir(BACKEND)  # app.py mounts ../frontend relative to the working dir
+    try:
+        with patch("rag_system.VectorStore", SimulatedVectorStore):
+            import app
+    finally:
+        os.chdir(cwd)
+    app.rag_system = rag
+    return app.app
+
+
+def run_threads(rag: RAGSystem, requests: int, concurrency: int):
+    """Blocking RAGSystem.query calls on a thread pool"""
+
+    def one(i: int):
+        start = time.perf_counter()
+        try:
+            rag.query(question(i))
+        except Exception:
+            return None
+        return time.perf_counter() - start
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        start = time.perf_counter()
+        timings = list(pool.map(one, range(requests)))
+        elapsed = time.perf_counter() - start
+    latencies = [timing for timing in timings if timing is not None]
+    return elapsed, latencies, [], requests - len(latencies)
+
+
+async def run_async(request, requests: int, concurrency: int):
+    """Issue async requests with bounded concurrency; request returns TTFT"""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, ttfts = [], []
+    errors = 0
+
+    async def one(i: int):
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                first = await request(i)
+            except Exception:
+                errors += 1
+                return
+            latencies.append(time.perf_counter() - start)
+            if first is not None:
+                ttfts.append(first - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    return time.perf_counter() - start, latencies, ttfts, errors
+
+
+def async_requests(mode: str, rag: RAGSystem, client: httpx.AsyncClient):
+    """Request coroutine for an async mode, returning first token time"""
+
+    async def aquery(i: int):
+        await rag.aquery(question(i))
+
+    async def stream(i: int):
+        first = None
+        async for event in rag.astream_query(question(i)):
+            if first is None and event["type"] == "token":
+                first = time.perf_counter()
+        return first
+
+    async def http(i: int):
+        response = await client.post("/api/query", json={"query": question(i)})
+        response.raise_for_status()
+
+    async def http_stream(i: int):
+        first = None
+        async with client.stream(
+            "POST", "/api/query/stream", json={"query": question(i)}
+        ) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if line == "event: error":
+                    raise RuntimeError("stream reported an error")
+                if first is None and line == "event: token":
+                    first = time.perf_counter()
+        return first
+
+    return {
+        "aquery": aquery,
+        "stream": stream,
+        "http": http,
+        "http-stream": http_stream,
+    }[mode]
+
+
+async def run_mode(mode, rag, client, requests, concurrency):
+    if mode == "query":
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, run_threads, rag, requests, concurrency)
+    return await run_async(async_requests(mode, rag, client), requests, concurrency)
+
+
+async def benchmark(args, rag: RAGSystem, server: FakeAnthropicServer):
+    # Serve the app on this event loop, so it shares the async Anthropic
+    # client with the aquery and stream modes; startup indexing stays off
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    app_server = uvicorn.Server(
+        uvicorn.Config(load_app(rag), lifespan="off", log_level="warning")
+    )
+    serving = asyncio.create_task(app_server.serve(sockets=[sock]))
+    while not app_server.started:
+        await asyncio.sleep(0.01)
+
+    host, port = sock.getsockname()
+    results = []
+    async with httpx.AsyncClient(
+        base_url=f"http://{host}:{port}",
+        timeout=None,
+        limits=httpx.Limits(max_connections=None),
+    ) as client:
+        for mode in args.modes:
+            for concurrency in args.concurrency:
+                await run_mode(mode, rag, client, args.warmup, concurrency)
+                calls = server.calls
+                elapsed, latencies, ttfts, errors = await run_mode(
+                    mode, rag, client, args.requests, concurrency
+                )
+                result = {
+                    "name": f"{mode} c={concurrency}",
+                    "mode": mode,
+                    "concurrency": concurrency,
+                    "requests": args.requests,
+                    "errors": errors,
+                    "seconds": elapsed,
+                    "throughput_per_s": len(latencies) / elapsed,
+                    "latency_ms": latency_summary(latencies),
+                    "ttft_ms": latency_summary(ttfts) if ttfts else None,
+                    "llm_calls_per_request": (server.calls - calls) / args.requests,
+                    "peak_rss_mb": peak_rss_mb(),
+                }
+                results.append(result)
+                latency = result["latency_ms"]
+                ttft = f"  ttft p50 {result['ttft_ms']['p50']:6.0f} ms" if ttfts else ""
+                print(
+                    f"{result['name']:>16}: {result['throughput_per_s']:7.1f} req/s  "
+                    f"p50 {latency['p50']:6.0f} ms  p95 {latency['p95']:6.0f} ms  "
+                    f"p99 {latency['p99']:6.0f} ms  errors {errors}{ttft}"
+                )
+
+    app_server.should_exit = True
+    await serving
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--warmup", type=int, default=4)
+    parser.add_argument("--llm-latency", type=float, default=0.2)
+    parser.add_argument("--token-delay", type=float, default=0.002)
+    parser.add_argument("--answer-words", type=int, default=60)
+    parser.add_argument("--store", choices=["simulated", "docs"], default="simulated")
+    parser.add_argument("--embedder", choices=["model", "hash"], default="model")
+    parser.add_argument("--search-latency", type=float, default=0.02)
+    parser.add_argument("--search-workers", type=int, default=Config.SEARCH_WORKERS)
+    parser.add_argument("--output", help="Write the report to this JSON file")
+    args = parser.parse_args()
+
+    with (
+        FakeAnthropicServer(
+            args.llm_latency, args.token_delay, args.answer_words
+        ) as server,
+        tempfile.TemporaryDirectory() as workdir,
+    ):
+        # Both SDK clients read the base URL when AIGenerator creates them
+        os.environ["ANTHROPIC_BASE_URL"] = server.url
+        rag = build_rag_system(args, workdir)
+        print(
+            f"{args.requests} requests per run, fake API at {server.url} "
+            f"({args.llm_latency * 1000:.0f} ms to first token, "
+            f"{args.token_delay * 1000:.1f} ms per token), {args.store} store"
+        )
+        results = asyncio.run(benchmark(args, rag, server))
+        if args.store == "docs":
+            rag.shutdown()
+        else:
+            rag.executor.shutdown()
+            rag.tool_manager.shutdown()
+
+    print(f"Peak RSS {peak_rss_mb():.0f} MB")
+    if args.output:
+        write_report(args.output, "end_to_end", vars(args), results)
+        print(f"Report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
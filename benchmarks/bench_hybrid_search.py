@@ -0,0 +1,130 @@
+"""
+Retrieval quality and latency: vector vs BM25 vs hybrid search on docs/.
+
+Queries are generated from the indexed chunks themselves: "identifier" queries
+ask about a code-like token (snake_case, dotted or camelCase names, versions)
+found in at most three chunks, "sentence" queries reuse a sentence of a chunk.
+A query counts as a hit when a chunk containing the token or sentence is among
+the top --k results.
+
+Usage:
+    uv run python benchmarks/bench_hybrid_search.py --queries 100 --k 5
+"""
+
+import argparse
+import os
+import random
+import re
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+
+from config import Config  # noqa: E402
+from rag_system import RAGSystem  # noqa: E402
+
+DOCS = os.path.join(os.path.dirname(__file__), "..", "docs")
+
+IDENTIFIER_RE = re.compile(
+    r"\b(?:[A-Za-z]+_[A-Za-z0-9_]+|[A-Za-z]+\.[A-Za-z_][A-Za-z0-9_.]*"
+    r"|[a-z]+[A-Z][A-Za-z0-9]*|[A-Za-z]+-?[0-9][A-Za-z0-9.\-]*)\b"
+)
+SENTENCE_RE = re.compile(r"[^.!?]+[.!?]")
+
+
+def build_queries(chunks, count: int, seed: int):
+    """Sample (kind, query, substring) triples from the chunk texts"""
+    rng = random.Random(seed)
+
+    identifiers = {}
+    for text in chunks.values():
+        for token in set(IDENTIFIER_RE.findall(text)):
+            identifiers[token] = identifiers.get(token, 0) + 1
+    rare = sorted(token for token, seen in identifiers.items() if seen <= 3)
+
+    sentences = sorted(
+        {
+            sentence.strip()
+            for text in chunks.values()
+            for sentence in SENTENCE_RE.findall(text)
+            if 8 <= len(sentence.split()) <= 20
+        }
+    )
+
+    queries = [
+        ("identifier", f"What is {token} used for?", token)
+        for token in rng.sample(rare, min(count, len(rare)))
+    ]
+    queries += [
+        ("sentence", sentence, sentence)
+        for sentence in rng.sample(sentences, min(count, len(sentences)))
+    ]
+    return queries
+
+
+def run_mode(mode, vector_store, queries, chunks, k):
+    """Return (hit rate per query kind, latencies) for one retrieval mode"""
+    hits = {}
+    latencies = []
+    for kind, query, needle in queries:
+        start = time.perf_counter()
+        if mode == "bm25":
+            ids = [
+                chunk_id for chunk_id, _ in vector_store.keyword_index.search(query, k)
+            ]
+        else:
+            vector_store.search_mode = mode
+            ids = vector_store.search(query, limit=k).ids
+        latencies.append(time.perf_counter() - start)
+        hits.setdefault(kind, []).append(any(needle in chunks[i] for i in ids))
+    rates = {kind: sum(found) / len(found) for kind, found in hits.items()}
+    return rates, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=Config.MAX_RESULTS)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        config = Config(
+            CHROMA_PATH=workdir,
+            INGEST_MANIFEST_PATH="",
+            EMBEDDING_CACHE_SIZE=0,
+            ANSWER_CACHE_ENABLED=False,
+        )
+        rag = RAGSystem(config)
+        rag.add_course_folder(DOCS)
+        vector_store = rag.vector_store
+
+        stored = vector_store.course_content.get(include=["documents"])
+        chunks = dict(zip(stored["ids"], stored["documents"]))
+        queries = build_queries(chunks, args.queries, args.seed)
+
+        start = time.perf_counter()
+        vector_store._ensure_keyword_index()
+        print(
+            f"{len(chunks)} chunks, BM25 index built in "
+            f"{(time.perf_counter() - start) * 1000:.0f} ms; "
+            f"{len(queries)} queries, hit rate @{args.k}"
+        )
+
+        for mode in ("vector", "bm25", "hybrid"):
+            rates, latencies = run_mode(mode, vector_store, queries, chunks, args.k)
+            latencies.sort()
+            p95 = latencies[int(0.95 * (len(latencies) - 1))]
+            print(
+                f"{mode:>7}: identifier {rates.get('identifier', 0):6.1%}  "
+                f"sentence {rates.get('sentence', 0):6.1%}  "
+                f"p50 {statistics.median(latencies) * 1000:6.2f} ms  "
+                f"p95 {p95 * 1000:6.2f} ms"
+            )
+        rag.shutdown()
+
+
+if __name__ == "__main__":
+    main()
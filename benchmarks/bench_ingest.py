@@ -0,0 +1,182 @@
+"""
+Ingest throughput, search latency and peak memory over synthetic corpora.
+
+For each --documents count a fresh interpreter writes that many synthetic
+course documents (--lessons lessons of about --words words each, built from
+sentences of the docs/ scripts), ingests them with RAGSystem.add_course_folder
+into an empty --backend store, ingests again to time the unchanged-file skip,
+and times --queries searches against the result. Peak RSS covers the process
+and its parse workers.
+
+Embeddings come from the deterministic HashingEmbeddingModel by default, so
+runs measure parsing, chunking, batching and vector store writes reproducibly;
+--embedder model uses the configured SentenceTransformer instead.
+
+Usage:
+    uv run python benchmarks/bench_ingest.py --documents 10 100 --output ingest.json
+"""
+
+import argparse
+import json
+import os
+import random
+import re
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+
+from config import Config  # noqa: E402
+from report import latency_summary, peak_rss_mb, write_report  # noqa: E402
+
+DOCS = os.path.join(os.path.dirname(__file__), "..", "docs")
+
+
+def docs_sentences():
+    sentences = []
+    for name in sorted(os.listdir(DOCS)):
+        with open(os.path.join(DOCS, name), encoding="utf-8") as file:
+            sentences += [s.strip() for s in re.findall(r"[^.!?]+[.!?]", file.read())]
+    return [sentence for sentence in sentences if len(sentence.split()) >= 4]
+
+
+def write_corpus(folder: str, documents: int, lessons: int, words: int, seed: int):
+    """Write synthetic course documents in the expected course format"""
+    rng = random.Random(seed)
+    sentences = docs_sentences()
+    for number in range(documents):
+        lines = [
+            f"Course Title: Synthetic Course {number:04d}",
+            f"Course Link: https://example.com/courses/{number}",
+            f"Course Instructor: Instructor {number % 17}",
+            "",
+        ]
+        for lesson in range(lessons):
+            lines.append(f"Lesson {lesson}: Topic {rng.randrange(1000)}")
+            lines.append(f"Lesson Link: https://example.com/courses/{number}/{lesson}")
+            text, count = [], 0
+            while count < words:
+                sentence = rng.choice(sentences)
+                text.append(sentence)
+                count += len(sentence.split())
+            lines.append(" ".join(text))
+        path = os.path.join(folder, f"course_{number:04d}.txt")
+        with open(path, "w", encoding="utf-8") as file:
+            file.write("\n".join(lines) + "\n")
+    return sentences
+
+
+def run_one(args, documents: int):
+    """Ingest one corpus size in this process and return its result"""
+    if args.embedder == "hash":
+        from simulated import install_hashing_model
+
+        install_hashing_model()
+    from rag_system import RAGSystem
+
+    with tempfile.TemporaryDirectory() as workdir:
+        folder = os.path.join(workdir, "docs")
+        os.makedirs(folder)
+        sentences = write_corpus(folder, documents, args.lessons, args.words, 0)
+        corpus_mb = sum(
+            os.path.getsize(os.path.join(folder, name)) for name in os.listdir(folder)
+        ) / (1024 * 1024)
+
+        config = Config(
+            ANTHROPIC_API_KEY="benchmark",
+            CHROMA_PATH=os.path.join(workdir, "chroma"),
+            INGEST_MANIFEST_PATH=os.path.join(workdir, "manifest.json"),
+            INGEST_WORKERS=args.workers,
+            VECTOR_BACKEND=args.backend,
+            EMBEDDING_CACHE_SIZE=0,
+            ANSWER_CACHE_ENABLED=False,
+        )
+        rag = RAGSystem(config)
+
+        start = time.perf_counter()
+        courses, chunks = rag.add_course_folder(folder)
+        ingest_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        rag.add_course_folder(folder)
+        reingest_s = time.perf_counter() - start
+
+        rng = random.Random(1)
+        latencies = []
+        for i in range(args.queries):
+            course = f"Synthetic Course {rng.randrange(documents):04d}"
+            start = time.perf_counter()
+            rag.vector_store.search(
+                rng.choice(sentences), course_name=course if i % 2 else None
+            )
+            latencies.append(time.perf_counter() - start)
+        rag.shutdown()
+
+    return {
+        "name": f"ingest {documents} docs",
+        "documents": documents,
+        "courses": courses,
+        "chunks": chunks,
+        "corpus_mb": corpus_mb,
+        "ingest_seconds": ingest_s,
+        "throughput_per_s": documents / ingest_s,
+        "chunks_per_s": chunks / ingest_s,
+        "reingest_seconds": reingest_s,
+        "latency_ms": latency_summary(latencies),
+        "peak_rss_mb": peak_rss_mb(include_children=True),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--documents", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--lessons", type=int, default=5)
+    parser.add_argument("--words", type=int, default=400)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--workers", type=int, default=Config.INGEST_WORKERS)
+    parser.add_argument("--embedder", choices=["hash", "model"], default="hash")
+    parser.add_argument("--backend", choices=["chroma", "memmap"], default="chroma")
+    parser.add_argument("--output", help="Write the report to this JSON file")
+    parser.add_argument("--child", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child is not None:
+        # The result is the last line; ingest progress is printed before it
+        print(json.dumps(run_one(args, args.child)))
+        return
+
+    print(
+        f"{args.lessons} lessons of ~{args.words} words per document, "
+        f"{args.workers} parse workers, {args.embedder} embeddings, "
+        f"{args.backend} backend"
+    )
+    results = []
+    for documents in args.documents:
+        # A fresh interpreter per corpus keeps peak RSS separate
+        command = [sys.executable, __file__, *sys.argv[1:], "--child", str(documents)]
+        output = subprocess.run(command, capture_output=True, text=True)
+        if output.returncode:
+            sys.exit(f"{documents} documents failed:\n{output.stderr}")
+        result = json.loads(output.stdout.strip().splitlines()[-1])
+        results.append(result)
+        latency = result["latency_ms"]
+        print(
+            f"{documents:5d} docs ({result['corpus_mb']:6.1f} MB, "
+            f"{result['chunks']:6d} chunks): ingest {result['ingest_seconds']:7.2f} s "
+            f"({result['throughput_per_s']:6.1f} docs/s, "
+            f"{result['chunks_per_s']:6.0f} chunks/s)  "
+            f"re-ingest {result['reingest_seconds']:5.2f} s  "
+            f"search p50 {latency['p50']:5.1f} ms p95 {latency['p95']:5.1f} ms "
+            f"p99 {latency['p99']:5.1f} ms  peak RSS {result['peak_rss_mb']:5.0f} MB"
+        )
+
+    if args.output:
+        parameters = {key: value for key, value in vars(args).items() if key != "child"}
+        write_report(args.output, "ingest", parameters, results)
+        print(f"Report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
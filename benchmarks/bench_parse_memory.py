@@ -0,0 +1,84 @@
+"""
+Parser peak memory: whole-file reads vs streaming lesson by lesson.
+
+A synthetic course document with --lessons lessons of --lesson-kb kilobytes
+each is parsed with iter_course_document, dropping each lesson's chunks once
+seen, as an indexer that writes lessons out as they come would. "whole file"
+is the peak of just reading the file and splitting it into lines, the first
+step of the original parser, so the real saving is larger than shown.
+
+Usage:
+    uv run python benchmarks/bench_parse_memory.py --lessons 10 100 --lesson-kb 64
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from bench_chunk_text import synthetic_text  # noqa: E402
+from config import Config  # noqa: E402
+from document_processor import DocumentProcessor  # noqa: E402
+
+
+def write_document(path: str, lessons: int, lesson_kb: int):
+    """Write a course document in the docs/ format"""
+    with open(path, "w", encoding="utf-8") as file:
+        file.write("Course Title: Synthetic Course\n")
+        file.write("Course Link: https://example.com/course\n")
+        file.write("Course Instructor: Benchmark\n\n")
+        for number in range(lessons):
+            file.write(f"Lesson {number}: Part {number}\n")
+            file.write(f"Lesson Link: https://example.com/lesson/{number}\n")
+            file.write(synthetic_text(lesson_kb / 1024, seed=number) + "\n")
+
+
+def measure(func):
+    """Return (result, peak traced MB, seconds)"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1] / 1024 / 1024
+    tracemalloc.stop()
+    return result, peak, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--lessons", type=int, nargs="+", default=[10, 100])
+    parser.add_argument("--lesson-kb", type=int, default=64)
+    args = parser.parse_args()
+
+    processor = DocumentProcessor(Config.CHUNK_SIZE, Config.CHUNK_OVERLAP)
+
+    def whole_file(path):
+        return len(processor.read_file(path).strip().split("\n"))
+
+    def streamed(path):
+        _, lessons = processor.iter_course_document(path)
+        return sum(len(chunks) for chunks in lessons)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        for lessons in args.lessons:
+            path = os.path.join(workdir, f"course_{lessons}.txt")
+            write_document(path, lessons, args.lesson_kb)
+            size = os.path.getsize(path) / 1024 / 1024
+
+            _, whole_peak, _ = measure(lambda: whole_file(path))
+            chunks, stream_peak, stream_s = measure(lambda: streamed(path))
+            print(
+                f"{lessons:5d} lessons ({size:6.1f} MB): {chunks:7d} chunks  "
+                f"whole file peak {whole_peak:7.1f} MB  "
+                f"streamed peak {stream_peak:6.1f} MB  "
+                f"({stream_s:.2f} s)"
+            )
+
+
+if __name__ == "__main__":
+    main()
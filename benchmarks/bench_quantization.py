@@ -0,0 +1,192 @@
+"""
+Recall and memory of int8 / binary quantized embeddings against float32.
+
+Builds one memmap collection per quantization from --vectors synthetic chunks
+(two to four sentences of the docs/ scripts each) and measures recall@k
+against exact float32 search, per-query latency and the peak RSS of a fresh
+process that only opens the collection and searches it. Quantized searches
+scan the codes and re-rank the --oversample * k best rows with float32
+vectors, which are paged in from disk for those rows only.
+
+Embeddings come from the deterministic HashingEmbeddingModel by default;
+--embedder model uses the configured SentenceTransformer instead.
+
+Usage:
+    uv run python benchmarks/bench_quantization.py --vectors 100000 --output quant.json
+"""
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+
+import numpy as np  # noqa: E402
+from config import Config  # noqa: E402
+from report import latency_summary, peak_rss_mb, write_report  # noqa: E402
+from vector_backends import MemmapCollection  # noqa: E402
+
+DOCS = os.path.join(os.path.dirname(__file__), "..", "docs")
+
+
+def docs_sentences():
+    from bench_ingest import docs_sentences
+
+    return docs_sentences()
+
+
+def embedder(name: str):
+    if name == "hash":
+        from simulated import HashingEmbeddingModel
+
+        return HashingEmbeddingModel().encode
+    from sentence_transformers import SentenceTransformer
+
+    return SentenceTransformer(Config.EMBEDDING_MODEL).encode
+
+
+def build(args, workdir: str):
+    """Embed the corpus and queries, write collections and exact results"""
+    rng = random.Random(0)
+    sentences = docs_sentences()
+    texts = [
+        " ".join(rng.choice(sentences) for _ in range(rng.randint(2, 4)))
+        for _ in range(args.vectors)
+    ]
+    queries = [rng.choice(sentences) for _ in range(args.queries)]
+    encode = embedder(args.embedder)
+
+    start = time.perf_counter()
+    vectors = np.asarray(encode(texts), dtype=np.float32)
+    query_vectors = np.asarray(encode(queries), dtype=np.float32)
+    print(f"Embedded {len(texts)} chunks in {time.perf_counter() - start:.1f} s")
+
+    distances = (vectors * vectors).sum(axis=1)[:, None] - 2 * vectors @ query_vectors.T
+    truth = np.argsort(distances, axis=0, kind="stable")[: args.k].T
+    np.save(os.path.join(workdir, "queries.npy"), query_vectors)
+    np.save(os.path.join(workdir, "truth.npy"), truth)
+
+    ids = [str(i) for i in range(len(texts))]
+    for quantization in args.quantization:
+        collection = MemmapCollection(
+            os.path.join(workdir, quantization), quantization=quantization
+        )
+        for start in range(0, len(ids), 10000):
+            end = start + 10000
+            collection.upsert(
+                ids=ids[start:end],
+                embeddings=vectors[start:end],
+                documents=texts[start:end],
+                metadatas=[{} for _ in ids[start:end]],
+            )
+
+
+def file_mb(folder: str, name: str) -> float:
+    path = os.path.join(folder, f"{name}-0")
+    return os.path.getsize(path) / (1024 * 1024) if os.path.exists(path) else 0.0
+
+
+def run_one(args, quantization: str, oversample: int):
+    """Search one collection in this fresh process and return its result"""
+    folder = os.path.join(args.workdir, quantization)
+    queries = np.load(os.path.join(args.workdir, "queries.npy"))
+    truth = np.load(os.path.join(args.workdir, "truth.npy"))
+    collection = MemmapCollection(
+        folder, quantization=quantization, oversample=oversample
+    )
+
+    latencies, recalls = [], []
+    for query, expected in zip(queries, truth):
+        start = time.perf_counter()
+        found = collection.query(query_embeddings=[query], n_results=args.k)
+        latencies.append(time.perf_counter() - start)
+        hits = {int(chunk_id) for chunk_id in found["ids"][0]}
+        recalls.append(len(hits & set(expected.tolist())) / args.k)
+
+    scanned = "vectors" if quantization == "none" else "codes"
+    return {
+        "name": f"{quantization} x{oversample}",
+        "quantization": quantization,
+        "oversample": oversample,
+        "recall_at_k": sum(recalls) / len(recalls),
+        "throughput_per_s": len(latencies) / sum(latencies),
+        "latency_ms": latency_summary(latencies),
+        "scanned_mb": file_mb(folder, scanned),
+        "vectors_mb": file_mb(folder, "vectors"),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--vectors", type=int, default=100000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument(
+        "--quantization",
+        nargs="+",
+        choices=["none", "int8", "binary"],
+        default=["none", "int8", "binary"],
+    )
+    parser.add_argument("--oversample", type=int, nargs="+", default=[1, 4, 10])
+    parser.add_argument("--embedder", choices=["hash", "model"], default="hash")
+    parser.add_argument("--output", help="Write the report to this JSON file")
+    parser.add_argument("--workdir", help=argparse.SUPPRESS)
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        quantization, oversample = args.child.split(":")
+        print(json.dumps(run_one(args, quantization, int(oversample))))
+        return
+
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        build(args, workdir)
+        runs = [
+            (quantization, oversample)
+            for quantization in args.quantization
+            for oversample in ([1] if quantization == "none" else args.oversample)
+        ]
+        for quantization, oversample in runs:
+            # A fresh process per run, so RSS only counts pages it touched
+            command = [
+                sys.executable,
+                __file__,
+                *sys.argv[1:],
+                "--workdir",
+                workdir,
+                "--child",
+                f"{quantization}:{oversample}",
+            ]
+            output = subprocess.run(command, capture_output=True, text=True)
+            if output.returncode:
+                sys.exit(f"{quantization} x{oversample} failed:\n{output.stderr}")
+            result = json.loads(output.stdout.strip().splitlines()[-1])
+            results.append(result)
+            latency = result["latency_ms"]
+            print(
+                f"{result['name']:>12}: recall@{args.k} {result['recall_at_k']:.3f}  "
+                f"p50 {latency['p50']:6.2f} ms  p95 {latency['p95']:6.2f} ms  "
+                f"scanned {result['scanned_mb']:6.1f} MB of "
+                f"{result['vectors_mb']:6.1f} MB float32  "
+                f"peak RSS {result['peak_rss_mb']:5.0f} MB"
+            )
+
+    if args.output:
+        parameters = {
+            key: value
+            for key, value in vars(args).items()
+            if key not in ("child", "workdir")
+        }
+        write_report(args.output, "quantization", parameters, results)
+        print(f"Report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Compare two benchmark JSON reports and flag regressions.
+
+Results are matched by name. A metric regresses when it is worse than the
+baseline by more than --tolerance (a fraction, 0.1 = 10%); the exit status is
+1 if any metric regressed.
+
+Usage:
+    uv run python benchmarks/compare_reports.py baseline.json current.json
+"""
+
+import argparse
+import json
+import sys
+
+from report import METRICS, metric
+
+
+def compare(baseline, current, tolerance: float):
+    """Yield (result name, metric, old, new, relative change, regressed)"""
+    previous = {result["name"]: result for result in baseline["results"]}
+    for result in current["results"]:
+        old_result = previous.get(result["name"])
+        if old_result is None:
+            continue
+        for name, higher_is_better in METRICS.items():
+            old, new = metric(old_result, name), metric(result, name)
+            if old is None or new is None or not old:
+                continue
+            change = (new - old) / old
+            worse = -change if higher_is_better else change
+            yield result["name"], name, old, new, change, worse > tolerance
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("baseline")
+    parser.add_argument("current")
+    parser.add_argument("--tolerance", type=float, default=0.1)
+    args = parser.parse_args()
+
+    with open(args.baseline, encoding="utf-8") as file:
+        baseline = json.load(file)
+    with open(args.current, encoding="utf-8") as file:
+        current = json.load(file)
+    if baseline["benchmark"] != current["benchmark"]:
+        parser.error(
+            f"reports are of different benchmarks: "
+            f"{baseline['benchmark']} vs {current['benchmark']}"
+        )
+
+    regressions = 0
+    for name, metric_name, old, new, change, regressed in compare(
+        baseline, current, args.tolerance
+    ):
+        regressions += regressed
+        flag = "REGRESSION" if regressed else ""
+        print(
+            f"{name:<28} {metric_name:<18} {old:10.2f} -> {new:10.2f} "
+            f"{change:+7.1%} {flag}"
+        )
+    print(f"{regressions} regressions beyond {args.tolerance:.0%}")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,277 @@
+"""
+Deterministic local stand-in for the Anthropic Messages API.
+
+Serves POST /v1/messages over HTTP, both plain JSON and SSE streaming, so the
+real anthropic SDK clients in AIGenerator can be pointed at it through
+ANTHROPIC_BASE_URL. A call that offers tools (and does not set tool_choice to
+"none") and has no tool result yet gets a tool_use for the first tool; every
+other call gets a text answer whose words are derived from a hash of the
+request, so repeated runs see identical responses.
+
+Each response waits --latency seconds before its first token and
+--token-delay seconds per further token, streamed or not.
+
+Usage:
+    uv run python benchmarks/fake_anthropic.py --port 8089 --latency 0.3
+    ANTHROPIC_BASE_URL=http://127.0.0.1:8089 uv run uvicorn app:app
+"""
+
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterator, List, Tuple
+
+WORDS = (
+    "the course lesson covers how to build prompts tools agents and retrieval "
+    "with clear examples of context windows evaluation caching streaming and "
+    "structured outputs for production applications"
+).split()
+
+
+class FakeAnthropicServer:
+    """Threaded HTTP server answering Messages API calls deterministically"""
+
+    def __init__(
+        self,
+        latency: float = 0.2,
+        token_delay: float = 0.0,
+        answer_words: int = 40,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ):
+        self.latency = latency
+        self.token_delay = token_delay
+        self.answer_words = answer_words
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.streamed_calls = 0
+
+        server = self
+
+        class Handler(_MessagesHandler):
+            fake = server
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeAnthropicServer":
+        self._thread = threading.Thread(
+            target=self.httpd.serve_forever, name="fake-anthropic", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self) -> "FakeAnthropicServer":
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def respond(self, body: Dict[str, Any]) -> Tuple[int, List[Dict[str, Any]], str]:
+        """Call number, content blocks and stop reason for a request body"""
+        with self._lock:
+            self.calls += 1
+            number = self.calls
+
+        messages = body.get("messages", [])
+        last = messages[-1]["content"] if messages else ""
+        answered = isinstance(last, list) and any(
+            block.get("type") == "tool_result" for block in last
+        )
+        tools_allowed = (body.get("tool_choice") or {}).get("type") != "none"
+        if body.get("tools") and tools_allowed and not answered:
+            tool = body["tools"][0]
+            block = {
+                "type": "tool_use",
+                "id": f"toolu_{number:08d}",
+                "name": tool["name"],
+                "input": {"query": _text_of(last)[-80:]},
+            }
+            return number, [block], "tool_use"
+
+        digest = hashlib.sha256(json.dumps(messages, sort_keys=True).encode())
+        rng = random.Random(digest.digest())
+        words = [rng.choice(WORDS) for _ in range(self.answer_words)]
+        text = " ".join(words).capitalize() + "."
+        return number, [{"type": "text", "text": text}], "end_turn"
+
+    def message(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        """Full (non-streamed) Message object"""
+        number, content, stop_reason = self.respond(body)
+        time.sleep(self.latency + self.token_delay * _token_steps(content))
+        return {
+            "id": f"msg_{number:08d}",
+            "type": "message",
+            "role": "assistant",
+            "model": body.get("model", "fake"),
+            "content": content,
+            "stop_reason": stop_reason,
+            "stop_sequence": None,
+            "usage": {
+                "input_tokens": _input_tokens(body),
+                "output_tokens": _output_tokens(content),
+            },
+        }
+
+    def events(self, body: Dict[str, Any]) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """Server-sent events of a streamed Message"""
+        with self._lock:
+            self.streamed_calls += 1
+        number, content, stop_reason = self.respond(body)
+        time.sleep(self.latency)
+
+        yield "message_start", {
+            "type": "message_start",
+            "message": {
+                "id": f"msg_{number:08d}",
+                "type": "message",
+                "role": "assistant",
+                "model": body.get("model", "fake"),
+                "content": [],
+                "stop_reason": None,
+                "stop_sequence": None,
+                "usage": {"input_tokens": _input_tokens(body), "output_tokens": 1},
+            },
+        }
+        for index, block in enumerate(content):
+            if block["type"] == "text":
+                yield "content_block_start", {
+                    "type": "content_block_start",
+                    "index": index,
+                    "content_block": {"type": "text", "text": ""},
+                }
+                for position, word in enumerate(block["text"].split(" ")):
+                    if position:
+                        time.sleep(self.token_delay)
+                    yield "content_block_delta", {
+                        "type": "content_block_delta",
+                        "index": index,
+                        "delta": {
+                            "type": "text_delta",
+                            "text": word if not position else f" {word}",
+                        },
+                    }
+            else:
+                yield "content_block_start", {
+                    "type": "content_block_start",
+                    "index": index,
+                    "content_block": {**block, "input": {}},
+                }
+                yield "content_block_delta", {
+                    "type": "content_block_delta",
+                    "index": index,
+                    "delta": {
+                        "type": "input_json_delta",
+                        "partial_json": json.dumps(block["input"]),
+                    },
+                }
+            yield "content_block_stop", {"type": "content_block_stop", "index": index}
+
+        yield "message_delta", {
+            "type": "message_delta",
+            "delta": {"stop_reason": stop_reason, "stop_sequence": None},
+            "usage": {"output_tokens": _output_tokens(content)},
+        }
+        yield "message_stop", {"type": "message_stop"}
+
+
+class _MessagesHandler(BaseHTTPRequestHandler):
+    """HTTP/1.1 handler for POST /v1/messages"""
+
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True  # Headers and body go out as separate writes
+    fake: FakeAnthropicServer
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        body = json.loads(self.rfile.read(length) or b"{}")
+        if self.path.split("?")[0] != "/v1/messages":
+            self._send_json(404, {"type": "error", "error": {"type": "not_found"}})
+            return
+
+        if not body.get("stream"):
+            self._send_json(200, self.fake.message(body))
+            return
+
+        # Chunked transfer encoding keeps the connection reusable
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for event, data in self.fake.events(body):
+            payload = f"event: {event}\ndata: {json.dumps(data)}\n\n".encode()
+            self.wfile.write(b"%x\r\n%s\r\n" % (len(payload), payload))
+            self.wfile.flush()
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _send_json(self, status: int, data: Dict[str, Any]):
+        payload = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass  # Keep benchmark output clean
+
+
+def _text_of(content: Any) -> str:
+    """Plain text of a message's content, whether a string or blocks"""
+    if isinstance(content, str):
+        return content
+    return " ".join(block.get("text", "") for block in content)
+
+
+def _token_steps(content: List[Dict[str, Any]]) -> int:
+    """Delays between the streamed text fragments of a response"""
+    return sum(
+        len(block["text"].split(" ")) - 1
+        for block in content
+        if block["type"] == "text"
+    )
+
+
+def _input_tokens(body: Dict[str, Any]) -> int:
+    return len(json.dumps(body.get("messages", []))) // 4 + 1
+
+
+def _output_tokens(content: List[Dict[str, Any]]) -> int:
+    return max(1, len(json.dumps(content)) // 4)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--token-delay", type=float, default=0.0)
+    parser.add_argument("--answer-words", type=int, default=40)
+    args = parser.parse_args()
+
+    server = FakeAnthropicServer(
+        args.latency, args.token_delay, args.answer_words, args.host, args.port
+    )
+    print(f"Fake Anthropic API on {server.url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Shared reporting for the benchmark suite.
+
+Every benchmark result is a dict with a unique "name" plus metrics: latency
+summaries in milliseconds, throughput per second and peak RSS in MB. Reports
+are saved as JSON so compare_reports.py can diff two runs by result name.
+"""
+
+import json
+import os
+import platform
+import resource
+import sys
+import time
+from typing import Any, Dict, List, Sequence
+
+# Metrics compared between reports, and whether higher values are better
+METRICS = {
+    "latency_ms.p50": False,
+    "latency_ms.p95": False,
+    "latency_ms.p99": False,
+    "ttft_ms.p50": False,
+    "ttft_ms.p95": False,
+    "throughput_per_s": True,
+    "recall_at_k": True,
+    "peak_rss_mb": False,
+}
+
+
+def percentile(values: Sequence[float], fraction: float) -> float:
+    """Linearly interpolated percentile of already sorted values"""
+    if not values:
+        return 0.0
+    position = fraction * (len(values) - 1)
+    lower = int(position)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (position - lower)
+
+
+def latency_summary(seconds: Sequence[float]) -> Dict[str, float]:
+    """p50/p95/p99, mean and max of latencies, in milliseconds"""
+    values = sorted(seconds)
+    return {
+        "count": len(values),
+        "p50": percentile(values, 0.50) * 1000,
+        "p95": percentile(values, 0.95) * 1000,
+        "p99": percentile(values, 0.99) * 1000,
+        "mean": (sum(values) / len(values) * 1000) if values else 0.0,
+        "max": (values[-1] * 1000) if values else 0.0,
+    }
+
+
+def peak_rss_mb(include_children: bool = False) -> float:
+    """Peak resident set size of this process (and optionally its children)"""
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    try:
+        # Linux carries ru_maxrss over from the forking parent across exec;
+        # VmHWM only covers this program
+        with open("/proc/self/status", encoding="ascii") as status:
+            for line in status:
+                if line.startswith("VmHWM:"):
+                    peak = int(line.split()[1])
+    except OSError:
+        pass
+    if include_children:
+        peak = max(peak, resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    return peak / scale
+
+
+def environment() -> Dict[str, Any]:
+    """Interpreter and machine details stored with each report"""
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def write_report(
+    path: str,
+    benchmark: str,
+    parameters: Dict[str, Any],
+    results: List[Dict[str, Any]],
+) -> Dict[str, Any]:
+    """Save a benchmark report as JSON and return it"""
+    report = {
+        "benchmark": benchmark,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "environment": environment(),
+        "parameters": parameters,
+        "results": results,
+    }
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(report, file, indent=2)
+        file.write("\n")
+    return report
+
+
+def metric(result: Dict[str, Any], name: str):
+    """Look up a dotted metric name such as "latency_ms.p95" in a result"""
+    value: Any = result
+    for part in name.split("."):
+        if not isinstance(value, dict) or part not in value:
+            return None
+        value = value[part]
+    return value
@@ -0,0 +1,183 @@
+"""
+Latency-simulating stand-ins for the Anthropic client, the vector store and
+the embedding model.
+
+They let the benchmarks drive the real RAGSystem / AIGenerator / ToolManager
+code paths without network access or a downloaded embedding model.
+"""
+
+import asyncio
+import hashlib
+import itertools
+import os
+import re
+import sys
+import time
+import types
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+
+from vector_store import SearchResults  # noqa: E402
+
+_tool_ids = itertools.count()
+
+
+def _simulated_response(params: Dict[str, Any]) -> SimpleNamespace:
+    """First call with tools asks for a search, any follow-up call answers"""
+    last = params["messages"][-1]
+    answering = isinstance(last["content"], list) and any(
+        block.get("type") == "tool_result" for block in last["content"]
+    )
+    if params.get("tools") and not answering:
+        block = SimpleNamespace(
+            type="tool_use",
+            id=f"toolu_{next(_tool_ids)}",
+            name="search_course_content",
+            input={"query": str(last["content"])[-80:]},
+        )
+        return SimpleNamespace(stop_reason="tool_use", content=[block])
+    block = SimpleNamespace(type="text", text="Simulated answer.")
+    return SimpleNamespace(stop_reason="end_turn", content=[block])
+
+
+class SimulatedMessages:
+    """Blocking messages API that sleeps for a fixed latency"""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    def create(self, **params) -> SimpleNamespace:
+        time.sleep(self.latency)
+        return _simulated_response(params)
+
+
+class SimulatedStream:
+    """Async message stream yielding the simulated response word by word"""
+
+    def __init__(self, latency: float, response: SimpleNamespace):
+        self.latency = latency
+        self.response = response
+        self.waited = False
+
+    async def __aenter__(self) -> "SimulatedStream":
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    async def __aiter__(self):
+        await self._wait()
+        for block in self.response.content:
+            if block.type != "text":
+                yield SimpleNamespace(type="content_block_start", content_block=block)
+                continue
+            for position, word in enumerate(block.text.split(" ")):
+                yield SimpleNamespace(
+                    type="text", text=f" {word}" if position else word
+                )
+
+    async def get_final_message(self) -> SimpleNamespace:
+        await self._wait()
+        return self.response
+
+    async def _wait(self):
+        if not self.waited:
+            self.waited = True
+            await asyncio.sleep(self.latency)
+
+
+class AsyncSimulatedMessages:
+    """Async messages API that awaits a fixed latency"""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    async def create(self, **params) -> SimpleNamespace:
+        await asyncio.sleep(self.latency)
+        return _simulated_response(params)
+
+    def stream(self, **params) -> SimulatedStream:
+        return SimulatedStream(self.latency, _simulated_response(params))
+
+
+def simulated_clients(latency: float):
+    """Return (sync_client, async_client) with the given LLM call latency"""
+    return (
+        SimpleNamespace(messages=SimulatedMessages(latency)),
+        SimpleNamespace(messages=AsyncSimulatedMessages(latency)),
+    )
+
+
+class SimulatedVectorStore:
+    """VectorStore stand-in whose search blocks like embedding + Chroma work"""
+
+    search_latency = 0.02
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def search(
+        self,
+        query: str,
+        course_name: Optional[str] = None,
+        lesson_number: Optional[int] = None,
+        limit: Optional[int] = None,
+    ) -> SearchResults:
+        time.sleep(self.search_latency)
+        return SearchResults(
+            documents=[f"Simulated chunk for: {query}"],
+            metadata=[{"course_title": "Simulated Course", "lesson_number": 1}],
+            distances=[0.1],
+        )
+
+    def search_many(self, searches: List[Dict[str, Any]]) -> List[SearchResults]:
+        # One embedding pass and batched query cost about one search
+        time.sleep(self.search_latency)
+        return [
+            SearchResults(
+                documents=[f"Simulated chunk for: {search['query']}"],
+                metadata=[{"course_title": "Simulated Course", "lesson_number": 1}],
+                distances=[0.1],
+            )
+            for search in searches
+        ]
+
+    def get_existing_course_titles(self) -> List[str]:
+        return ["Simulated Course"]
+
+    def get_course_count(self) -> int:
+        return 1
+
+
+class HashingEmbeddingModel:
+    """
+    Deterministic bag-of-words SentenceTransformer stand-in.
+
+    Each word is hashed into one of 384 dimensions (MiniLM's width), so chunks
+    that share words are similar and ingest runs see realistic vector sizes.
+    """
+
+    dimensions = 384
+
+    def __init__(self, model_name_or_path: Optional[str] = None, **kwargs):
+        self.model_name = model_name_or_path
+
+    def encode(self, texts, convert_to_numpy=True, normalize_embeddings=False, **kw):
+        vectors = np.zeros((len(texts), self.dimensions), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in re.findall(r"\w+", text.lower()):
+                digest = hashlib.blake2b(word.encode(), digest_size=4).digest()
+                vectors[row, int.from_bytes(digest, "big") % self.dimensions] += 1.0
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.where(norms == 0, 1, norms)
+
+
+def install_hashing_model():
+    """Make "import sentence_transformers" load HashingEmbeddingModel"""
+    module = types.ModuleType("sentence_transformers")
+    module.SentenceTransformer = HashingEmbeddingModel
+    sys.modules["sentence_transformers"] = module
@@ -72,7 +72,7 @@ async function sendMessage() {
     chatMessages.scrollTop = chatMessages.scrollHeight;
 
     try {
-        const response = await fetch(`${API_URL}/query`, {
+        const response = await fetch(`${API_URL}/query/stream`, {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json',
@@ -85,16 +85,39 @@ async function sendMessage() {
 
         if (!response.ok) throw new Error('Query failed');
 
-        const data = await response.json();
-        
-        // Update session ID if new
-        if (!currentSessionId) {
-            currentSessionId = data.session_id;
-        }
+        // Render tokens into a single assistant message as they arrive
+        let answer = '';
+        let messageDiv = null;
 
-        // Replace loading message with response
-        loadingMessage.remove();
-        addMessage(data.answer, 'assistant', data.sources);
+        await readEventStream(response, (event, data) => {
+            if (event === 'token') {
+                if (!messageDiv) {
+                    // Replace loading message with the streaming response
+                    loadingMessage.remove();
+                    messageDiv = createStreamingMessage();
+                }
+                answer += data.text;
+                renderStreamingMessage(messageDiv, answer);
+            } else if (event === 'discard') {
+                // Text written ahead of a search is not part of the answer
+                answer = '';
+                if (messageDiv) renderStreamingMessage(messageDiv, answer);
+            } else if (event === 'sources') {
+                if (!messageDiv) {
+                    loadingMessage.remove();
+                    messageDiv = createStreamingMessage();
+                    renderStreamingMessage(messageDiv, answer);
+                }
+                appendSources(messageDiv, data.sources);
+            } else if (event === 'done') {
+                // Update session ID if new
+                if (!currentSessionId) {
+                    currentSessionId = data.session_id;
+                }
+            } else if (event === 'error') {
+                throw new Error(data.detail);
+            }
+        });
 
     } catch (error) {
         // Replace loading message with error
@@ -107,6 +130,62 @@ async function sendMessage() {
     }
 }
 
+// Parse a Server-Sent Events response body, calling onEvent(event, data) per message
+async function readEventStream(response, onEvent) {
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+
+        let boundary;
+        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+            const rawEvent = buffer.slice(0, boundary);
+            buffer = buffer.slice(boundary + 2);
+
+            let event = 'message';
+            let data = '';
+            for (const line of rawEvent.split('\n')) {
+                if (line.startsWith('event: ')) event = line.slice(7);
+                else if (line.startsWith('data: ')) data += line.slice(6);
+            }
+            onEvent(event, data ? JSON.parse(data) : null);
+        }
+    }
+}
+
+function createStreamingMessage() {
+    const messageDiv = document.createElement('div');
+    messageDiv.className = 'message assistant';
+    messageDiv.id = `message-${Date.now()}`;
+    messageDiv.innerHTML = '<div class="message-content"></div>';
+    chatMessages.appendChild(messageDiv);
+    return messageDiv;
+}
+
+function renderStreamingMessage(messageDiv, content) {
+    messageDiv.querySelector('.message-content').innerHTML = marked.parse(content);
+    chatMessages.scrollTop = chatMessages.scrollHeight;
+}
+
+function appendSources(messageDiv, sources) {
+    if (!sources || sources.length === 0) return;
+    messageDiv.insertAdjacentHTML('beforeend', renderSources(sources));
+    chatMessages.scrollTop = chatMessages.scrollHeight;
+}
+
+function renderSources(sources) {
+    return `
+            <details class="sources-collapsible">
+                <summary class="sources-header">Sources</summary>
+                <div class="sources-content">${sources.join(', ')}</div>
+            </details>
+        `;
+}
+
 function createLoadingMessage() {
     const messageDiv = document.createElement('div');
     messageDiv.className = 'message assistant';
@@ -134,12 +213,7 @@ function addMessage(content, type, sources = null, isWelcome = false) {
     let html = `<div class="message-content">${displayContent}</div>`;
     
     if (sources && sources.length > 0) {
-        html += `
-            <details class="sources-collapsible">
-                <summary class="sources-header">Sources</summary>
-                <div class="sources-content">${sources.join(', ')}</div>
-            </details>
-        `;
+        html += renderSources(sources);
     }
     
     messageDiv.innerHTML = html;